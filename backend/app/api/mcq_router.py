@@ -1,25 +1,93 @@
 """Routes for MCQ generation leveraging the RAG pipeline."""
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, Optional
 
-from app.models.mcq_model import MCQRequest, MCQResponse
-from app.services.registry import mcq_generator
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
+from app.models.mcq_model import MCQ, MCQRequest, MCQResponse
+from app.services import metrics
+from app.services.registry import get_mcq_generator
+
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/mcq", tags=["mcq"])
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+DEBUG_QUERY = Query(False, description="Include per-stage timings (needs METRICS_ENABLED).")
+
 
 @router.post("/generate", response_model=MCQResponse)
-async def generate_mcqs(request: MCQRequest):
+async def generate_mcqs(request: MCQRequest, debug: bool = DEBUG_QUERY):
     """Generate MCQs for a previously ingested PDF and specific page range."""
     try:
-        mcqs = mcq_generator.generate_mcqs(
+        generator = await asyncio.to_thread(get_mcq_generator)
+        mcqs = await generator.agenerate_mcqs(
             pdf_id=request.pdf_id,
             page_start=request.page_start,
             page_end=request.page_end,
             num_questions=request.num_questions,
             difficulty=request.difficulty,
         )
-        return MCQResponse(pdf_id=request.pdf_id, mcqs=mcqs, total_generated=len(mcqs))
+        return MCQResponse(
+            pdf_id=request.pdf_id,
+            mcqs=mcqs,
+            total_generated=len(mcqs),
+            timings=_timings() if debug else None,
+        )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Error generating MCQs: {exc}") from exc
 
+
+@router.post("/generate/stream")
+async def stream_mcqs(
+    request: MCQRequest,
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
+    debug: bool = DEBUG_QUERY,
+):
+    """Stream progress, error, and MCQ events as each question is generated.
+
+    Headers go out before generation finishes, so with ``debug=true`` the
+    stage timings ride on the ``done`` event instead of ``Server-Timing``.
+    """
+    return StreamingResponse(
+        _event_stream(request, stream_format, debug),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _event_stream(request: MCQRequest, stream_format: str, debug: bool = False) -> AsyncIterator[str]:
+    try:
+        generator = await asyncio.to_thread(get_mcq_generator)
+        async for event in generator.astream_mcqs(
+            pdf_id=request.pdf_id,
+            page_start=request.page_start,
+            page_end=request.page_end,
+            num_questions=request.num_questions,
+            difficulty=request.difficulty,
+        ):
+            if event["event"] == "mcq":
+                event = {**event, "mcq": MCQ.model_validate(event["mcq"]).model_dump()}
+            elif event["event"] == "done" and debug:
+                event = {**event, "timings": _timings()}
+            yield _format_event(event, stream_format)
+    except Exception as exc:
+        logger.exception("MCQ stream failed for %s", request.pdf_id)
+        yield _format_event({"event": "error", "detail": f"Error generating MCQs: {exc}"}, stream_format)
+
+
+def _timings() -> Optional[Dict[str, Dict[str, float]]]:
+    timings = metrics.current_timings()
+    return timings.as_dict() if timings is not None else None
+
+
+def _format_event(event: Dict, stream_format: str) -> str:
+    payload = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
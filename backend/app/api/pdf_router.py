@@ -1,6 +1,7 @@
 """Routes for PDF upload and ingestion into the RAG store."""
 
-import shutil
+import asyncio
+import hashlib
 import uuid
 from pathlib import Path
 from typing import Optional
@@ -9,8 +10,9 @@ from fastapi import APIRouter, File, HTTPException, UploadFile, Query
 import logging
 
 from app.config import settings
-from app.models.pdf_model import PDFIngestResponse, PageRange
-from app.services.registry import mcq_generator, pdf_processor
+from app.models.pdf_model import IngestJobStatus, PDFIngestResponse, PageRange
+from app.services.jobs import estimate_eta
+from app.services.registry import get_ingestion_jobs, get_ingestion_service, get_pdf_processor
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/pdf", tags=["pdf"])
@@ -18,53 +20,141 @@ UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
 
 
+def _save_upload(file: UploadFile, destination: Path) -> str:
+    """Copy the upload to disk in blocks, returning the SHA-256 of its bytes."""
+    digest = hashlib.sha256()
+    with destination.open("wb") as buffer:
+        for block in iter(lambda: file.file.read(1 << 20), b""):
+            digest.update(block)
+            buffer.write(block)
+    return digest.hexdigest()
+
+
 @router.post("/upload", response_model=PDFIngestResponse)
 async def upload_pdf(
     file: UploadFile = File(...),
     start_page: Optional[int] = Query(None, ge=1, description="Inclusive start page to ingest."),
     end_page: Optional[int] = Query(None, ge=1, description="Inclusive end page to ingest."),
+    background: bool = Query(
+        False, description="Queue ingestion and return a job id immediately; poll /api/pdf/jobs/{job_id}."
+    ),
 ):
-    """Handle PDF ingestion with optional page-range customization."""
+    """Handle PDF ingestion with optional page-range customization.
+
+    Uploads are keyed by the SHA-256 of their bytes: a known PDF returns its
+    existing ``pdf_id`` and only pages not ingested before are processed.
+    """
     if not file.filename.lower().endswith(tuple(settings.allowed_extensions)):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    pdf_id = str(uuid.uuid4())
-    saved_path = UPLOAD_DIR / f"{pdf_id}.pdf"
+    staging_path = UPLOAD_DIR / f"upload_{uuid.uuid4().hex}.pdf"
+    content_hash = await asyncio.to_thread(_save_upload, file, staging_path)
 
-    with saved_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    if background:
+        return await _queue_ingestion(file.filename, staging_path, content_hash, start_page, end_page)
 
     try:
-        extracted_text, total_pages, normalized_range = pdf_processor.extract_text(
-            saved_path, page_start=start_page, page_end=end_page
-        )
-        if not extracted_text.strip():
-            raise HTTPException(status_code=400, detail="Unable to extract text from PDF.")
-
-        range_model = PageRange(start_page=normalized_range[0], end_page=normalized_range[1])
-
-        metadata = {
-            "title": file.filename,
-            "total_pages": total_pages,
-            "ingested_range": f"{range_model.start_page}-{range_model.end_page}",
-        }
-
-        chunks_created = mcq_generator.process_pdf_to_rag(
-            pdf_text=extracted_text,
-            pdf_id=pdf_id,
-            metadata=metadata,
+        ingestion_service = await asyncio.to_thread(get_ingestion_service)
+        result = await ingestion_service.aingest(
+            staging_path,
+            title=file.filename,
+            page_start=start_page,
+            page_end=end_page,
+            content_hash=content_hash,
         )
+        _store_upload(staging_path, result.pdf_id)
 
         return PDFIngestResponse(
-            pdf_id=pdf_id,
+            pdf_id=result.pdf_id,
             filename=file.filename,
-            total_pages=total_pages,
-            chunks_created=chunks_created,
-            ingested_range=range_model,
+            total_pages=result.total_pages,
+            chunks_created=result.chunks_created,
+            ingested_range=PageRange(start_page=result.page_range[0], end_page=result.page_range[1]),
+            content_hash=result.content_hash,
+            status=result.status,
         )
-    except HTTPException:
-        raise
+    except ValueError as exc:
+        staging_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
+        staging_path.unlink(missing_ok=True)
         logger.exception("PDF upload failed")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {exc}") from exc
 
+
+@router.get("/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str):
+    """Report phase, page progress, and ETA for a background ingestion job."""
+    ingestion_jobs = await asyncio.to_thread(get_ingestion_jobs)
+    job = await asyncio.to_thread(ingestion_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found.")
+    return IngestJobStatus(
+        job_id=job["job_id"],
+        status=job["status"],
+        phase=job["phase"],
+        pdf_id=job["pdf_id"],
+        filename=job["filename"],
+        pages_total=job["pages_total"] or 0,
+        pages_done=job["pages_done"] or 0,
+        chunks_created=job["chunks_created"] or 0,
+        eta_seconds=estimate_eta(job),
+        result_status=job["result_status"],
+        error=job["error"],
+    )
+
+
+async def _queue_ingestion(
+    filename: str,
+    staging_path: Path,
+    content_hash: str,
+    start_page: Optional[int],
+    end_page: Optional[int],
+) -> PDFIngestResponse:
+    """Persist the upload under its pdf_id and hand ingestion to the job pool.
+
+    The pdf_id is the existing one for known content, otherwise freshly
+    minted; the job status reports the final id once ingestion completes.
+    """
+    try:
+        ingestion_jobs = await asyncio.to_thread(get_ingestion_jobs)
+        pdf_processor = get_pdf_processor()
+        pdf_id = ingestion_jobs.ingestion.known_pdf_id(content_hash) or str(uuid.uuid4())
+        saved_path = _store_upload(staging_path, pdf_id)
+        total_pages = await asyncio.to_thread(pdf_processor.page_count, saved_path)
+    except Exception as exc:
+        staging_path.unlink(missing_ok=True)
+        logger.exception("PDF upload failed")
+        raise HTTPException(status_code=400, detail=f"Unable to read PDF: {exc}") from exc
+
+    range_start, range_end = pdf_processor.clamp_range(total_pages, start_page, end_page)
+    job = await asyncio.to_thread(
+        ingestion_jobs.submit,
+        saved_path,
+        filename,
+        pdf_id,
+        start_page,
+        end_page,
+        content_hash,
+        range_end - range_start + 1,
+    )
+    return PDFIngestResponse(
+        pdf_id=pdf_id,
+        filename=filename,
+        total_pages=total_pages,
+        chunks_created=0,
+        ingested_range=PageRange(start_page=range_start, end_page=range_end),
+        content_hash=content_hash,
+        job_id=job["job_id"],
+        status="queued",
+    )
+
+
+def _store_upload(staging_path: Path, pdf_id: str) -> Path:
+    """Keep one copy of each PDF under ``uploads/<pdf_id>.pdf``."""
+    saved_path = UPLOAD_DIR / f"{pdf_id}.pdf"
+    if saved_path.exists():
+        staging_path.unlink(missing_ok=True)
+    else:
+        staging_path.replace(saved_path)
+    return saved_path
@@ -20,6 +20,12 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
 
+    # Load the embedding model and clients in a background thread at startup; otherwise on first use.
+    WARMUP_ON_STARTUP: bool = True
+    # Serve /metrics and add Server-Timing headers with per-stage durations. Off by default because
+    # both expose internals; enable behind a private network or reverse proxy.
+    METRICS_ENABLED: bool = False
+
     FRONTEND_URL: str = "http://localhost:3000"
     BACKEND_URL: str = "http://localhost:8000"
     
@@ -29,15 +35,102 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 50
     ALLOWED_EXTENSIONS: str = "pdf"
 
+    # "chroma" or "numpy" (brute-force search over memory-mapped float32 matrices).
+    VECTOR_STORE_BACKEND: str = "chroma"
+    NUMPY_STORE_PATH: str = "./vector_store"
     CHROMA_DB_PATH: str = "./chroma_db"
+    # "per_pdf" (one collection per PDF) or "shared" (all PDFs in CHROMA_SHARED_COLLECTION, filtered
+    # by pdf_id metadata, optionally split over CHROMA_SHARDS); migrate with `cli.py migrate-chroma`.
+    CHROMA_STORAGE_MODE: str = "per_pdf"
+    CHROMA_SHARED_COLLECTION: str = "documents"
+    CHROMA_SHARDS: int = 1
+    # Which chunks a page range selects: "intersecting" includes chunks straddling the boundary
+    # pages, "contained" only chunks wholly inside the range.
+    PAGE_RANGE_OVERLAP: str = "intersecting"
+    # SHA-256 -> pdf_id manifest used to skip re-ingesting identical uploads.
+    INGEST_MANIFEST_PATH: str = "./ingest_manifest.sqlite3"
+    # Background ingestion jobs (POST /api/pdf/upload?background=true).
+    INGEST_JOBS_DB_PATH: str = "./ingest_jobs.sqlite3"
+    INGEST_JOB_WORKERS: int = 1
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    # "torch" (sentence-transformers), "onnx" or "onnx-int8"; the ONNX backends need onnxruntime
+    # and export the model into EMBEDDING_ONNX_DIR on first use.
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_NORMALIZE: bool = False
+    EMBEDDING_ONNX_DIR: str = "./onnx_models"
+    # Embeddings keyed by (model, text SHA-256): memory LRU over a memmapped float32 file.
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = "./embedding_cache"
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 4096
+    EMBEDDING_CACHE_MAX_ROWS: int = 200000
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 100
+    # "words" sizes chunks by CHUNK_SIZE/CHUNK_OVERLAP; "tokens" uses the embedder's tokenizer
+    # so chunks fit its max sequence length (CHUNK_MAX_TOKENS=0 means use that limit).
+    CHUNK_STRATEGY: str = "words"
+    CHUNK_MAX_TOKENS: int = 0
+    CHUNK_TOKEN_OVERLAP: int = 32
+    # Chunks embedded and upserted per batch during streaming ingestion.
+    INGEST_BATCH_SIZE: int = 64
+    # Page extraction fans out to a process pool for ranges of at least PDF_PARALLEL_MIN_PAGES.
+    PDF_EXTRACT_WORKERS: int = 0  # 0 = min(4, os.cpu_count())
+    PDF_PARALLEL_MIN_PAGES: int = 40
 
     DEFAULT_NUM_QUESTIONS: int = 10
     DEFAULT_DIFFICULTY: str = "medium"
     MAX_QUESTIONS_PER_REQUEST: int = 20
 
+    # Per-concept Gemini requests run through a bounded pool; 1 keeps generation serial.
+    MCQ_GENERATION_CONCURRENCY: int = 4
+    GEMINI_TIMEOUT_SECONDS: float = 60.0
+    # Concepts per Gemini call (K); items a batch misses or gets wrong are retried as single questions,
+    # and those that still fail are replaced from the concept backlog.
+    MCQ_BATCH_SIZE: int = 1
+    # Concepts extracted per requested question; the surplus is a backlog that replaces failed ones.
+    MCQ_CONCEPT_BACKLOG: float = 1.5
+    # Extra concepts kept in flight beyond the shortfall, as a fraction of the requested count.
+    MCQ_SPECULATIVE_RATIO: float = 0.2
+    # Per-request cap on MCQ Gemini calls, relative to a run where nothing fails.
+    MCQ_CALL_BUDGET_FACTOR: float = 2.0
+    # Concept index built in the background at ingest time: pages are packed into windows of up to
+    # CONCEPT_INDEX_WINDOW_CHARS characters (capped at the extraction prompt's limit), Gemini extracts
+    # CONCEPT_INDEX_CONCEPTS_PER_WINDOW concepts per window while yielding to interactive calls, and
+    # requests pick concepts by page range from it, falling back to extraction until it is ready.
+    CONCEPT_INDEX_ENABLED: bool = True
+    CONCEPT_INDEX_WINDOW_CHARS: int = 8000
+    CONCEPT_INDEX_CONCEPTS_PER_WINDOW: int = 6
+    CONCEPT_INDEX_WORKERS: int = 2
+    # Cosine similarity above which an indexed concept duplicates one already picked for a request.
+    CONCEPT_INDEX_DEDUP_THRESHOLD: float = 0.9
+
+    # Process-wide Gemini call limits shared by every request. The token bucket refills at
+    # GEMINI_RATE_LIMIT_RPM (0 disables it) and holds up to GEMINI_RATE_LIMIT_BURST calls.
+    GEMINI_RATE_LIMIT_RPM: float = 300.0
+    GEMINI_RATE_LIMIT_BURST: int = 20
+    GEMINI_MAX_CONCURRENCY: int = 8
+    # Retryable errors (429, 5xx, timeouts) back off exponentially with full jitter.
+    GEMINI_MAX_RETRIES: int = 4
+    GEMINI_RETRY_BASE_SECONDS: float = 1.0
+    GEMINI_RETRY_MAX_SECONDS: float = 30.0
+    # Consecutive server errors/timeouts that open the circuit, and how long it stays open.
+    GEMINI_BREAKER_THRESHOLD: int = 5
+    GEMINI_BREAKER_COOLDOWN_SECONDS: float = 30.0
+
+    # Gemini response cache (memory LRU in front of SQLite); MCQ sampling bypasses it by default.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./llm_cache.sqlite3"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_MEMORY_ENTRIES: int = 256
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 10000
+    LLM_CACHE_MCQ_GENERATION: bool = False
+
+    # Missing Mongolian fields are translated together, chunked by item count and characters.
+    TRANSLATION_BATCH_SIZE: int = 40
+    TRANSLATION_BATCH_MAX_CHARS: int = 12000
+    # Items a batch skipped are retried as single calls, this many at a time (async path).
+    TRANSLATION_FALLBACK_CONCURRENCY: int = 4
+
     @property
     def allowed_extensions(self) -> List[str]:
         return [ext.strip() for ext in self.ALLOWED_EXTENSIONS.split(",") if ext.strip()]
@@ -1,16 +1,40 @@
 """FastAPI application entry point."""
 
-from fastapi import FastAPI
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.config import settings
 from app.api.pdf_router import router as pdf_router
 from app.api.mcq_router import router as mcq_router
+from app.services import metrics, registry
+
+HTTP_SECONDS = metrics.histogram(
+    "msq_http_request_seconds", "HTTP request latency by route.", labels=("method", "route", "status")
+)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Warm services (and resume interrupted ingestion jobs) off the startup path."""
+    target = registry.warm_up if settings.WARMUP_ON_STARTUP else registry.resume_pending_jobs
+    threading.Thread(target=target, name="warm-up", daemon=True).start()
+    yield
+    registry.shutdown()
 
 
 def create_app() -> FastAPI:
     """Initialize FastAPI app with routers and middleware."""
-    app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION, debug=settings.DEBUG)
+    app = FastAPI(
+        title=settings.APP_NAME,
+        version=settings.APP_VERSION,
+        debug=settings.DEBUG,
+        lifespan=lifespan,
+    )
 
     # Support multiple frontend URLs (for production deployment)
     frontend_urls = [settings.FRONTEND_URL]
@@ -28,6 +52,31 @@ def create_app() -> FastAPI:
     app.include_router(pdf_router)
     app.include_router(mcq_router)
 
+    if settings.METRICS_ENABLED:
+
+        @app.middleware("http")
+        async def stage_timings(request: Request, call_next):
+            """Time the request and report its pipeline stages in a ``Server-Timing`` header."""
+            started = time.perf_counter()
+            with metrics.track_stages() as timings:
+                response = await call_next(request)
+            route = request.scope.get("route")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=response.status_code,
+            )
+            server_timing = timings.server_timing()
+            if server_timing:
+                response.headers["Server-Timing"] = server_timing
+            return response
+
+        @app.get("/metrics", include_in_schema=False)
+        async def prometheus_metrics():
+            """Counters and histograms in the Prometheus text format."""
+            return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
     @app.get("/")
     async def root():
         return {
@@ -36,6 +85,17 @@ def create_app() -> FastAPI:
             "status": "running",
         }
 
+    @app.get("/healthz")
+    async def healthz():
+        """Liveness: the process is serving requests; never touches heavy services."""
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        """Readiness: 200 once the model and clients are loaded, 503 while warming or failed."""
+        state = registry.readiness()
+        return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
     return app
 
 
@@ -1,6 +1,6 @@
 """Pydantic schemas for MCQ generation pipeline."""
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -45,4 +45,6 @@ class MCQResponse(BaseModel):
     pdf_id: str
     mcqs: List[MCQ]
     total_generated: int
+    # Per-stage {"ms", "calls"}; only filled when requested with ``debug=true``.
+    timings: Optional[Dict[str, Dict[str, float]]] = None
 
@@ -25,5 +25,23 @@ class PDFIngestResponse(BaseModel):
     total_pages: int
     chunks_created: int
     ingested_range: Optional[PageRange] = None
+    content_hash: Optional[str] = None
+    job_id: Optional[str] = None
     status: str = "processed"
 
+
+class IngestJobStatus(BaseModel):
+    """Progress of a background ingestion job."""
+
+    job_id: str
+    status: str = Field(description="queued, running, completed, or failed.")
+    phase: Optional[str] = Field(None, description="extracting, chunking, embedding, storing, or done.")
+    pdf_id: Optional[str] = None
+    filename: str
+    pages_total: int = 0
+    pages_done: int = 0
+    chunks_created: int = 0
+    eta_seconds: Optional[float] = None
+    result_status: Optional[str] = Field(None, description="processed, extended, or duplicate once completed.")
+    error: Optional[str] = None
+
@@ -1,8 +1,15 @@
 """Intelligent chunking strategy implementation."""
 
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple
 import re
 
+from app.services import metrics
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+PAGE_MARKER = re.compile(r"\[PAGE (\d+)\]")
+
+Segment = Tuple[str, int, int]
+
 
 class SmartChunker:
     """Creates overlapping logical chunks preserving context."""
@@ -12,52 +19,158 @@ class SmartChunker:
         self.overlap = overlap
 
     def chunk_text(self, text: str) -> List[Dict]:
-        """Return chunk dictionaries with metadata (page_start/end, word_count)."""
-        paragraphs = re.split(r"\n\s*\n", text)
-        chunks: List[Dict] = []
-
-        current_chunk = []
-        current_word_count = 0
-        chunk_start_page = 1
-        current_page = 1
-
-        for paragraph in paragraphs:
-            clean_para = paragraph.strip()
-            if not clean_para:
-                continue
-
-            page_marker = re.search(r"\[PAGE (\d+)\]", clean_para)
-            if page_marker:
-                current_page = int(page_marker.group(1))
-                clean_para = re.sub(r"\[PAGE \d+\]", "", clean_para).strip()
-
-            para_words = clean_para.split()
-            if current_word_count + len(para_words) > self.chunk_size and current_word_count > 0:
-                chunks.append(
-                    {
-                        "text": " ".join(current_chunk).strip(),
-                        "page_start": chunk_start_page,
-                        "page_end": current_page,
-                        "word_count": current_word_count,
-                    }
-                )
-                overlap_words = current_chunk[-self.overlap :] if self.overlap else []
-                current_chunk = overlap_words + para_words
-                current_word_count = len(current_chunk)
-                chunk_start_page = current_page
+        """Return chunk dictionaries with metadata (page_start/end, word_count).
+
+        Accepts the ``[PAGE n]``-marked text produced by
+        :meth:`PDFProcessor.extract_text`; prefer :meth:`iter_chunks` with
+        page records when they are available.
+        """
+        return list(self.iter_chunks(self.split_marked_text(text)))
+
+    @staticmethod
+    def split_marked_text(text: str) -> Iterator[Tuple[int, str]]:
+        """Split ``[PAGE n]``-marked text into ``(page_number, text)`` records.
+
+        Text before the first marker is attributed to page 1.
+        """
+        parts = PAGE_MARKER.split(text)
+        if parts[0].strip():
+            yield 1, parts[0]
+        for idx in range(1, len(parts) - 1, 2):
+            yield int(parts[idx]), parts[idx + 1]
+
+    @metrics.timed("chunker.chunk")
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Dict]:
+        """Chunk ``(page_number, text)`` records lazily, yielding each chunk once it is full.
+
+        Chunks are assembled from paragraph segments, so each emitted chunk is
+        a single join over segment strings. ``page_start``/``page_end`` are
+        the pages of the first and last segment actually in the chunk,
+        including any overlap carried over from the previous chunk.
+        """
+        # Each segment is (normalized_text, size, page_number); size is in chunking units.
+        segments: List[Segment] = []
+        size = 0
+
+        for page_number, page_text in pages:
+            for paragraph in PARAGRAPH_BREAK.split(page_text):
+                for segment in self._segments(paragraph, page_number):
+                    if size + segment[1] > self.chunk_size and size > 0:
+                        yield self._emit(segments, size)
+                        segments = self._overlap_tail(segments, self._overlap_limit(segment[1]))
+                        size = sum(count for _, count, _ in segments)
+                    segments.append(segment)
+                    size += segment[1]
+
+        if segments:
+            yield self._emit(segments, size)
+
+    def _segments(self, paragraph: str, page_number: int) -> Tuple[Segment, ...]:
+        """Return the paragraph as one whitespace-normalized segment sized in words."""
+        words = paragraph.split()
+        if not words:
+            return ()
+        return ((" ".join(words), len(words), page_number),)
+
+    def _overlap_limit(self, next_size: int) -> int:
+        """Units of the previous chunk to carry into one starting with a ``next_size`` segment."""
+        return self.overlap
+
+    def _tail(self, text: str, count: int) -> str:
+        """Return the last ``count`` units of a segment's text."""
+        return " ".join(text.split(" ")[-count:])
+
+    def _emit(self, segments: List[Segment], size: int) -> Dict:
+        return {
+            "text": " ".join(text for text, _, _ in segments),
+            "page_start": segments[0][2],
+            "page_end": segments[-1][2],
+            "word_count": size,
+        }
+
+    def _overlap_tail(self, segments: List[Segment], limit: int) -> List[Segment]:
+        """Return the last ``limit`` units of a chunk as segments, keeping their pages."""
+        tail: List[Segment] = []
+        remaining = limit
+        for text, count, page_number in reversed(segments):
+            if remaining <= 0:
+                break
+            if count <= remaining:
+                tail.append((text, count, page_number))
+                remaining -= count
             else:
-                current_chunk.extend(para_words)
-                current_word_count += len(para_words)
+                text = self._tail(text, remaining)
+                if text:
+                    tail.append((text, self._size(text), page_number))
+                remaining = 0
+        tail.reverse()
+        return tail
+
+    def _size(self, text: str) -> int:
+        return len(text.split())
+
+
+class TokenChunker(SmartChunker):
+    """Sizes chunks and overlap in the embedding model's own word-pieces.
+
+    ``chunk_size`` should not exceed the embedder's sequence limit (minus the
+    special tokens), so every chunk is embedded in full instead of being
+    silently truncated. Paragraphs longer than the limit are split.
+    """
+
+    def __init__(self, tokenizer, max_tokens: int, overlap: int = 32):
+        super().__init__(chunk_size=max_tokens, overlap=overlap)
+        self.tokenizer = tokenizer
+
+    def _offsets(self, text: str) -> List[Tuple[int, int]]:
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return encoding["offset_mapping"]
+
+    def _segments(self, paragraph: str, page_number: int) -> List[Segment]:
+        text = " ".join(paragraph.split())
+        if not text:
+            return []
+        offsets = self._offsets(text)
+        if not offsets:
+            return []
+        # Oversized paragraphs are windowed with room left for the carried overlap.
+        step = max(1, self.chunk_size - self.overlap)
+        segments = []
+        start = 0
+        while start < len(offsets):
+            end = min(start + step, len(offsets))
+            # Cut between words so no word is split when segments are joined with spaces.
+            while end < len(offsets) and end > start and not self._starts_word(text, offsets[end][0]):
+                end -= 1
+            if end == start:
+                # A single word longer than the window: split it rather than exceed the limit.
+                end = min(start + step, len(offsets))
+            stop = offsets[end][0] if end < len(offsets) else len(text)
+            segments.append((text[offsets[start][0] : stop].strip(), end - start, page_number))
+            start = end
+        return segments
+
+    @staticmethod
+    def _starts_word(text: str, position: int) -> bool:
+        return position == 0 or text[position - 1] == " "
+
+    def _overlap_limit(self, next_size: int) -> int:
+        # Never let the carried overlap push the next chunk past the embedder's limit.
+        return min(self.overlap, self.chunk_size - next_size)
 
-        if current_chunk:
-            chunks.append(
-                {
-                    "text": " ".join(current_chunk).strip(),
-                    "page_start": chunk_start_page,
-                    "page_end": current_page,
-                    "word_count": current_word_count,
-                }
-            )
+    def _tail(self, text: str, count: int) -> str:
+        offsets = self._offsets(text)
+        index = max(0, len(offsets) - count)
+        # Start the overlap on a word boundary so it re-tokenizes the same way.
+        while index < len(offsets) and not self._starts_word(text, offsets[index][0]):
+            index += 1
+        return text[offsets[index][0] :] if index < len(offsets) else ""
 
-        return chunks
+    def _size(self, text: str) -> int:
+        return len(self._offsets(text))
 
+    def _emit(self, segments: List[Segment], size: int) -> Dict:
+        chunk = super()._emit(segments, size)
+        chunk["token_count"] = size
+        chunk["word_count"] = len(chunk["text"].split())
+        return chunk
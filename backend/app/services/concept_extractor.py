@@ -3,32 +3,58 @@
 from typing import List
 import json
 
-from app.services.llm_client import genai_client, GEMINI_MODEL
+from app.services import metrics
+from app.services.llm_client import agenerate_text, generate_text
+
+# Characters of section text sent with each extraction prompt.
+MAX_TEXT_CHARS = 8000
 
 
 class ConceptExtractor:
     """Uses Gemini to identify main concepts, facts, and relationships."""
 
-    def extract(self, text: str, max_concepts: int = 15) -> List[str]:
-        """Return a list of prioritized concepts from the provided chapter text."""
-        prompt = f"""
+    @metrics.timed("concepts.extract")
+    def extract(self, text: str, max_concepts: int = 15, background: bool = False) -> List[str]:
+        """Return a list of prioritized concepts from the provided chapter text.
+
+        ``background`` marks ingest-time extraction, which yields to interactive Gemini calls.
+        """
+        response_text = generate_text(
+            self._build_prompt(text, max_concepts),
+            config={"response_mime_type": "application/json"},
+            use_cache=True,
+            background=background,
+        )
+        return self._parse(response_text)
+
+    @metrics.timed("concepts.extract")
+    async def aextract(self, text: str, max_concepts: int = 15) -> List[str]:
+        """Async variant of :meth:`extract` using the non-blocking Gemini client."""
+        response_text = await agenerate_text(
+            self._build_prompt(text, max_concepts),
+            config={"response_mime_type": "application/json"},
+            use_cache=True,
+        )
+        return self._parse(response_text)
+
+    @staticmethod
+    def _build_prompt(text: str, max_concepts: int) -> str:
+        return f"""
 Analyze this textbook section and extract the key concepts that should be tested.
 
 TEXT:
-{text[:8000]}
+{text[:MAX_TEXT_CHARS]}
 
 INSTRUCTIONS:
 - Return ONLY JSON.
-- Include 10-{max_concepts} concept strings covering definitions, processes, and relationships.
+- Include {max_concepts} distinct concept strings covering definitions, processes, and relationships.
 
 FORMAT:
 {{"concepts": ["concept1", "concept2"]}}
 """
-        response = genai_client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
-            config={"response_mime_type": "application/json"},
-        )
-        data = json.loads(response.text)
-        return data.get("concepts", [])
 
+    @staticmethod
+    def _parse(response_text: str) -> List[str]:
+        data = json.loads(response_text)
+        concepts = [concept.strip() for concept in data.get("concepts", []) if isinstance(concept, str)]
+        return list(dict.fromkeys(concept for concept in concepts if concept))
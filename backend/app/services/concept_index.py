@@ -0,0 +1,362 @@
+"""Per-PDF concept index built in the background at ingest time.
+
+Each run of newly ingested pages is packed into windows of consecutive pages
+holding up to ``CONCEPT_INDEX_WINDOW_CHARS`` characters of text, so a window
+fills one extraction prompt and sparse pages don't cost a call each. Gemini
+extracts concepts once per window, yielding to interactive calls; the concepts
+are stored with the window's page span and their embeddings, and MCQ requests
+pick concepts for any page range by lookup instead of calling Gemini.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services import metrics
+from app.services.concept_extractor import MAX_TEXT_CHARS
+
+if TYPE_CHECKING:
+    from app.services.mcq_generator import MCQGenerator
+
+logger = logging.getLogger(__name__)
+
+Window = Tuple[int, int]
+
+WINDOW_STATUSES = ("pending", "ready", "failed")
+
+WINDOWS_INDEXED = metrics.counter(
+    "msq_concept_index_windows_total", "Concept index windows processed, by outcome.", labels=("result",)
+)
+
+
+def concept_windows(runs: Iterable[Window], page_chars: Dict[int, float], budget: int) -> List[Window]:
+    """Pack each ``(start, end)`` run into windows of consecutive pages within ``budget`` characters.
+
+    A page larger than the budget gets a window of its own; windows never
+    cross run boundaries, so they never overlap pages indexed earlier.
+    """
+    windows: List[Window] = []
+    for run_start, run_end in runs:
+        start, total = run_start, 0.0
+        for page in range(run_start, run_end + 1):
+            chars = page_chars.get(page, 0)
+            if page > start and total + chars > budget:
+                windows.append((start, page - 1))
+                start, total = page, 0.0
+            total += chars
+        windows.append((start, run_end))
+    return windows
+
+
+@dataclass
+class IndexedWindow:
+    """One window's status and its concepts in extraction (priority) order."""
+
+    page_start: int
+    page_end: int
+    status: str
+    concepts: List[str] = field(default_factory=list)
+    embeddings: Optional[np.ndarray] = None
+
+
+class ConceptIndex:
+    """SQLite-persisted concepts per page window, with a decoded in-memory copy per PDF.
+
+    Lives next to the vector store's data like :class:`PageIndex`.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._windows: Dict[str, List[IndexedWindow]] = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS concept_windows (
+                pdf_id TEXT NOT NULL,
+                page_start INTEGER NOT NULL,
+                page_end INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                token TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (pdf_id, page_start)
+            );
+            CREATE TABLE IF NOT EXISTS concepts (
+                pdf_id TEXT NOT NULL,
+                page_start INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                concept TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (pdf_id, page_start, position)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def mark_pending(self, pdf_id: str, windows: Iterable[Window]) -> Dict[Window, str]:
+        """Queue windows for (re-)extraction; returns the token each worker must present to store."""
+        now = time.time()
+        tokens = {window: uuid.uuid4().hex for window in windows}
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO concept_windows "
+                "(pdf_id, page_start, page_end, status, token, updated_at) VALUES (?, ?, ?, 'pending', ?, ?)",
+                [(pdf_id, start, end, token, now) for (start, end), token in tokens.items()],
+            )
+            self._conn.commit()
+            self._windows.pop(pdf_id, None)
+        return tokens
+
+    def store(
+        self, pdf_id: str, window: Window, token: str, concepts: List[str], embeddings: np.ndarray
+    ) -> bool:
+        """Replace a window's concepts and mark it ready.
+
+        Returns False without writing when ``token`` is stale, i.e. the window
+        was removed or re-queued (the PDF was replaced) while it was being indexed.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if not self._current(pdf_id, window, token):
+                return False
+            self._conn.execute(
+                "DELETE FROM concepts WHERE pdf_id = ? AND page_start = ?", (pdf_id, window[0])
+            )
+            self._conn.executemany(
+                "INSERT INTO concepts (pdf_id, page_start, position, concept, embedding) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (pdf_id, window[0], position, concept, embeddings[position].tobytes())
+                    for position, concept in enumerate(concepts)
+                ],
+            )
+            self._set_status(pdf_id, window, "ready")
+            self._conn.commit()
+            self._windows.pop(pdf_id, None)
+        return True
+
+    def mark_failed(self, pdf_id: str, window: Window, token: str):
+        with self._lock:
+            if not self._current(pdf_id, window, token):
+                return
+            self._set_status(pdf_id, window, "failed")
+            self._conn.commit()
+            self._windows.pop(pdf_id, None)
+
+    def remove(self, pdf_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM concepts WHERE pdf_id = ?", (pdf_id,))
+            self._conn.execute("DELETE FROM concept_windows WHERE pdf_id = ?", (pdf_id,))
+            self._conn.commit()
+            self._windows.pop(pdf_id, None)
+
+    def has(self, pdf_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM concept_windows WHERE pdf_id = ? LIMIT 1", (pdf_id,)
+            ).fetchone()
+        return row is not None
+
+    def unfinished(self) -> List[Tuple[str, Window, str]]:
+        """``(pdf_id, window, token)`` of windows left pending or failed (restart, Gemini outage)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pdf_id, page_start, page_end, token FROM concept_windows "
+                "WHERE status != 'ready' ORDER BY pdf_id, page_start"
+            ).fetchall()
+        return [(row[0], (row[1], row[2]), row[3]) for row in rows]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM concept_windows GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in WINDOW_STATUSES}
+        counts.update(dict(rows))
+        return counts
+
+    def select(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        count: int,
+        dedup_threshold: Optional[float] = None,
+    ) -> Optional[List[str]]:
+        """Up to ``count`` concepts from the windows touching a page range.
+
+        Returns None unless every such window is indexed, so callers can fall
+        back to extraction. Windows are visited round-robin in page order, each
+        contributing its next concept by priority, so the pick covers the whole
+        range. A concept whose cosine similarity to one already picked exceeds
+        ``dedup_threshold`` (default ``CONCEPT_INDEX_DEDUP_THRESHOLD``) is skipped.
+        """
+        windows = [
+            window
+            for window in self._load(pdf_id)
+            if window.page_start <= page_end and window.page_end >= page_start
+        ]
+        if not windows or any(window.status != "ready" for window in windows):
+            return None
+        threshold = settings.CONCEPT_INDEX_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+
+        picked: List[str] = []
+        picked_vectors: List[np.ndarray] = []
+        seen: Set[str] = set()
+        depth = max((len(window.concepts) for window in windows), default=0)
+        for position in range(depth):
+            for window in windows:
+                if len(picked) >= count:
+                    return picked
+                if position >= len(window.concepts):
+                    continue
+                concept = window.concepts[position]
+                key = concept.casefold()
+                if key in seen:
+                    continue
+                vector = window.embeddings[position]
+                if picked_vectors and float(np.max(np.stack(picked_vectors) @ vector)) > threshold:
+                    continue
+                seen.add(key)
+                picked.append(concept)
+                picked_vectors.append(vector)
+        return picked
+
+    def _current(self, pdf_id: str, window: Window, token: str) -> bool:
+        row = self._conn.execute(
+            "SELECT token FROM concept_windows WHERE pdf_id = ? AND page_start = ?", (pdf_id, window[0])
+        ).fetchone()
+        return row is not None and row[0] == token
+
+    def _set_status(self, pdf_id: str, window: Window, status: str):
+        self._conn.execute(
+            "UPDATE concept_windows SET status = ?, updated_at = ? WHERE pdf_id = ? AND page_start = ?",
+            (status, time.time(), pdf_id, window[0]),
+        )
+
+    def _load(self, pdf_id: str) -> List[IndexedWindow]:
+        with self._lock:
+            windows = self._windows.get(pdf_id)
+            if windows is None:
+                rows = self._conn.execute(
+                    "SELECT page_start, page_end, status FROM concept_windows WHERE pdf_id = ? "
+                    "ORDER BY page_start",
+                    (pdf_id,),
+                ).fetchall()
+                windows = [IndexedWindow(*row) for row in rows]
+                by_start = {window.page_start: window for window in windows}
+                vectors: Dict[int, List[np.ndarray]] = {}
+                for start, concept, blob in self._conn.execute(
+                    "SELECT page_start, concept, embedding FROM concepts WHERE pdf_id = ? "
+                    "ORDER BY page_start, position",
+                    (pdf_id,),
+                ):
+                    if start in by_start:
+                        by_start[start].concepts.append(concept)
+                        vectors.setdefault(start, []).append(np.frombuffer(blob, dtype=np.float32))
+                for start, rows_for_window in vectors.items():
+                    matrix = np.stack(rows_for_window)
+                    # Unit rows, so similarity during selection is a dot product.
+                    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                    by_start[start].embeddings = matrix / np.clip(norms, 1e-12, None)
+                self._windows[pdf_id] = windows
+            return windows
+
+
+class ConceptIndexer:
+    """Extracts and embeds concepts per window on a small worker pool after ingestion."""
+
+    def __init__(self, generator: "MCQGenerator", index: Optional[ConceptIndex] = None):
+        self.generator = generator
+        self.index = index or generator.concept_index
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.CONCEPT_INDEX_WORKERS), thread_name_prefix="concepts"
+        )
+        self._futures: Set[Future] = set()
+        self._futures_lock = threading.Lock()
+
+    def schedule(self, pdf_id: str, runs: Iterable[Window], replace: bool = False) -> int:
+        """Queue the windows covering ``runs`` of freshly ingested pages; returns how many.
+
+        With ``replace`` the PDF's existing index is dropped first (a new document).
+        """
+        runs = list(runs)
+        budget = min(settings.CONCEPT_INDEX_WINDOW_CHARS, MAX_TEXT_CHARS)
+        windows = concept_windows(runs, self._page_chars(pdf_id, runs), budget)
+        if replace:
+            self.index.remove(pdf_id)
+        for window, token in self.index.mark_pending(pdf_id, windows).items():
+            self._submit(pdf_id, window, token)
+        return len(windows)
+
+    def resume_pending(self) -> int:
+        """Requeue windows a previous process left pending, plus any that failed."""
+        windows = self.index.unfinished()
+        for pdf_id, window, token in windows:
+            self._submit(pdf_id, window, token)
+        if windows:
+            logger.info("Resumed concept indexing for %d window(s)", len(windows))
+        return len(windows)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued windows are indexed; False if ``timeout`` expired first."""
+        with self._futures_lock:
+            futures = list(self._futures)
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _page_chars(self, pdf_id: str, runs: List[Window]) -> Dict[int, float]:
+        """Approximate text length per page, spreading each stored chunk over the pages it spans."""
+        chars: Dict[int, float] = {}
+        for run_start, run_end in runs:
+            results = self.generator.rag.fetch_pages(pdf_id, run_start, run_end)
+            for document, metadata in zip(results["documents"], results["metadatas"]):
+                first = max(metadata["page_start"], run_start)
+                last = min(metadata["page_end"], run_end)
+                share = len(document) / max(1, last - first + 1)
+                for page in range(first, last + 1):
+                    chars[page] = chars.get(page, 0.0) + share
+        return chars
+
+    def _submit(self, pdf_id: str, window: Window, token: str):
+        future = self._executor.submit(self._index_window, pdf_id, window, token)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future: Future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    @metrics.timed("concepts.index_window")
+    def _index_window(self, pdf_id: str, window: Window, token: str):
+        try:
+            text = self.generator.rag.page_context(pdf_id, *window).joined("\n\n")
+            concepts = (
+                self.generator.concept_extractor.extract(
+                    text, settings.CONCEPT_INDEX_CONCEPTS_PER_WINDOW, background=True
+                )
+                if text
+                else []
+            )
+            embeddings = self.generator.embedder.encode(concepts)
+            stored = self.index.store(pdf_id, window, token, concepts, embeddings)
+        except Exception:
+            logger.exception("Concept indexing failed for %s pages %d-%d", pdf_id, *window)
+            self.index.mark_failed(pdf_id, window, token)
+            WINDOWS_INDEXED.inc(result="failed")
+            return
+        WINDOWS_INDEXED.inc(result="ready" if stored else "stale")
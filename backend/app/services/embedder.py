@@ -1,28 +1,219 @@
 """Sentence-transformer embedding helper."""
 
+import asyncio
+import inspect
+import logging
+import re
 from functools import lru_cache
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from app.config import settings
+from app.services import metrics
+from app.services.embedding_cache import EmbeddingCache, text_hash
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ENCODED_TEXTS = metrics.counter(
+    "msq_embedded_texts_total", "Texts run through the embedding model (cache misses).", labels=("backend",)
+)
+
+
+class OnnxEncoder:
+    """Runs the sentence-transformer's transformer under ONNX Runtime with mean pooling.
+
+    Matches ``SentenceTransformer.encode`` for Transformer + mean-Pooling models
+    such as all-MiniLM-L6-v2. The model is exported once to ``model_dir`` and,
+    with ``quantize``, converted to dynamic int8 weights for CPU inference.
+    """
+
+    def __init__(self, model: SentenceTransformer, model_dir: Path, quantize: bool = False):
+        try:
+            import onnxruntime
+        except ImportError as exc:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx requires the onnxruntime package") from exc
+
+        self.tokenizer = model.tokenizer
+        self.max_seq_length = model.max_seq_length
+        path = self._export(model, model_dir, quantize)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        logger.info("Loaded ONNX embedder from %s", path)
+
+    @staticmethod
+    def _export(model: SentenceTransformer, model_dir: Path, quantize: bool) -> Path:
+        model_dir.mkdir(parents=True, exist_ok=True)
+        fp32_path = model_dir / "model.onnx"
+        if not fp32_path.exists():
+            import torch
+
+            transformer = model[0].auto_model
+            transformer.eval()
+            sample = model.tokenizer(["export"], return_tensors="pt")
+            names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+            axes = {name: {0: "batch", 1: "sequence"} for name in [*names, "last_hidden_state"]}
+            # Newer torch defaults to the dynamo exporter (needs onnxscript, ignores opset 14).
+            extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+            with torch.no_grad():
+                torch.onnx.export(
+                    transformer,
+                    tuple(sample[name] for name in names),
+                    str(fp32_path),
+                    input_names=names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=axes,
+                    opset_version=14,
+                    **extra,
+                )
+        if not quantize:
+            return fp32_path
+
+        int8_path = model_dir / "model-int8.onnx"
+        if not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        return int8_path
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        # Length-sorted batches keep padding, and so wasted compute, to a minimum.
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        pooled = []
+        for start in range(0, len(order), batch_size):
+            batch = [texts[idx] for idx in order[start : start + batch_size]]
+            features = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: features[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            pooled.append((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+        embeddings = np.empty((len(texts), pooled[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(pooled)
+        return embeddings
 
 
 class EmbedderService:
-    """Singleton-style embedder wrapper with caching."""
+    """Singleton-style embedder wrapper with caching.
+
+    ``settings.EMBEDDING_BACKEND`` selects plain sentence-transformers
+    (``torch``) or ONNX Runtime (``onnx``, ``onnx-int8``); either way
+    :meth:`encode` returns a contiguous float32 array.
+    """
 
     def __init__(self):
+        self.backend = settings.EMBEDDING_BACKEND.lower()
+        if self.backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND: {settings.EMBEDDING_BACKEND!r}")
         self.model = self._load_model()
+        self.onnx = self._load_onnx(self.backend) if self.backend != "torch" else None
+        self.cache = (
+            self._load_cache(self.model_key, self.dimension) if settings.EMBEDDING_CACHE_ENABLED else None
+        )
 
     @staticmethod
     @lru_cache(maxsize=1)
     def _load_model():
         return SentenceTransformer(settings.EMBEDDING_MODEL)
 
-    def encode(self, texts: List[str]) -> List[List[float]]:
-        """Return list of embeddings for the provided texts."""
-        if not isinstance(texts, list):
-            texts = [texts]
-        embeddings = self.model.encode(texts)
-        return [emb.tolist() for emb in embeddings]
+    @staticmethod
+    @lru_cache(maxsize=2)
+    def _load_onnx(backend: str) -> OnnxEncoder:
+        model_dir = Path(settings.EMBEDDING_ONNX_DIR) / re.sub(r"[^\w.-]", "_", settings.EMBEDDING_MODEL)
+        return OnnxEncoder(EmbedderService._load_model(), model_dir, quantize=backend == "onnx-int8")
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def _load_cache(model_key: str, dimension: int) -> EmbeddingCache:
+        # One instance per model key: appends to the vector file must not interleave.
+        return EmbeddingCache(
+            settings.EMBEDDING_CACHE_DIR,
+            model_key,
+            dimension,
+            memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+            max_rows=settings.EMBEDDING_CACHE_MAX_ROWS,
+        )
+
+    @property
+    def model_key(self) -> str:
+        """Identifies the vector space: model, backend and normalization."""
+        normalization = "normalized" if settings.EMBEDDING_NORMALIZE else "raw"
+        return f"{settings.EMBEDDING_MODEL}:{self.backend}:{normalization}"
+
+    @property
+    def tokenizer(self):
+        """The model's own tokenizer, used for token-aware chunking."""
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        """Word-pieces per input, including special tokens; longer text is truncated."""
+        return self.model.max_seq_length
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    @metrics.timed("embedder.encode")
+    def encode(self, texts: Union[str, Sequence[str]]) -> np.ndarray:
+        """Return a ``(len(texts), dimension)`` float32 array of embeddings.
+
+        Texts already in the embedding cache are not re-encoded; only unseen
+        texts (each once) go through the model.
+        """
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self.cache is None:
+            return self._encode(texts)
+
+        hashes = [text_hash(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = self.cache.lookup(hashes)
+        missing = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+        if missing:
+            fresh = self._encode(list(missing.values()))
+            self.cache.store(list(missing), fresh)
+            vectors.update(zip(missing, fresh))
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for idx, key in enumerate(hashes):
+            embeddings[idx] = vectors[key]
+        return embeddings
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hit/miss counters of the embedding cache, or None when it is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    @metrics.timed("embedder.model")
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        ENCODED_TEXTS.inc(len(texts), backend=self.backend)
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        if self.onnx is not None:
+            embeddings = self.onnx.encode(texts, batch_size)
+            if settings.EMBEDDING_NORMALIZE:
+                embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=settings.EMBEDDING_NORMALIZE,
+                show_progress_bar=False,
+            )
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
 
+    async def aencode(self, texts: Union[str, Sequence[str]]) -> np.ndarray:
+        """Run :meth:`encode` in a worker thread so the event loop stays free."""
+        return await asyncio.to_thread(self.encode, texts)
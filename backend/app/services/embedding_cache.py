@@ -0,0 +1,191 @@
+"""Persistent embedding cache: memory LRU over a memory-mapped float32 file with a SQLite index."""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Row lookups are issued in batches to stay under SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings keyed by ``(model_key, SHA-256 of text)``.
+
+    Vectors are appended as raw float32 rows to ``<directory>/<model_key>.f32``
+    and located through ``index.sqlite3``; reads go through ``np.memmap`` so the
+    file is never loaded whole. ``model_key`` should capture everything that
+    changes the vectors (model, backend, normalization).
+
+    Several processes (the server and the CLI) may share a directory: each
+    append takes an exclusive ``flock`` on the vectors file and numbers its
+    rows from the file's actual size, not from a per-process counter.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        model_key: str,
+        dimension: int,
+        memory_entries: int,
+        max_rows: int,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model_key = model_key
+        self.dimension = dimension
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        slug = re.sub(r"[^\w.-]", "_", model_key)
+        self.vectors_path = self.directory / f"{slug}.f32"
+        self._row_bytes = dimension * np.dtype(np.float32).itemsize
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._mmap: Optional[np.memmap] = None
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+        self._conn = sqlite3.connect(str(self.directory / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, row INTEGER NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        self._rows = self._recover_rows()
+
+    def lookup(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vector for every hash that has one."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            pending = []
+            for key in dict.fromkeys(hashes):
+                vector = self._memory.get(key)
+                if vector is None:
+                    pending.append(key)
+                    continue
+                self._memory.move_to_end(key)
+                found[key] = vector
+
+            rows: Dict[str, int] = {}
+            for start in range(0, len(pending), _LOOKUP_BATCH):
+                batch = pending[start : start + _LOOKUP_BATCH]
+                rows.update(
+                    self._conn.execute(
+                        "SELECT text_hash, row FROM embeddings WHERE model = ? "
+                        f"AND text_hash IN ({', '.join('?' for _ in batch)})",
+                        [self.model_key, *batch],
+                    ).fetchall()
+                )
+            if rows:
+                keys = list(rows)
+                vectors = self._map(max(rows.values()) + 1)[[rows[key] for key in keys]]
+                for key, vector in zip(keys, vectors):
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            self._stats["memory_hits"] += len(found) - len(rows)
+            self._stats["disk_hits"] += len(rows)
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(pending) - len(rows)
+        return found
+
+    def store(self, hashes: List[str], embeddings: np.ndarray):
+        """Append new vectors; beyond ``max_rows`` they are only kept in memory."""
+        with self._lock:
+            for key, vector in zip(hashes, embeddings):
+                self._remember(key, vector.copy())
+            if not hashes:
+                return
+            with self._locked_vectors() as handle:
+                # Another process may have appended since we last looked.
+                rows = self._file_rows(handle)
+                capacity = self.max_rows - rows
+                if capacity > 0:
+                    hashes = hashes[:capacity]
+                    block = np.ascontiguousarray(embeddings[: len(hashes)], dtype=np.float32)
+                    # Vectors are written before the index so a crash can only orphan rows.
+                    handle.write(block.tobytes())
+                    handle.flush()
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (model, text_hash, row) VALUES (?, ?, ?)",
+                        [(self.model_key, key, rows + idx) for idx, key in enumerate(hashes)],
+                    )
+                    self._conn.commit()
+                    rows += len(hashes)
+                    self._stats["stores"] += len(hashes)
+            self._rows = rows
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["rows"] = self._rows
+        return stats
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _map(self, needed: int) -> np.memmap:
+        """Map at least ``needed`` rows, picking up rows appended by other processes."""
+        if self._mmap is None or len(self._mmap) < needed:
+            self._rows = max(self._rows, self.vectors_path.stat().st_size // self._row_bytes)
+            self._mmap = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(self._rows, self.dimension)
+            )
+        return self._mmap
+
+    @contextmanager
+    def _locked_vectors(self) -> Iterator[BinaryIO]:
+        """The vectors file opened for appending under an exclusive cross-process lock."""
+        with self.vectors_path.open("a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield handle
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _file_rows(self, handle: BinaryIO) -> int:
+        """Complete rows in the locked file; a partial trailing row (crashed writer) is dropped."""
+        size = os.fstat(handle.fileno()).st_size
+        rows = size // self._row_bytes
+        if size % self._row_bytes:
+            logger.warning("Truncating partial row in %s", self.vectors_path)
+            handle.truncate(rows * self._row_bytes)
+        return rows
+
+    def _recover_rows(self) -> int:
+        """Drop a partially written trailing row and index entries past the end of the file."""
+        with self._locked_vectors() as handle:
+            rows = self._file_rows(handle)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE model = ? AND row >= ?", (self.model_key, rows)
+            )
+            self._conn.commit()
+        return rows
@@ -0,0 +1,323 @@
+"""Content-addressed PDF ingestion with duplicate detection and incremental page ranges."""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.pdf_processor import PDFProcessor
+
+if TYPE_CHECKING:
+    from app.services.concept_index import ConceptIndexer
+    from app.services.mcq_generator import MCQGenerator
+
+logger = logging.getLogger(__name__)
+
+# Called with (phase, pages_done, pages_total); phases are extracting/chunking/embedding/storing.
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def file_sha256(file_path: Path, block_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size blocks so large PDFs are never fully loaded."""
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def page_runs(pages: Iterable[int]) -> List[Tuple[int, int]]:
+    """Collapse page numbers into sorted inclusive ``(start, end)`` runs."""
+    runs: List[Tuple[int, int]] = []
+    for page in sorted(set(pages)):
+        if runs and page == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+@dataclass
+class DocumentRecord:
+    """A PDF known to the RAG store, identified by the SHA-256 of its bytes."""
+
+    content_hash: str
+    pdf_id: str
+    title: str
+    total_pages: int
+
+
+@dataclass
+class IngestResult:
+    """Outcome of one ingestion call."""
+
+    pdf_id: str
+    content_hash: str
+    total_pages: int
+    page_range: Tuple[int, int]
+    chunks_created: int
+    status: str
+
+
+class _ProgressTracker:
+    """Turns page iteration and pipeline phase changes into progress callbacks."""
+
+    def __init__(self, callback: Optional[ProgressCallback], pages_total: int):
+        self.callback = callback
+        self.pages_total = pages_total
+        self.pages_done = 0
+
+    def track(self, records: Iterable[Tuple[int, str]], run_start: int) -> Iterator[Tuple[int, str]]:
+        done_before = self.pages_done
+        for page_number, text in records:
+            self.pages_done = done_before + page_number - run_start + 1
+            self.phase("extracting")
+            yield page_number, text
+
+    def finish_run(self, run_start: int, run_end: int, done_before: int):
+        self.pages_done = done_before + run_end - run_start + 1
+
+    def phase(self, phase: str):
+        if self.callback is not None:
+            self.callback(phase, self.pages_done, self.pages_total)
+
+
+class DocumentManifest:
+    """SQLite record of ingested documents and the pages already embedded for each."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                pdf_id TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                total_pages INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingested_pages (
+                pdf_id TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                PRIMARY KEY (pdf_id, page)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def find_by_hash(self, content_hash: str) -> Optional[DocumentRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, pdf_id, title, total_pages FROM documents WHERE content_hash = ?",
+                (content_hash,),
+            ).fetchone()
+        return DocumentRecord(*row) if row else None
+
+    def find_by_pdf_id(self, pdf_id: str) -> Optional[DocumentRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, pdf_id, title, total_pages FROM documents WHERE pdf_id = ?",
+                (pdf_id,),
+            ).fetchone()
+        return DocumentRecord(*row) if row else None
+
+    def register(self, record: DocumentRecord):
+        """Insert or replace a document; a replaced pdf_id loses its page history."""
+        with self._lock:
+            self._conn.execute("DELETE FROM ingested_pages WHERE pdf_id = ?", (record.pdf_id,))
+            self._conn.execute(
+                "DELETE FROM documents WHERE pdf_id = ? OR content_hash = ?",
+                (record.pdf_id, record.content_hash),
+            )
+            self._conn.execute(
+                "INSERT INTO documents (content_hash, pdf_id, title, total_pages, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (record.content_hash, record.pdf_id, record.title, record.total_pages, time.time()),
+            )
+            self._conn.commit()
+
+    def ingested_pages(self, pdf_id: str) -> Set[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page FROM ingested_pages WHERE pdf_id = ?", (pdf_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_pages(self, pdf_id: str, pages: Iterable[int]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO ingested_pages (pdf_id, page) VALUES (?, ?)",
+                [(pdf_id, page) for page in pages],
+            )
+            self._conn.commit()
+
+
+class IngestionService:
+    """Keys ingestion on the PDF's SHA-256 so re-uploads only embed pages not seen before.
+
+    With a ``concept_indexer``, newly stored pages are queued for background
+    concept extraction once their chunks are in the vector store.
+    """
+
+    def __init__(
+        self,
+        generator: "MCQGenerator",
+        processor: PDFProcessor,
+        manifest: Optional[DocumentManifest] = None,
+        concept_indexer: Optional["ConceptIndexer"] = None,
+    ):
+        self.generator = generator
+        self.processor = processor
+        self.manifest = manifest or DocumentManifest(settings.INGEST_MANIFEST_PATH)
+        self.concept_indexer = concept_indexer
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def ingest(
+        self,
+        pdf_path: Path,
+        title: str,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        pdf_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> IngestResult:
+        """
+        Ingest a PDF, reusing any earlier ingestion of the same bytes.
+
+        Args:
+            pdf_path: path to the PDF on disk.
+            title: human-readable name stored as collection metadata.
+            page_start: optional inclusive start page.
+            page_end: optional inclusive end page.
+            pdf_id: identifier to use if the content has never been seen.
+            content_hash: precomputed SHA-256 of the file, if already known.
+            progress: optional callback receiving (phase, pages_done, pages_total).
+
+        Returns:
+            IngestResult whose ``status`` is ``"processed"`` for new documents,
+            ``"extended"`` when new pages were appended, or ``"duplicate"``
+            when every requested page was already stored.
+        """
+        content_hash = content_hash or file_sha256(pdf_path)
+        with self._lock_for(content_hash):
+            record = self.manifest.find_by_hash(content_hash)
+            if record is not None:
+                return self._extend(record, pdf_path, page_start, page_end, progress)
+            return self._ingest_new(pdf_path, title, content_hash, page_start, page_end, pdf_id, progress)
+
+    def known_pdf_id(self, content_hash: str) -> Optional[str]:
+        """Return the pdf_id already assigned to this content, if any."""
+        record = self.manifest.find_by_hash(content_hash)
+        return record.pdf_id if record else None
+
+    async def aingest(
+        self,
+        pdf_path: Path,
+        title: str,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        pdf_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> IngestResult:
+        """Run :meth:`ingest` in a worker thread."""
+        return await asyncio.to_thread(
+            self.ingest, pdf_path, title, page_start, page_end, pdf_id, content_hash
+        )
+
+    def _ingest_new(
+        self,
+        pdf_path: Path,
+        title: str,
+        content_hash: str,
+        page_start: Optional[int],
+        page_end: Optional[int],
+        pdf_id: Optional[str],
+        progress: Optional[ProgressCallback],
+    ) -> IngestResult:
+        pdf_id = pdf_id or str(uuid.uuid4())
+        with self.processor.open(pdf_path) as document:
+            total_pages = document.total_pages
+            page_range = document.clamp_range(page_start, page_end)
+            metadata = {
+                "title": title,
+                "total_pages": total_pages,
+                "ingested_range": f"{page_range[0]}-{page_range[1]}",
+                "content_hash": content_hash,
+            }
+            tracker = _ProgressTracker(progress, page_range[1] - page_range[0] + 1)
+            pages = tracker.track(document.iter_pages(*page_range), page_range[0])
+            chunks_created = self.generator.process_pages_to_rag(
+                pages, pdf_id=pdf_id, metadata=metadata, on_phase=tracker.phase
+            )
+        self.manifest.register(DocumentRecord(content_hash, pdf_id, title, total_pages))
+        self.manifest.mark_pages(pdf_id, range(page_range[0], page_range[1] + 1))
+        if self.concept_indexer is not None:
+            self.concept_indexer.schedule(pdf_id, [page_range], replace=True)
+        return IngestResult(pdf_id, content_hash, total_pages, page_range, chunks_created, "processed")
+
+    def _extend(
+        self,
+        record: DocumentRecord,
+        pdf_path: Path,
+        page_start: Optional[int],
+        page_end: Optional[int],
+        progress: Optional[ProgressCallback],
+    ) -> IngestResult:
+        page_range = PDFProcessor.clamp_range(record.total_pages, page_start, page_end)
+        requested = set(range(page_range[0], page_range[1] + 1))
+        ingested = self.manifest.ingested_pages(record.pdf_id)
+        missing = requested - ingested
+        if not missing:
+            self._backfill_concepts(record.pdf_id, ingested)
+            return IngestResult(
+                record.pdf_id, record.content_hash, record.total_pages, page_range, 0, "duplicate"
+            )
+
+        metadata = {
+            "title": record.title,
+            "total_pages": record.total_pages,
+            "content_hash": record.content_hash,
+        }
+        chunks_created = 0
+        tracker = _ProgressTracker(progress, len(missing))
+        # Chunk each contiguous run separately so no chunk spans a gap of unseen pages.
+        with self.processor.open(pdf_path) as document:
+            for run_start, run_end in page_runs(missing):
+                done_before = tracker.pages_done
+                chunks_created += self.generator.process_pages_to_rag(
+                    tracker.track(document.iter_pages(run_start, run_end), run_start),
+                    pdf_id=record.pdf_id,
+                    metadata=metadata,
+                    append=True,
+                    on_phase=tracker.phase,
+                )
+                tracker.finish_run(run_start, run_end, done_before)
+        self.manifest.mark_pages(record.pdf_id, missing)
+        logger.info("Extended %s with %d new pages", record.pdf_id, len(missing))
+        if self.concept_indexer is not None:
+            self.concept_indexer.schedule(record.pdf_id, page_runs(missing))
+        return IngestResult(
+            record.pdf_id, record.content_hash, record.total_pages, page_range, chunks_created, "extended"
+        )
+
+    def _backfill_concepts(self, pdf_id: str, pages: Set[int]):
+        """Index a PDF ingested before the concept index existed when it is uploaded again."""
+        if self.concept_indexer is not None and not self.concept_indexer.index.has(pdf_id):
+            windows = self.concept_indexer.schedule(pdf_id, page_runs(pages))
+            logger.info("Queued %d concept index window(s) for existing PDF %s", windows, pdf_id)
+
+    def _lock_for(self, content_hash: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(content_hash, threading.Lock())
@@ -0,0 +1,207 @@
+"""Background ingestion jobs with SQLite-persisted status for polling."""
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.services.ingestion import IngestionService
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = (
+    "job_id",
+    "status",
+    "phase",
+    "pdf_id",
+    "pdf_path",
+    "filename",
+    "content_hash",
+    "page_start",
+    "page_end",
+    "pages_total",
+    "pages_done",
+    "chunks_created",
+    "result_status",
+    "error",
+    "created_at",
+    "started_at",
+    "updated_at",
+    "finished_at",
+)
+
+# Progress writes are throttled unless the phase changes.
+PROGRESS_FLUSH_SECONDS = 0.5
+
+
+class JobStore:
+    """SQLite table of ingestion jobs so queued work and status survive restarts."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, phase TEXT, pdf_id TEXT, "
+            "pdf_path TEXT NOT NULL, filename TEXT NOT NULL, content_hash TEXT, "
+            "page_start INTEGER, page_end INTEGER, pages_total INTEGER DEFAULT 0, "
+            "pages_done INTEGER DEFAULT 0, chunks_created INTEGER DEFAULT 0, result_status TEXT, "
+            "error TEXT, created_at REAL NOT NULL, started_at REAL, updated_at REAL, finished_at REAL)"
+        )
+        self._conn.commit()
+
+    def create(self, **fields) -> Dict:
+        now = time.time()
+        job = {column: None for column in JOB_COLUMNS}
+        job.update(pages_total=0, pages_done=0, chunks_created=0)
+        job.update(fields)
+        job.update(job_id=job["job_id"] or uuid.uuid4().hex, status="queued", created_at=now, updated_at=now)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO ingest_jobs ({', '.join(JOB_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in JOB_COLUMNS)})",
+                [job[column] for column in JOB_COLUMNS],
+            )
+            self._conn.commit()
+        return job
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE ingest_jobs SET {assignments} WHERE job_id = ?",
+                [*fields.values(), job_id],
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def unfinished(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs "
+                "WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+
+class IngestionJobManager:
+    """Runs :meth:`IngestionService.ingest` on a bounded worker pool and records progress."""
+
+    def __init__(self, ingestion: "IngestionService", store: Optional[JobStore] = None):
+        self.ingestion = ingestion
+        self.store = store or JobStore(settings.INGEST_JOBS_DB_PATH)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.INGEST_JOB_WORKERS), thread_name_prefix="ingest"
+        )
+
+    def submit(
+        self,
+        pdf_path: Path,
+        filename: str,
+        pdf_id: str,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        pages_total: int = 0,
+    ) -> Dict:
+        """Persist a queued job and schedule it; returns the job record immediately."""
+        job = self.store.create(
+            job_id=uuid.uuid4().hex,
+            pdf_id=pdf_id,
+            pdf_path=str(pdf_path),
+            filename=filename,
+            content_hash=content_hash,
+            page_start=page_start,
+            page_end=page_end,
+            pages_total=pages_total,
+        )
+        self._executor.submit(self._run, job["job_id"])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def resume_pending(self) -> int:
+        """Requeue jobs left queued or running by a previous process."""
+        jobs = self.store.unfinished()
+        for job in jobs:
+            self.store.update(job["job_id"], status="queued", phase=None, pages_done=0)
+            self._executor.submit(self._run, job["job_id"])
+        if jobs:
+            logger.info("Resumed %d ingestion job(s)", len(jobs))
+        return len(jobs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        self.store.update(job_id, status="running", started_at=time.time())
+        last_flush = 0.0
+        last_phase = None
+
+        def report(phase: str, pages_done: int, pages_total: int):
+            nonlocal last_flush, last_phase
+            now = time.monotonic()
+            if phase == last_phase and now - last_flush < PROGRESS_FLUSH_SECONDS:
+                return
+            last_flush, last_phase = now, phase
+            self.store.update(job_id, phase=phase, pages_done=pages_done, pages_total=pages_total)
+
+        try:
+            result = self.ingestion.ingest(
+                Path(job["pdf_path"]),
+                title=job["filename"],
+                page_start=job["page_start"],
+                page_end=job["page_end"],
+                pdf_id=job["pdf_id"],
+                content_hash=job["content_hash"],
+                progress=report,
+            )
+        except Exception as exc:
+            logger.exception("Ingestion job %s failed", job_id)
+            self.store.update(job_id, status="failed", error=str(exc), finished_at=time.time())
+            return
+
+        pages = result.page_range[1] - result.page_range[0] + 1
+        self.store.update(
+            job_id,
+            status="completed",
+            phase="done",
+            pdf_id=result.pdf_id,
+            pages_total=pages,
+            pages_done=pages,
+            chunks_created=result.chunks_created,
+            result_status=result.status,
+            finished_at=time.time(),
+        )
+
+
+def estimate_eta(job: Dict, now: Optional[float] = None) -> Optional[float]:
+    """Seconds remaining, extrapolated from page throughput so far."""
+    if job.get("status") != "running" or not job.get("started_at"):
+        return None
+    pages_done = job.get("pages_done") or 0
+    pages_total = job.get("pages_total") or 0
+    if pages_done <= 0 or pages_total <= 0:
+        return None
+    elapsed = (now or time.time()) - job["started_at"]
+    return max(0.0, elapsed * (pages_total - pages_done) / pages_done)
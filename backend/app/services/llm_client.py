@@ -1,9 +1,647 @@
-"""Shared Gemini client and model configuration."""
+"""Shared Gemini client, model configuration, response cache and call limits."""
 
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
 from google import genai
+from google.genai import types
 
 from app.config import settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
 
 GEMINI_MODEL = getattr(settings, "GEMINI_MODEL", "gemini-2.5-flash")
-genai_client = genai.Client(api_key=settings.GEMINI_API_KEY)
 
+LLM_REQUESTS = metrics.counter(
+    "msq_llm_requests_total", "Gemini attempts by outcome (ok, error, cached).", labels=("outcome",)
+)
+LLM_TOKENS = metrics.counter(
+    "msq_llm_tokens_total", "Gemini tokens reported in usage metadata.", labels=("kind",)
+)
+LLM_SECONDS = metrics.histogram("msq_llm_request_seconds", "Gemini request latency, cache hits excluded.")
+LLM_RETRIES = metrics.counter(
+    "msq_llm_retries_total", "Gemini attempts retried, by status or error.", labels=("reason",)
+)
+LLM_RATE_LIMIT_WAIT = metrics.histogram(
+    "msq_llm_rate_limit_wait_seconds", "Time callers waited on the client-side Gemini rate limiter."
+)
+LLM_CIRCUIT_REJECTIONS = metrics.counter(
+    "msq_llm_circuit_rejections_total", "Gemini calls refused while the circuit breaker was open."
+)
+LLM_BACKGROUND_WAIT = metrics.histogram(
+    "msq_llm_background_wait_seconds", "Time background Gemini calls yielded to interactive ones."
+)
+
+_genai_client: Optional[genai.Client] = None
+_genai_client_lock = threading.Lock()
+
+
+def get_genai_client() -> genai.Client:
+    """Create the shared Gemini client on first use."""
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                _genai_client = genai.Client(
+                    api_key=settings.GEMINI_API_KEY,
+                    http_options=types.HttpOptions(timeout=int(settings.GEMINI_TIMEOUT_SECONDS * 1000)),
+                )
+    return _genai_client
+
+
+def cache_key(model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Stable SHA-256 over everything that influences a Gemini response."""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "config": config or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLRUCache:
+    """Thread-safe in-process LRU tier with per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, stored_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """Disk tier backed by SQLite with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return ``(value, created_at)`` or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], row[1]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+                )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) cache for Gemini response text."""
+
+    def __init__(
+        self,
+        memory_entries: int,
+        disk_path: Optional[str],
+        disk_entries: int,
+        ttl_seconds: float,
+    ):
+        self.memory = MemoryLRUCache(memory_entries, ttl_seconds)
+        self.disk = SQLiteCache(disk_path, disk_entries, ttl_seconds) if disk_path else None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits", "memory_hits")
+            return value
+        if self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                value, created_at = row
+                self.memory.set(key, value, stored_at=created_at)
+                self._count("hits", "disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("stores")
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of hit/miss counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._stats[name] += 1
+
+
+response_cache: Optional[ResponseCache] = (
+    ResponseCache(
+        memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+        disk_path=settings.LLM_CACHE_PATH or None,
+        disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    )
+    if settings.LLM_CACHE_ENABLED
+    else None
+)
+
+
+metrics.register_collector(
+    lambda: metrics.cache_samples(
+        "msq_llm_response_cache",
+        "Gemini response cache lookups and stores.",
+        response_cache.stats() if response_cache else None,
+    )
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Client-side rate limiter: ``rate`` calls per second with bursts up to ``capacity``.
+
+    Callers reserve a token up front and are told how long to wait for it, so
+    nobody sleeps while holding the lock and waiters are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def drain(self):
+        """Drop any burst allowance after the server says we are over quota."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+    def available(self) -> float:
+        """Tokens that could be taken right now without waiting."""
+        if self.rate <= 0:
+            return float("inf")
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.monotonic() - self._updated) * self.rate)
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight Gemini calls across threads and event loops alike.
+
+    A plain ``asyncio.Semaphore`` is bound to one loop and cannot be shared
+    with the synchronous callers (CLI, worker threads); here a released slot
+    is handed straight to the oldest waiter, whether it is a thread or a task.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._active = 0
+        self._waiters: "deque" = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self):
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = future in self._waiters
+                if queued:
+                    self._waiters.remove(future)
+            # Handed a slot just before the cancellation landed: pass it on.
+            if not queued and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+                    return
+            self._active -= 1
+
+    def _hand_over(self, future: "asyncio.Future"):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class CircuitBreaker:
+    """Stops calling Gemini after ``threshold`` consecutive failures, for ``cooldown`` seconds.
+
+    After the cooldown a single probe call is let through (half-open); its
+    success closes the circuit and its failure re-opens it. A probe that ends
+    without either (cancelled) hands the probe to the next call, and a probe
+    that never reports back stops blocking others after another cooldown.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Raise :class:`CircuitOpenError` unless a call may go out now; True if it is the probe."""
+        if self.threshold <= 0:
+            return False
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            # While half-open, ``_opened_at`` is when the probe started.
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            remaining = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+        LLM_CIRCUIT_REJECTIONS.inc()
+        raise CircuitOpenError(f"Gemini circuit is open; retry in {remaining:.0f}s")
+
+    def end_probe(self):
+        """Called when a probe finishes; if it recorded no outcome, the next call probes at once."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic() - self.cooldown
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold > 0:
+                if self.state != self.OPEN:
+                    logger.warning("Gemini circuit opened after %d consecutive failures", self._failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class BackgroundGate:
+    """Holds background calls (ingest-time concept indexing) back while interactive calls run.
+
+    Interactive calls register for their whole duration, retries and waits
+    included. A background call goes out only when none are registered, no one
+    is queued for a concurrency slot and the token bucket still holds more than
+    half its burst, so it never takes quota an interactive caller is about to need.
+    """
+
+    def __init__(self, bucket: TokenBucket, limiter: ConcurrencyLimiter, poll_seconds: float = 0.25):
+        self.bucket = bucket
+        self.limiter = limiter
+        self.poll_seconds = poll_seconds
+        self._interactive = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def interactive(self) -> Iterator[None]:
+        with self._lock:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._interactive -= 1
+
+    def wait_turn(self):
+        """Block the calling (worker) thread until a background call may go out."""
+        started = time.monotonic()
+        while self._busy():
+            time.sleep(self.poll_seconds)
+        LLM_BACKGROUND_WAIT.observe(time.monotonic() - started)
+
+    def _busy(self) -> bool:
+        with self._lock:
+            interactive = self._interactive
+        return (
+            interactive > 0
+            or self.limiter.waiting > 0
+            or self.bucket.available() <= self.bucket.capacity / 2
+        )
+
+
+# Quota, overload and transient upstream errors; anything else (bad request, auth) fails at once.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+rate_limiter = TokenBucket(settings.GEMINI_RATE_LIMIT_RPM / 60.0, settings.GEMINI_RATE_LIMIT_BURST)
+concurrency_limiter = ConcurrencyLimiter(settings.GEMINI_MAX_CONCURRENCY)
+circuit_breaker = CircuitBreaker(settings.GEMINI_BREAKER_THRESHOLD, settings.GEMINI_BREAKER_COOLDOWN_SECONDS)
+background_gate = BackgroundGate(rate_limiter, concurrency_limiter)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_delay(exc: BaseException, attempt: int) -> Optional[float]:
+    """Account for a failed attempt; return the backoff before retrying, or None to give up."""
+    LLM_REQUESTS.inc(outcome="error")
+    status = _status_code(exc)
+    transient = isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError))
+    if transient or (status is not None and status >= 500):
+        circuit_breaker.record_failure()
+    else:
+        # The API answered, so it is reachable; a 429 slows every caller down instead.
+        circuit_breaker.record_success()
+        if status == 429:
+            rate_limiter.drain()
+    retryable = transient or status in RETRYABLE_STATUS
+    if not retryable or attempt >= settings.GEMINI_MAX_RETRIES:
+        return None
+    reason = str(status) if status is not None else type(exc).__name__
+    LLM_RETRIES.inc(reason=reason)
+    ceiling = min(settings.GEMINI_RETRY_MAX_SECONDS, settings.GEMINI_RETRY_BASE_SECONDS * 2**attempt)
+    delay = random.uniform(0, ceiling)
+    logger.warning("Gemini call failed (%s); retry %d in %.1fs", reason, attempt + 1, delay)
+    return delay
+
+
+def _record_usage(response, started: float):
+    """Count a completed Gemini call, its latency and reported token usage."""
+    circuit_breaker.record_success()
+    LLM_SECONDS.observe(time.perf_counter() - started)
+    LLM_REQUESTS.inc(outcome="ok")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attribute in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+        count = getattr(usage, attribute, None)
+        if count:
+            LLM_TOKENS.inc(count, kind=kind)
+
+
+def _call_gemini(prompt: str, config: Optional[Dict[str, Any]], model: str, background: bool = False):
+    """One logical Gemini call through the breaker, rate limiter, concurrency cap and retries.
+
+    A ``background`` call waits for its turn on :data:`background_gate` before every attempt.
+    """
+    attempt = 0
+    while True:
+        if background:
+            background_gate.wait_turn()
+        probe = circuit_breaker.before_call()
+        try:
+            wait = rate_limiter.reserve()
+            if wait:
+                LLM_RATE_LIMIT_WAIT.observe(wait)
+                time.sleep(wait)
+            concurrency_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = get_genai_client().models.generate_content(
+                    model=model, contents=prompt, config=config
+                )
+            except Exception as exc:
+                delay = _retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+            else:
+                _record_usage(response, started)
+                return response
+            finally:
+                concurrency_limiter.release()
+        finally:
+            if probe:
+                circuit_breaker.end_probe()
+        time.sleep(delay)
+        attempt += 1
+
+
+async def _acall_gemini(prompt: str, config: Optional[Dict[str, Any]], model: str):
+    """Async variant of :func:`_call_gemini`; waiting never blocks the event loop."""
+    attempt = 0
+    while True:
+        probe = circuit_breaker.before_call()
+        try:
+            wait = rate_limiter.reserve()
+            if wait:
+                LLM_RATE_LIMIT_WAIT.observe(wait)
+                await asyncio.sleep(wait)
+            await concurrency_limiter.aacquire()
+            started = time.perf_counter()
+            try:
+                response = await get_genai_client().aio.models.generate_content(
+                    model=model, contents=prompt, config=config
+                )
+            except Exception as exc:
+                delay = _retry_delay(exc, attempt)
+                if delay is None:
+                    raise
+            else:
+                _record_usage(response, started)
+                return response
+            finally:
+                concurrency_limiter.release()
+        finally:
+            # Cancelled (or failed before reaching Gemini) mid-probe: don't leave the circuit half-open.
+            if probe:
+                circuit_breaker.end_probe()
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _collect_limiter_samples():
+    state = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    return [
+        metrics.Sample(
+            "msq_llm_in_flight", "gauge", "Gemini calls currently in flight.", concurrency_limiter.active
+        ),
+        metrics.Sample(
+            "msq_llm_waiting", "gauge", "Callers queued for a Gemini concurrency slot.",
+            concurrency_limiter.waiting,
+        ),
+        metrics.Sample(
+            "msq_llm_circuit_state", "gauge", "Gemini circuit breaker (0 closed, 1 half-open, 2 open).",
+            state[circuit_breaker.state],
+        ),
+    ]
+
+
+metrics.register_collector(_collect_limiter_samples)
+
+
+def _is_cacheable(text: Optional[str], config: Optional[Dict[str, Any]]) -> bool:
+    """Only cache non-empty responses, and only well-formed JSON when JSON was requested."""
+    if not text:
+        return False
+    if (config or {}).get("response_mime_type") == "application/json":
+        try:
+            json.loads(text)
+        except ValueError:
+            return False
+    return True
+
+
+def generate_text(
+    prompt: str,
+    config: Optional[Dict[str, Any]] = None,
+    model: str = GEMINI_MODEL,
+    use_cache: bool = False,
+    background: bool = False,
+) -> str:
+    """Call Gemini and return the response text.
+
+    ``use_cache`` is opt-in so callers that rely on sampling randomness can
+    always hit the model. Retryable failures are retried with backoff; the
+    last error is raised, or :class:`CircuitOpenError` while the circuit is open.
+    ``background`` calls yield to interactive ones (see :class:`BackgroundGate`).
+    """
+    cache = response_cache if use_cache else None
+    key = cache_key(model, prompt, config) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            LLM_REQUESTS.inc(outcome="cached")
+            return cached
+
+    if background:
+        text = _call_gemini(prompt, config, model, background=True).text
+    else:
+        with background_gate.interactive():
+            text = _call_gemini(prompt, config, model).text
+    if cache and _is_cacheable(text, config):
+        cache.set(key, text)
+    return text
+
+
+async def agenerate_text(
+    prompt: str,
+    config: Optional[Dict[str, Any]] = None,
+    model: str = GEMINI_MODEL,
+    use_cache: bool = False,
+) -> str:
+    """Async variant of :func:`generate_text` using the non-blocking Gemini client."""
+    cache = response_cache if use_cache else None
+    key = cache_key(model, prompt, config) if cache else None
+    if cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(outcome="cached")
+            return cached
+
+    with background_gate.interactive():
+        text = (await _acall_gemini(prompt, config, model)).text
+    if cache and _is_cacheable(text, config):
+        await asyncio.to_thread(cache.set, key, text)
+    return text
@@ -1,46 +1,199 @@
 """Core MCQ generator orchestrating the RAG pipeline."""
 
+import asyncio
+import itertools
+import math
 import random
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
 import json
+import logging
 
 from app.config import settings
-from app.services.chunker import SmartChunker
+from app.services import metrics
+from app.services.chunker import SmartChunker, TokenChunker
+from app.services.concept_index import ConceptIndex
 from app.services.embedder import EmbedderService
-from app.services.rag_service import RAGService
+from app.services.rag_service import AsyncRAGService, PageRangeContext, RAGService
 from app.services.concept_extractor import ConceptExtractor
 from app.services.translator import TranslatorService
-from app.services.llm_client import genai_client, GEMINI_MODEL
+from app.services.llm_client import agenerate_text
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_REJECTS = metrics.counter(
+    "msq_mcq_validation_rejects_total", "MCQs dropped by structural validation.", labels=("stage",)
+)
+GENERATION_FAILURES = metrics.counter(
+    "msq_mcq_generation_failures_total", "Single-concept generations that errored or returned no JSON."
+)
+EXTRA_CONCEPTS = metrics.counter(
+    "msq_mcq_extra_concepts_total", "Backlog concepts started beyond the requested count (top-ups)."
+)
+CANCELLED_CONCEPTS = metrics.counter(
+    "msq_mcq_cancelled_concepts_total", "Concepts still in flight when the requested count was reached."
+)
+SHORTFALLS = metrics.counter(
+    "msq_mcq_shortfalls_total", "Requests that ended below the requested count (backlog or budget exhausted)."
+)
+BATCH_RETRIES = metrics.counter(
+    "msq_mcq_batch_retries_total", "Batch items retried as single-question calls after the batch missed them."
+)
+CONCEPT_SOURCES = metrics.counter(
+    "msq_mcq_concept_source_total", "Where request concepts came from (index or gemini).", labels=("source",)
+)
+
+
+def build_chunker(embedder: EmbedderService) -> SmartChunker:
+    """Return the chunker selected by ``settings.CHUNK_STRATEGY``."""
+    strategy = settings.CHUNK_STRATEGY.lower()
+    if strategy == "words":
+        return SmartChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+    if strategy == "tokens":
+        # Leave room for the [CLS]/[SEP] tokens the model adds itself.
+        limit = embedder.max_seq_length - 2
+        max_tokens = min(settings.CHUNK_MAX_TOKENS or limit, limit)
+        return TokenChunker(embedder.tokenizer, max_tokens, settings.CHUNK_TOKEN_OVERLAP)
+    raise ValueError(f"Unknown CHUNK_STRATEGY: {settings.CHUNK_STRATEGY!r}")
 
 
 class MCQGenerator:
     """Coordinates chunking, concept extraction, and bilingual MCQ creation."""
 
     def __init__(self):
-        self.chunker = SmartChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
         self.embedder = EmbedderService()
+        self.chunker = build_chunker(self.embedder)
         self.rag = RAGService()
+        self.async_rag = AsyncRAGService(self.rag)
+        self.concept_index = ConceptIndex(str(self.rag.store.root / "concept_index.sqlite3"))
         self.concept_extractor = ConceptExtractor()
         self.translator = TranslatorService()
 
-    def process_pdf_to_rag(self, pdf_text: str, pdf_id: str, metadata: Dict) -> int:
-        """Chunk, embed, and store PDF text in ChromaDB."""
+    @metrics.timed("ingest.text")
+    def process_pdf_to_rag(
+        self,
+        pdf_text: str,
+        pdf_id: str,
+        metadata: Dict,
+        append: bool = False,
+    ) -> int:
+        """Chunk, embed, and store PDF text in ChromaDB.
+
+        With ``append`` the chunks are added to the PDF's existing collection
+        instead of replacing it.
+        """
         chunks = self.chunker.chunk_text(pdf_text)
         if not chunks:
             raise ValueError("No readable text detected in PDF.")
 
-        self.rag.reset_collection(pdf_id, metadata=metadata)
+        if append:
+            self.rag.ensure_collection(pdf_id, metadata=metadata)
+            start_index = self.rag.count(pdf_id)
+        else:
+            self.rag.reset_collection(pdf_id, metadata=metadata)
+            start_index = 0
         embeddings = self.embedder.encode([chunk["text"] for chunk in chunks])
-        stored = self.rag.add_chunks(pdf_id, chunks, embeddings)
+        stored = self.rag.add_chunks(pdf_id, chunks, embeddings, start_index=start_index)
         return stored
 
-    def extract_concepts(self, pdf_id: str, page_start: int, page_end: int) -> List[str]:
-        """Use Gemini to pull 10-15 key concepts for the requested pages."""
-        results = self.rag.fetch_pages(pdf_id, page_start, page_end)
-        combined_text = "\n\n".join(results.get("documents", []))
+    @metrics.timed("ingest.pages")
+    def process_pages_to_rag(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        pdf_id: str,
+        metadata: Dict,
+        append: bool = False,
+        on_phase: Optional[Callable[[str], None]] = None,
+    ) -> int:
+        """Stream ``(page_number, text)`` records into ChromaDB with bounded memory.
+
+        Chunks are produced incrementally and embedded/stored in batches of
+        ``INGEST_BATCH_SIZE``, so peak memory does not grow with the PDF. An
+        empty append is allowed; an empty new document raises ``ValueError``.
+        ``on_phase`` is notified with ``"chunking"``, ``"embedding"`` and
+        ``"storing"`` as each batch moves through the pipeline. The existing
+        collection is only reset once the first chunk exists, so a PDF without
+        text leaves any earlier ingestion of the same ``pdf_id`` untouched.
+        """
+        chunks = self.chunker.iter_chunks(pages)
+        first = next(chunks, None)
+        if first is None:
+            if not append:
+                raise ValueError("No readable text detected in PDF.")
+            return 0
+
+        if append:
+            self.rag.ensure_collection(pdf_id, metadata=metadata)
+            start_index = self.rag.count(pdf_id)
+        else:
+            self.rag.reset_collection(pdf_id, metadata=metadata)
+            start_index = 0
+
+        notify = on_phase or (lambda _phase: None)
+        batch_size = max(1, settings.INGEST_BATCH_SIZE)
+        stored = 0
+        batch: List[Dict] = []
+        for chunk in itertools.chain([first], chunks):
+            if not batch:
+                notify("chunking")
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                stored += self._store_batch(pdf_id, batch, start_index + stored, notify)
+                batch = []
+        if batch:
+            stored += self._store_batch(pdf_id, batch, start_index + stored, notify)
+        return stored
+
+    def _store_batch(
+        self,
+        pdf_id: str,
+        chunks: List[Dict],
+        start_index: int,
+        notify: Callable[[str], None],
+    ) -> int:
+        notify("embedding")
+        embeddings = self.embedder.encode([chunk["text"] for chunk in chunks])
+        notify("storing")
+        return self.rag.add_chunks(pdf_id, chunks, embeddings, start_index=start_index)
+
+    async def aprocess_pdf_to_rag(
+        self,
+        pdf_text: str,
+        pdf_id: str,
+        metadata: Dict,
+        append: bool = False,
+    ) -> int:
+        """Async variant of :meth:`process_pdf_to_rag`; the CPU-bound work runs in a thread."""
+        return await asyncio.to_thread(self.process_pdf_to_rag, pdf_text, pdf_id, metadata, append)
+
+    def extract_concepts(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        context: Optional[PageRangeContext] = None,
+        max_concepts: int = 15,
+    ) -> List[str]:
+        """Use Gemini to pull up to ``max_concepts`` key concepts for the requested pages."""
+        context = context or self.rag.page_context(pdf_id, page_start, page_end)
+        combined_text = context.joined("\n\n")
+        if not combined_text:
+            return []
+        return self.concept_extractor.extract(combined_text, max_concepts)
+
+    async def aextract_concepts(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        context: Optional[PageRangeContext] = None,
+        max_concepts: int = 15,
+    ) -> List[str]:
+        """Async variant of :meth:`extract_concepts`."""
+        context = context or await self.async_rag.page_context(pdf_id, page_start, page_end)
+        combined_text = context.joined("\n\n")
         if not combined_text:
             return []
-        return self.concept_extractor.extract(combined_text)
+        return await self.concept_extractor.aextract(combined_text, max_concepts)
 
     def generate_mcqs(
         self,
@@ -49,47 +202,401 @@ class MCQGenerator:
         page_end: int,
         num_questions: int,
         difficulty: str,
+        context: Optional[PageRangeContext] = None,
+    ) -> List[Dict]:
+        """Primary entry point to build bilingual MCQs.
+
+        Synchronous wrapper around :meth:`agenerate_mcqs` for the CLI and
+        scripts; it must not be called from inside a running event loop.
+        """
+        return asyncio.run(
+            self.agenerate_mcqs(
+                pdf_id=pdf_id,
+                page_start=page_start,
+                page_end=page_end,
+                num_questions=num_questions,
+                difficulty=difficulty,
+                context=context,
+            )
+        )
+
+    @metrics.timed("mcq.generate")
+    async def agenerate_mcqs(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        num_questions: int,
+        difficulty: str,
+        context: Optional[PageRangeContext] = None,
     ) -> List[Dict]:
-        """Primary entry point to build bilingual MCQs."""
-        concepts = self.extract_concepts(pdf_id, page_start, page_end)
-        concepts_to_test = concepts[:num_questions]
-        mcqs: List[Dict] = []
-
-        for idx, concept in enumerate(concepts_to_test):
-            primary_text, page_reference = self._primary_context(pdf_id, page_start, page_end)
-            distractor_text = self._distractor_context(pdf_id, concept, (page_start, page_end))
-            mcq_payload = self._generate_single_mcq(
+        """Build bilingual MCQs without blocking the event loop.
+
+        Concepts come from the ingest-time concept index when the range is
+        indexed (see :meth:`_arequest_concepts`), and MCQs are generated
+        concurrently via :meth:`_iter_mcqs`, which tops up failed concepts from
+        a backlog until ``num_questions`` MCQs are in hand. Missing Mongolian
+        fields across all of them are then translated in one batched pass before
+        the final validation; MCQs still failing it are replaced from the unused
+        backlog. Results keep backlog
+        order and are numbered from 1. The page range is fetched once into a
+        :class:`PageRangeContext` (or taken from ``context``) and shared by
+        concept extraction and every question.
+        """
+        context = context or await self.async_rag.page_context(pdf_id, page_start, page_end)
+        concepts = await self._arequest_concepts(pdf_id, page_start, page_end, num_questions, context)
+
+        accepted: List[Tuple[int, Dict]] = []
+        drawn: Set[int] = set()
+        async for backlog_index, _, mcq_payload in self._iter_mcqs(
+            context, concepts, num_questions, difficulty, finalize=False
+        ):
+            drawn.add(backlog_index)
+            if mcq_payload:
+                accepted.append((backlog_index, mcq_payload))
+
+        # One translation pass for the whole request, then the final validation.
+        kept = {id(mcq) for mcq in await self._finalize_mcqs([mcq for _, mcq in accepted], context)}
+        rejected = sum(1 for _, mcq in accepted if id(mcq) not in kept)
+        accepted = [(idx, mcq) for idx, mcq in accepted if id(mcq) in kept]
+        if rejected:
+            # Only MCQs whose translation failed are replaced, finalizing each group as it lands.
+            remaining = [idx for idx in range(len(concepts)) if idx not in drawn]
+            async for position, _, mcq_payload in self._iter_mcqs(
+                context, [concepts[idx] for idx in remaining], rejected, difficulty
+            ):
+                if mcq_payload:
+                    accepted.append((remaining[position], mcq_payload))
+        accepted.sort(key=lambda item: item[0])
+
+        mcqs = [mcq for _, mcq in accepted]
+        for question_number, mcq in enumerate(mcqs, start=1):
+            mcq["question_number"] = question_number
+        return mcqs
+
+    async def astream_mcqs(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        num_questions: int,
+        difficulty: str,
+        context: Optional[PageRangeContext] = None,
+    ) -> AsyncIterator[Dict]:
+        """Yield generation events, emitting each MCQ as soon as it validates.
+
+        Every event is a dict with an ``event`` key:
+
+        - ``progress``: ``stage`` is ``"context"`` (with ``chunks``) or
+          ``"concepts"`` (with ``total`` and the ``backlog`` size).
+        - ``mcq``: a validated ``mcq`` plus ``completed``/``total`` counters.
+        - ``error``: a concept attempt that failed; a backlog concept replaces it.
+        - ``done``: final ``total_generated`` and ``total``.
+
+        MCQs arrive in completion order and ``question_number`` counts them
+        from 1, so numbers stay contiguous even when concepts are replaced.
+        """
+        context = context or await self.async_rag.page_context(pdf_id, page_start, page_end)
+        yield {"event": "progress", "stage": "context", "chunks": len(context.documents)}
+
+        concepts = await self._arequest_concepts(pdf_id, page_start, page_end, num_questions, context)
+        total = min(num_questions, len(concepts))
+        yield {"event": "progress", "stage": "concepts", "total": total, "backlog": len(concepts)}
+
+        generated = 0
+        async for _, concept, mcq_payload in self._iter_mcqs(context, concepts, num_questions, difficulty):
+            if mcq_payload:
+                generated += 1
+                yield {"event": "mcq", "mcq": mcq_payload, "completed": generated, "total": total}
+            else:
+                yield {
+                    "event": "error",
+                    "concept": concept,
+                    "detail": "MCQ generation or validation failed.",
+                    "completed": generated,
+                    "total": total,
+                }
+
+        yield {"event": "done", "total_generated": generated, "total": total}
+
+    async def _arequest_concepts(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        num_questions: int,
+        context: PageRangeContext,
+    ) -> List[str]:
+        """The concept backlog for a request: from the concept index, else extracted by Gemini.
+
+        The index is used when every window of the range is indexed and it
+        holds at least ``num_questions`` distinct concepts; until ingest-time
+        indexing catches up, concepts are extracted from ``context``.
+        """
+        max_concepts = self._backlog_size(num_questions)
+        if settings.CONCEPT_INDEX_ENABLED:
+            with metrics.stage("concepts.lookup"):
+                concepts = await asyncio.to_thread(
+                    self.concept_index.select, pdf_id, page_start, page_end, max_concepts
+                )
+            if concepts is not None and len(concepts) >= num_questions:
+                CONCEPT_SOURCES.inc(source="index")
+                return concepts
+        CONCEPT_SOURCES.inc(source="gemini")
+        return await self.aextract_concepts(
+            pdf_id, page_start, page_end, context=context, max_concepts=max_concepts
+        )
+
+    @staticmethod
+    def _backlog_size(num_questions: int) -> int:
+        """Concepts to extract for ``num_questions``: the target plus a backlog for top-ups."""
+        return max(num_questions, math.ceil(num_questions * settings.MCQ_CONCEPT_BACKLOG))
+
+    async def _iter_mcqs(
+        self,
+        context: PageRangeContext,
+        concepts: List[str],
+        target: int,
+        difficulty: str,
+        finalize: bool = True,
+    ) -> AsyncIterator[Tuple[int, str, Optional[Dict]]]:
+        """Generate until ``target`` MCQs are accepted, yielding ``(backlog_index, concept, mcq)``.
+
+        Concepts are drawn in order from the ``concepts`` backlog. Work in
+        flight is kept at the remaining shortfall plus a speculative margin of
+        ``MCQ_SPECULATIVE_RATIO * target`` concepts, so a failed concept is
+        usually replaced before anyone waits on it. Once ``target`` MCQs are
+        accepted, outstanding calls are cancelled. Gemini calls are capped at
+        ``MCQ_CALL_BUDGET_FACTOR`` times what a perfect run would need.
+
+        With ``finalize`` (the streaming path), each finished group goes through
+        :meth:`_finalize_mcqs` (translation fallback plus final validation)
+        before it counts, so an MCQ rejected there is topped up like any other
+        failure. Without it, structurally valid MCQs count as they arrive and
+        the caller translates and validates them all at once. Accepted MCQs get
+        ``question_number`` 1..target in acceptance order. A failed attempt
+        yields ``None``; surplus MCQs are dropped silently.
+        Concurrency is bounded by ``MCQ_GENERATION_CONCURRENCY``, and with
+        ``MCQ_BATCH_SIZE`` > 1 concepts share one Gemini call per group; batch
+        items that come back missing or malformed are retried once as single
+        questions, and those retries count against the call budget.
+        """
+        target = min(target, len(concepts))
+        if target <= 0:
+            return
+
+        primary_text = context.joined("\n")
+        distractor_texts = await self._distractor_contexts(context, concepts)
+        semaphore = asyncio.Semaphore(max(1, settings.MCQ_GENERATION_CONCURRENCY))
+        batch_size = max(1, settings.MCQ_BATCH_SIZE)
+        budget = math.ceil(-(-target // batch_size) * max(1.0, settings.MCQ_CALL_BUDGET_FACTOR))
+        margin = math.ceil(target * max(0.0, settings.MCQ_SPECULATIVE_RATIO))
+        backlog = [
+            (idx, concept, distractor_text)
+            for idx, (concept, distractor_text) in enumerate(zip(concepts, distractor_texts))
+        ]
+
+        async def bounded_build(slot: Tuple[int, str, str]) -> Optional[Dict]:
+            _, concept, distractor_text = slot
+            async with semaphore:
+                return await self._build_mcq(context, concept, primary_text, distractor_text, difficulty)
+
+        async def build_group(group: List[Tuple[int, str, str]]) -> List[Tuple[int, str, Optional[Dict]]]:
+            nonlocal calls
+            if len(group) == 1:
+                payloads = [await bounded_build(group[0])]
+            else:
+                async with semaphore:
+                    payloads = await self._build_mcq_batch(group, primary_text, difficulty)
+                # Items the batch skipped or got wrong get one single-question call each.
+                retry_indices = [idx for idx, payload in enumerate(payloads) if payload is None]
+                if retry_indices:
+                    calls += len(retry_indices)
+                    BATCH_RETRIES.inc(len(retry_indices))
+                    retried = await asyncio.gather(*(bounded_build(group[idx]) for idx in retry_indices))
+                    for idx, payload in zip(retry_indices, retried):
+                        payloads[idx] = payload
+            return [(idx, concept, payload) for (idx, concept, _), payload in zip(group, payloads)]
+
+        tasks: Dict[asyncio.Task, int] = {}
+        drawn = calls = accepted = in_flight = 0
+
+        def top_up():
+            nonlocal drawn, calls, in_flight
+            while drawn < len(backlog) and calls < budget and accepted + in_flight < target + margin:
+                size = min(batch_size, target + margin - accepted - in_flight)
+                group = backlog[drawn : drawn + size]
+                if drawn + len(group) > target:
+                    EXTRA_CONCEPTS.inc(drawn + len(group) - max(drawn, target))
+                drawn += len(group)
+                calls += 1
+                in_flight += len(group)
+                tasks[asyncio.create_task(build_group(group))] = len(group)
+
+        top_up()
+        try:
+            while tasks and accepted < target:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    in_flight -= tasks.pop(task)
+                    results = task.result()
+                    finished = [mcq_payload for _, _, mcq_payload in results if mcq_payload is not None]
+                    if finalize:
+                        finished = await self._finalize_mcqs(finished, context)
+                    kept = {id(mcq_payload) for mcq_payload in finished}
+                    for idx, concept, mcq_payload in results:
+                        if accepted >= target:
+                            break
+                        if mcq_payload is not None and id(mcq_payload) in kept:
+                            accepted += 1
+                            mcq_payload["question_number"] = accepted
+                            yield idx, concept, mcq_payload
+                        else:
+                            yield idx, concept, None
+                top_up()
+        finally:
+            if tasks:
+                CANCELLED_CONCEPTS.inc(in_flight)
+            for task in tasks:
+                task.cancel()
+        if accepted < target:
+            SHORTFALLS.inc()
+            logger.warning(
+                "Generated %d of %d MCQs for %s after %d calls (budget %d, backlog %d)",
+                accepted, target, context.pdf_id, calls, budget, len(backlog),
+            )
+
+    async def _build_mcq(
+        self,
+        context: PageRangeContext,
+        concept: str,
+        primary_text: str,
+        distractor_text: str,
+        difficulty: str,
+    ) -> Optional[Dict]:
+        """Generate one MCQ and shuffle its choices; returns None on any failure.
+
+        Only the structure is checked here; missing Mongolian fields are filled
+        by :meth:`_finalize_mcqs`.
+        """
+        try:
+            mcq_payload = await self._generate_single_mcq(
                 concept=concept,
                 primary_text=primary_text,
                 distractor_text=distractor_text,
                 difficulty=difficulty,
             )
-            if mcq_payload:
-                self._shuffle_choices(mcq_payload)
-                self._enforce_translations(mcq_payload)
-                if self._validate_mcq(mcq_payload):
-                    mcq_payload["question_number"] = idx + 1
-                    mcq_payload["page_reference"] = page_reference
-                    mcqs.append(mcq_payload)
+            if not mcq_payload:
+                GENERATION_FAILURES.inc()
+                return None
+            if not self._validate_structure(mcq_payload):
+                VALIDATION_REJECTS.inc(stage="single")
+                return None
+            self._shuffle_choices(mcq_payload)
+            return mcq_payload
+        except Exception:
+            GENERATION_FAILURES.inc()
+            logger.exception("MCQ generation failed for concept %r", concept)
+            return None
 
-        return mcqs
+    async def _build_mcq_batch(
+        self,
+        group: List[Tuple[int, str, str]],
+        primary_text: str,
+        difficulty: str,
+    ) -> List[Optional[Dict]]:
+        """Generate several MCQs in one call; structurally invalid or missing items come back as None.
+
+        Like :meth:`_build_mcq`, items lacking Mongolian text are kept for the
+        batched translation in :meth:`_finalize_mcqs`.
+        """
+        concepts = [concept for _, concept, _ in group]
+        try:
+            items = await self._generate_mcq_batch(
+                concepts=concepts,
+                primary_text=primary_text,
+                distractor_texts=[distractor_text for _, _, distractor_text in group],
+                difficulty=difficulty,
+            )
+        except Exception:
+            logger.exception("Batched MCQ generation failed for %d concepts", len(concepts))
+            items = []
+
+        payloads: List[Optional[Dict]] = []
+        for concept, position in zip(concepts, self._match_batch_items(concepts, items)):
+            item = items[position] if position is not None else None
+            if item is None or not self._validate_structure(item):
+                VALIDATION_REJECTS.inc(stage="batch")
+                payloads.append(None)
+                continue
+            item["concept"] = concept
+            item.setdefault("difficulty", difficulty)
+            self._shuffle_choices(item)
+            payloads.append(item)
+        return payloads
+
+    @staticmethod
+    def _match_batch_items(concepts: List[str], items: List) -> List[Optional[int]]:
+        """Index into ``items`` of the answer for each concept, or None.
+
+        Items are matched by their ``concept`` field first; a concept with no
+        match falls back to the item at its own position, but only if no other
+        concept claimed it and it is not about another concept of the batch.
+        Each item is used at most once.
+        """
+        positions: List[Optional[int]] = [None] * len(concepts)
+        claimed = set()
+        for idx, concept in enumerate(concepts):
+            for pos, item in enumerate(items):
+                if pos not in claimed and isinstance(item, dict) and item.get("concept") == concept:
+                    positions[idx] = pos
+                    claimed.add(pos)
+                    break
+        for idx in range(len(concepts)):
+            if (
+                positions[idx] is None
+                and idx < len(items)
+                and idx not in claimed
+                and isinstance(items[idx], dict)
+                and items[idx].get("concept") not in concepts
+            ):
+                positions[idx] = idx
+                claimed.add(idx)
+        return positions
+
+    async def _finalize_mcqs(self, mcqs: List[Dict], context: PageRangeContext) -> List[Dict]:
+        """Fill missing translations in one batch, then keep only MCQs that validate."""
+        try:
+            await self._enforce_translations(mcqs)
+        except Exception:
+            logger.exception("Translation fallback failed for %s", context.pdf_id)
+
+        valid: List[Dict] = []
+        for mcq in mcqs:
+            if self._validate_mcq(mcq):
+                mcq["page_reference"] = context.page_reference
+                valid.append(mcq)
+            else:
+                VALIDATION_REJECTS.inc(stage="final")
+        return valid
+
+    @metrics.timed("mcq.distractors")
+    async def _distractor_contexts(self, context: PageRangeContext, concepts: List[str]) -> List[str]:
+        """Semantic search outside requested range to craft plausible distractors.
+
+        All concepts are embedded in one forward pass and sent to Chroma as a
+        single multi-embedding query; results are split back per concept.
+        """
+        try:
+            embeddings = await self.embedder.aencode(list(concepts))
+            related = await self.async_rag.query_related_batch(
+                context.pdf_id, embeddings, context.page_range
+            )
+        except Exception:
+            logger.exception("Distractor retrieval failed for %s", context.pdf_id)
+            return ["" for _ in concepts]
+        return ["\n".join(documents) for documents in related]
 
-    def _primary_context(self, pdf_id: str, start: int, end: int) -> Tuple[str, str]:
-        """Fetch context text and format page reference."""
-        results = self.rag.fetch_pages(pdf_id, start, end)
-        documents = results.get("documents", [])
-        primary_text = "\n".join(documents)
-        return primary_text, f"{start}-{end}"
-
-    def _distractor_context(self, pdf_id: str, concept: str, page_range: Tuple[int, int]) -> str:
-        """Semantic search outside requested range to craft plausible distractors."""
-        embedding = self.embedder.encode([concept])[0]
-        related = self.rag.query_related(pdf_id, embedding, page_range)
-        documents = related.get("documents", [[]])
-        if documents and isinstance(documents[0], list):
-            documents = documents[0]
-        return "\n".join(documents)
-    
     def _shuffle_choices(self, mcq: Dict):
         """Randomize choice order but preserve which is correct."""
 
@@ -102,7 +609,8 @@ class MCQGenerator:
 
         mcq["choices"] = choices
 
-    def _generate_single_mcq(
+    @metrics.timed("mcq.single")
+    async def _generate_single_mcq(
         self, concept: str, primary_text: str, distractor_text: str, difficulty: str
     ) -> Optional[Dict]:
         """Send structured prompt to Gemini to create a bilingual MCQ."""
@@ -151,16 +659,86 @@ OUTPUT JSON ONLY:
   "explanation_mn": "..."
 }}
 """
-        try:
-            response = genai_client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt,
-                config={"response_mime_type": "application/json"},
-            )
-            mcq = json.loads(response.text)
-            return mcq
-        except Exception:
-            return None
+        # Errors propagate to _build_mcq, which logs and counts them; retries happen in llm_client.
+        response_text = await agenerate_text(
+            prompt,
+            config={"response_mime_type": "application/json"},
+            use_cache=settings.LLM_CACHE_MCQ_GENERATION,
+        )
+        return json.loads(response_text)
+
+    @metrics.timed("mcq.batch")
+    async def _generate_mcq_batch(
+        self,
+        concepts: List[str],
+        primary_text: str,
+        distractor_texts: List[str],
+        difficulty: str,
+    ) -> List[Dict]:
+        """Ask Gemini for one MCQ per concept against a shared context block."""
+        difficulty_guidelines = self._get_difficulty_guidelines(difficulty)
+        related_limit = max(400, 2000 // max(len(concepts), 1))
+        concept_blocks = "\n\n".join(
+            f'{idx + 1}. Concept: "{concept}"\n   Related context (use for distractors):\n'
+            f"{distractor_text[:related_limit]}"
+            for idx, (concept, distractor_text) in enumerate(zip(concepts, distractor_texts))
+        )
+        prompt = f"""
+You are an expert educator creating {len(concepts)} high-quality multiple choice questions,
+exactly one per concept listed below.
+
+PRIMARY CONTEXT (use for correct answers):
+{primary_text[:3000]}
+
+CONCEPTS:
+{concept_blocks}
+
+TASK:
+- Difficulty Level: {difficulty.upper()}
+
+{difficulty_guidelines}
+
+REQUIREMENTS:
+- Correct answers MUST originate from the primary context.
+- Each question has exactly four choices; three distractors must be plausible, referencing related but incorrect ideas.
+- Provide both English and Mongolian for questions, answers, and explanations.
+- DO NOT start questions with phrases such as:
+  "According to the text", "According to the provided text", 
+  "Өгөгдсөн текстийн дагуу", or similar expressions.
+- Phrase each question naturally as a standard MCQ without referencing the source text directly.
+- Return the questions in the same order as the concepts, copying each concept string exactly.
+
+OUTPUT A JSON ARRAY ONLY:
+[
+  {{
+    "question_en": "...",
+    "question_mn": "...",
+    "choices": [
+      {{
+        "id": "A",
+        "text_en": "...",
+        "text_mn": "...",
+        "is_correct": true,
+        "source": "Page ??",
+        "explanation": "..."
+      }}
+    ],
+    "concept": "<concept string>",
+    "difficulty": "{difficulty}",
+    "explanation_en": "...",
+    "explanation_mn": "..."
+  }}
+]
+"""
+        response_text = await agenerate_text(
+            prompt,
+            config={"response_mime_type": "application/json"},
+            use_cache=settings.LLM_CACHE_MCQ_GENERATION,
+        )
+        data = json.loads(response_text)
+        if isinstance(data, dict):
+            data = data.get("mcqs") or data.get("questions") or []
+        return data if isinstance(data, list) else []
 
     def _get_difficulty_guidelines(self, difficulty: str) -> str:
         """Return detailed guidelines for each difficulty level."""
@@ -210,28 +788,34 @@ OUTPUT JSON ONLY:
         }
         return guidelines.get(difficulty.lower(), guidelines["medium"])
 
-    def _enforce_translations(self, mcq: Dict):
-        """Fill any missing Mongolian text using the translator service."""
-        question_en = mcq.get("question_en", "")
-        question_mn = mcq.get("question_mn")
-        if question_en and not question_mn:
-            _, mn = self.translator.bilingual_pair(question_en)
-            mcq["question_mn"] = mn
-
-        explanation_en = mcq.get("explanation_en", "")
-        explanation_mn = mcq.get("explanation_mn")
-        if explanation_en and not explanation_mn:
-            _, mn = self.translator.bilingual_pair(explanation_en)
-            mcq["explanation_mn"] = mn
-
-        for choice in mcq.get("choices", []):
-            if choice.get("text_en") and not choice.get("text_mn"):
-                _, mn = self.translator.bilingual_pair(choice["text_en"])
-                choice["text_mn"] = mn
+    @metrics.timed("mcq.translations")
+    async def _enforce_translations(self, mcqs: List[Dict]):
+        """Fill any missing Mongolian text across all MCQs with one batched translation."""
+        pending = []
+        for mcq in mcqs:
+            if mcq.get("question_en") and not mcq.get("question_mn"):
+                pending.append((mcq, "question_mn", mcq["question_en"]))
+            if mcq.get("explanation_en") and not mcq.get("explanation_mn"):
+                pending.append((mcq, "explanation_mn", mcq["explanation_en"]))
+            for choice in mcq.get("choices", []):
+                if choice.get("text_en") and not choice.get("text_mn"):
+                    pending.append((choice, "text_mn", choice["text_en"]))
+
+        if not pending:
+            return
+
+        translations = await self.translator.atranslate_batch([english for _, _, english in pending])
+        for (target, field, _), mn in zip(pending, translations):
+            target[field] = mn
 
     def _validate_mcq(self, mcq: Dict) -> bool:
-        """Basic structural validation and optional difficulty check."""
-        if not mcq.get("question_en") or not mcq.get("question_mn"):
+        """Final validation: the structure plus the Mongolian question text."""
+        return bool(mcq.get("question_mn")) and self._validate_structure(mcq)
+
+    @staticmethod
+    def _validate_structure(mcq: Dict) -> bool:
+        """An English question with four choices, exactly one of them correct."""
+        if not isinstance(mcq, dict) or not mcq.get("question_en"):
             return False
         choices = mcq.get("choices", [])
         if len(choices) != 4:
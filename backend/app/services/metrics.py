@@ -0,0 +1,334 @@
+"""In-process counters, histograms and per-request stage timings.
+
+Metrics are rendered in the Prometheus text exposition format by
+:func:`render`; no client library is needed. Instrumented code uses
+:func:`timed` (or the :func:`stage` context manager) so each call lands in
+``msq_stage_seconds`` and, while a request is being tracked with
+:func:`track_stages`, in that request's :class:`StageTimings`.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: [bucket counts..., sum, count].
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(series)) for key, series in self._values.items())
+        lines = []
+        for key, series in values:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+@dataclass
+class Sample:
+    """One value produced by a collector at scrape time."""
+
+    name: str
+    kind: str
+    documentation: str
+    value: float
+    labels: Optional[Dict[str, str]] = None
+
+
+Collector = Callable[[], Iterable[Sample]]
+
+
+class MetricsRegistry:
+    """Holds metrics by name plus collectors that read other components' stats on scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets)
+
+    def register_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+
+        grouped: Dict[str, List[Sample]] = {}
+        for collector in collectors:
+            for sample in collector():
+                grouped.setdefault(sample.name, []).append(sample)
+        for name, samples in grouped.items():
+            lines.append(f"# HELP {name} {samples[0].documentation}")
+            lines.append(f"# TYPE {name} {samples[0].kind}")
+            for sample in samples:
+                labels = sample.labels or {}
+                lines.append(f"{name}{_format_labels(labels, labels.values())} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(self, cls, name: str, documentation: str, labels: Tuple[str, ...], *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labels, *args)
+            elif not isinstance(metric, cls) or metric.labels != labels:
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+register_collector = REGISTRY.register_collector
+render = REGISTRY.render
+
+STAGE_SECONDS = histogram(
+    "msq_stage_seconds", "Wall time spent in instrumented pipeline stages.", labels=("stage",)
+)
+
+
+def cache_samples(prefix: str, documentation: str, stats: Optional[Dict[str, float]]) -> List[Sample]:
+    """Turn a cache's ``stats()`` dict into samples: counts as counters, the rest as gauges."""
+    if not stats:
+        return []
+    samples = []
+    for key, value in stats.items():
+        if key in ("hit_rate", "rows"):
+            samples.append(Sample(f"{prefix}_{key}", "gauge", f"{documentation} ({key}).", value))
+        else:
+            samples.append(Sample(f"{prefix}_total", "counter", documentation, value, {"result": key}))
+    return samples
+
+
+class StageTimings:
+    """Accumulated time and call count per stage for one request."""
+
+    def __init__(self):
+        self._stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """``{stage: {"ms": total_milliseconds, "calls": n}}`` in first-seen order."""
+        with self._lock:
+            return {
+                stage: {"ms": round(seconds * 1000, 2), "calls": calls}
+                for stage, (seconds, calls) in self._stages.items()
+            }
+
+    def server_timing(self) -> str:
+        """Value for a ``Server-Timing`` response header."""
+        return ", ".join(
+            f'{stage.replace(".", "-")};dur={entry["ms"]};desc="{entry["calls"]}x"'
+            for stage, entry in self.as_dict().items()
+        )
+
+
+# Shared by reference with worker threads (asyncio.to_thread copies the context).
+_request_timings: contextvars.ContextVar[Optional[StageTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def track_stages() -> Iterator[StageTimings]:
+    """Collect stage timings for everything run inside the block (and tasks it spawns)."""
+    timings = StageTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _request_timings.get()
+
+
+def record_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as stage ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+# Per-thread stack of running generator steps, so a generator stage excludes
+# time spent inside timed generators it pulls from (chunking vs. PDF extraction).
+_generator_steps = threading.local()
+
+
+def _timed_generator(name: str, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        iterator = func(*args, **kwargs)
+        total = 0.0
+        try:
+            while True:
+                # Looked up per step: the consumer may resume the generator from another thread.
+                steps = _generator_steps.__dict__.setdefault("stack", [])
+                steps.append(0.0)
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = time.perf_counter() - started
+                    total += elapsed - steps.pop()
+                    if steps:
+                        steps[-1] += elapsed
+                yield item
+        finally:
+            iterator.close()
+            record_stage(name, total)
+
+    return wrapper
+
+
+def timed(name: str):
+    """Decorator recording each call of a function, coroutine or generator as stage ``name``.
+
+    Generators are charged only for the time spent producing items, not for
+    the time their consumer holds each item.
+    """
+
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            return _timed_generator(name, func)
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,136 @@
+"""Persisted page-span interval index resolving page ranges to chunk ids in page order."""
+
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+OVERLAP_MODES = ("contained", "intersecting")
+
+
+@dataclass
+class PageSpans:
+    """One PDF's chunk spans sorted by ``(page_start, chunk_id)``."""
+
+    starts: List[int] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    max_span: int = 0
+
+    def lookup(self, page_start: int, page_end: int, overlap: str = "intersecting") -> List[str]:
+        """Ids of chunks inside (``contained``) or touching (``intersecting``) the range.
+
+        Binary search bounds the candidates by ``page_start``; for intersecting
+        lookups the lower bound is widened by the longest span seen.
+        """
+        if overlap == "contained":
+            lo = bisect_left(self.starts, page_start)
+            hi = bisect_right(self.starts, page_end)
+            return [self.ids[idx] for idx in range(lo, hi) if self.ends[idx] <= page_end]
+        lo = bisect_left(self.starts, page_start - self.max_span)
+        hi = bisect_right(self.starts, page_end)
+        return [self.ids[idx] for idx in range(lo, hi) if self.ends[idx] >= page_start]
+
+
+class PageIndex:
+    """SQLite-persisted chunk page spans with a sorted in-memory copy per PDF.
+
+    Lives next to the vector store's data and is written at ingest time, so a page
+    range resolves to chunk ids in O(log n + k) without a metadata scan. Every
+    write bumps the PDF's row in ``page_versions``; cached spans are checked
+    against it, so writes from another process (the CLI) are picked up.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Tuple[int, PageSpans]] = {}
+        # PDFs known to have no chunks at all, by the version they were checked at.
+        self._empty: Dict[str, int] = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_spans ("
+            "pdf_id TEXT NOT NULL, chunk_id INTEGER NOT NULL, page_start INTEGER NOT NULL, "
+            "page_end INTEGER NOT NULL, doc_id TEXT NOT NULL, PRIMARY KEY (pdf_id, chunk_id))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_versions ("
+            "pdf_id TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add(self, pdf_id: str, entries: Iterable[Tuple[int, int, int, str]]):
+        """Record ``(chunk_id, page_start, page_end, doc_id)`` entries for a PDF."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO page_spans (pdf_id, chunk_id, page_start, page_end, doc_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(pdf_id, *entry) for entry in entries],
+            )
+            self._bump(pdf_id)
+            self._conn.commit()
+
+    def remove(self, pdf_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM page_spans WHERE pdf_id = ?", (pdf_id,))
+            self._bump(pdf_id)
+            self._conn.commit()
+
+    def mark_empty(self, pdf_id: str):
+        """Remember that a PDF has no chunks to index, until its spans change."""
+        with self._lock:
+            self._empty[pdf_id] = self._version(pdf_id)
+
+    def has(self, pdf_id: str) -> bool:
+        """Whether the index is authoritative for a PDF (it has spans or was marked empty)."""
+        spans = self._load(pdf_id)
+        if spans.ids:
+            return True
+        with self._lock:
+            return self._empty.get(pdf_id) == self._version(pdf_id)
+
+    def count(self, pdf_id: str) -> int:
+        """Number of chunks indexed for a PDF."""
+        return len(self._load(pdf_id).ids)
+
+    def lookup(self, pdf_id: str, page_start: int, page_end: int, overlap: str = "intersecting") -> List[str]:
+        """Chunk ids for a page range, ordered by page then chunk position."""
+        if overlap not in OVERLAP_MODES:
+            raise ValueError(f"Unknown page overlap mode: {overlap!r}")
+        return self._load(pdf_id).lookup(page_start, page_end, overlap)
+
+    def _load(self, pdf_id: str) -> PageSpans:
+        with self._lock:
+            version = self._version(pdf_id)
+            cached = self._spans.get(pdf_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            rows = self._conn.execute(
+                "SELECT page_start, page_end, doc_id FROM page_spans WHERE pdf_id = ? "
+                "ORDER BY page_start, chunk_id",
+                (pdf_id,),
+            ).fetchall()
+            spans = PageSpans(
+                starts=[row[0] for row in rows],
+                ends=[row[1] for row in rows],
+                ids=[row[2] for row in rows],
+                max_span=max((row[1] - row[0] for row in rows), default=0),
+            )
+            self._spans[pdf_id] = (version, spans)
+            return spans
+
+    def _version(self, pdf_id: str) -> int:
+        row = self._conn.execute(
+            "SELECT version FROM page_versions WHERE pdf_id = ?", (pdf_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, pdf_id: str):
+        self._conn.execute(
+            "INSERT INTO page_versions (pdf_id, version) VALUES (?, 1) "
+            "ON CONFLICT(pdf_id) DO UPDATE SET version = version + 1",
+            (pdf_id,),
+        )
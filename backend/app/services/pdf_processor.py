@@ -1,14 +1,85 @@
 """PDF text extraction and cleaning utilities."""
 
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import pdfplumber
 
+from app.config import settings
+from app.services import metrics
+
+# Upper bound on pages per process-pool shard so streamed extraction stays bounded.
+MAX_SHARD_PAGES = 25
+# Extraction processes used when PDF_EXTRACT_WORKERS is 0.
+DEFAULT_EXTRACT_WORKERS = 4
+
+
+def _iter_page_text(pdf, start: int, end: int) -> Iterator[Tuple[int, str]]:
+    """Yield ``(page_number, text)`` for non-empty pages start..end (inclusive)."""
+    for index in range(start - 1, end):
+        page = pdf.pages[index]
+        page_text = page.extract_text() or ""
+        # Drop pdfplumber's per-page object cache so long documents don't accumulate it.
+        page.flush_cache()
+        cleaned = page_text.strip()
+        if cleaned:
+            yield index + 1, cleaned
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Process-pool entry point: each worker opens its own handle."""
+    with pdfplumber.open(file_path) as pdf:
+        return list(_iter_page_text(pdf, start, end))
+
+
+def _mark_page(page_number: int, text: str) -> str:
+    return f"\n[PAGE {page_number}]\n{text}\n"
+
+
+class PDFDocument:
+    """One open PDF: page count, range clamping and page iteration share a single handle."""
+
+    def __init__(self, processor: "PDFProcessor", file_path: Path, pdf):
+        self.processor = processor
+        self.file_path = file_path
+        self.pdf = pdf
+        self.total_pages = len(pdf.pages)
+
+    def clamp_range(self, page_start: Optional[int] = None, page_end: Optional[int] = None) -> Tuple[int, int]:
+        return self.processor.clamp_range(self.total_pages, page_start, page_end)
+
+    @metrics.timed("pdf.extract")
+    def iter_pages(self, page_start: int, page_end: int) -> Iterator[Tuple[int, str]]:
+        """Stream ``(page_number, text)`` for non-empty pages of a clamped range, in page order.
+
+        Short ranges are read through this handle; large ones are sharded
+        across a process pool whose workers open their own.
+        """
+        workers = self.processor._worker_count(page_end - page_start + 1)
+        if workers <= 1:
+            yield from _iter_page_text(self.pdf, page_start, page_end)
+            return
+        yield from self.processor._iter_parallel(self.file_path, page_start, page_end, workers)
+
 
 class PDFProcessor:
     """Extracts raw text plus lightweight metadata from PDF files."""
 
+    @contextmanager
+    def open(self, file_path: Path) -> Iterator[PDFDocument]:
+        """Open a PDF once for counting, range resolution and extraction."""
+        file_path = Path(file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"PDF not found: {file_path}")
+        with pdfplumber.open(str(file_path)) as pdf:
+            yield PDFDocument(self, file_path, pdf)
+
     def extract_text(
         self,
         file_path: Path,
@@ -26,25 +97,107 @@ class PDFProcessor:
         Returns:
             tuple: (text, total_pages, (range_start, range_end))
         """
+        with self.open(file_path) as document:
+            start, end = document.clamp_range(page_start, page_end)
+            text_parts = [_mark_page(number, text) for number, text in document.iter_pages(start, end)]
+        return "".join(text_parts), document.total_pages, (start, end)
+
+    def iter_pages(
+        self,
+        file_path: Path,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Stream ``(page_number, text)`` records for non-empty pages in page order.
+
+        Only a bounded window of pages is held in memory at once, which lets
+        ingestion process books of any length. Large ranges are sharded across
+        a process pool (see :meth:`_worker_count`). Callers that also need the
+        page count should use :meth:`open` so the file is opened only once.
+        """
+        with self.open(file_path) as document:
+            yield from document.iter_pages(*document.clamp_range(page_start, page_end))
+
+    def resolve_range(
+        self,
+        file_path: Path,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+    ) -> Tuple[int, Tuple[int, int]]:
+        """Return ``(total_pages, (start, end))`` with the range clamped and ordered."""
+        total_pages = self.page_count(file_path)
+        return total_pages, self.clamp_range(total_pages, page_start, page_end)
+
+    @staticmethod
+    def clamp_range(
+        total_pages: int,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        """Clamp an optional inclusive range to ``1..total_pages`` and order it."""
+        start = page_start or 1
+        end = page_end or total_pages
+        start = max(1, min(start, total_pages))
+        end = max(1, min(end, total_pages))
+        if start > end:
+            start, end = end, start
+        return start, end
+
+    @staticmethod
+    def _worker_count(page_count: int) -> int:
+        """Process count for a range; short documents stay single-process."""
+        if page_count < settings.PDF_PARALLEL_MIN_PAGES:
+            return 1
+        # Each worker is a spawned process holding its own pdfplumber copy, so cap the default.
+        configured = settings.PDF_EXTRACT_WORKERS or min(DEFAULT_EXTRACT_WORKERS, os.cpu_count() or 1)
+        return max(1, min(configured, page_count))
+
+    @staticmethod
+    def _iter_parallel(file_path: Path, start: int, end: int, workers: int) -> Iterator[Tuple[int, str]]:
+        """Shard ``start..end`` across a process pool, yielding pages in order.
+
+        At most ``2 * workers`` shards are in flight, so memory stays bounded
+        even when the consumer is slower than extraction.
+        """
+        page_count = end - start + 1
+        shard_count = min(page_count, max(workers * 4, -(-page_count // MAX_SHARD_PAGES)))
+        shard_size = -(-page_count // shard_count)
+        shards = iter(
+            [
+                (shard_start, min(shard_start + shard_size - 1, end))
+                for shard_start in range(start, end + 1, shard_size)
+            ]
+        )
+        # Spawned workers avoid forking a parent that may hold model threads.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = deque()
+            for _ in range(workers * 2):
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                pending.append(pool.submit(_extract_page_range, str(file_path), *shard))
+            while pending:
+                records = pending.popleft().result()
+                shard = next(shards, None)
+                if shard is not None:
+                    pending.append(pool.submit(_extract_page_range, str(file_path), *shard))
+                yield from records
+
+    @metrics.timed("pdf.page_count")
+    def page_count(self, file_path: Path) -> int:
+        """Return the number of pages without extracting any text."""
         if not file_path.exists():
             raise FileNotFoundError(f"PDF not found: {file_path}")
-
         with pdfplumber.open(str(file_path)) as pdf:
-            total_pages = len(pdf.pages)
-            start = page_start or 1
-            end = page_end or total_pages
-            start = max(1, min(start, total_pages))
-            end = max(1, min(end, total_pages))
-            if start > end:
-                start, end = end, start
-
-            text_parts = []
-            for index in range(start - 1, end):
-                page = pdf.pages[index]
-                page_text = page.extract_text() or ""
-                cleaned = page_text.strip()
-                if cleaned:
-                    text_parts.append(f"\n[PAGE {index + 1}]\n{cleaned}\n")
-
-        return "".join(text_parts), total_pages, (start, end)
+            return len(pdf.pages)
 
+    async def aextract_text(
+        self,
+        file_path: Path,
+        page_start: Optional[int] = None,
+        page_end: Optional[int] = None,
+    ) -> Tuple[str, int, Tuple[int, int]]:
+        """Run :meth:`extract_text` in a worker thread; pdfplumber is CPU-bound."""
+        return await asyncio.to_thread(self.extract_text, file_path, page_start, page_end)
@@ -1,44 +1,97 @@
-"""ChromaDB helper utilities for storing and querying textbook content."""
+"""Vector-store helper utilities for storing and querying textbook content."""
 
-from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import numpy as np
 
 from app.config import settings
+from app.services import metrics
+from app.services.page_index import PageIndex
+from app.services.vector_store import Embeddings, VectorStore, build_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageRangeContext:
+    """Request-scoped chunks for one page range, fetched once and kept in reading order.
+
+    Build it with :meth:`RAGService.page_context` and share it across concept
+    extraction and every question of a request instead of re-querying Chroma.
+    """
+
+    pdf_id: str
+    page_start: int
+    page_end: int
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict] = field(default_factory=list)
+
+    @property
+    def page_range(self) -> Tuple[int, int]:
+        return self.page_start, self.page_end
+
+    @property
+    def page_reference(self) -> str:
+        return f"{self.page_start}-{self.page_end}"
+
+    def joined(self, separator: str = "\n") -> str:
+        """Return all chunk texts concatenated in page order."""
+        return separator.join(self.documents)
 
 
 class RAGService:
-    """Thin wrapper around ChromaDB persistent collections."""
+    """Chunk storage and retrieval on top of a :class:`VectorStore` plus the page index.
 
-    def __init__(self):
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_DB_PATH,
-            settings=ChromaSettings(anonymized_telemetry=False),
-        )
+    The backend comes from ``settings.VECTOR_STORE_BACKEND`` unless a store is
+    passed in explicitly.
+    """
+
+    def __init__(self, store: Optional[VectorStore] = None):
+        self.store = store or build_vector_store()
+        # Chunk page spans, persisted next to the store's data.
+        self.page_index = PageIndex(str(self.store.root / "page_index.sqlite3"))
 
     def reset_collection(self, pdf_id: str, metadata: Optional[Dict] = None):
-        """Create a fresh collection for a PDF, replacing an existing one if needed."""
-        try:
-            self.client.delete_collection(name=pdf_id)
-        except Exception:
-            pass
-        return self.client.create_collection(name=pdf_id, metadata=metadata or {})
+        """Start a PDF afresh, dropping any chunks stored for it before."""
+        self.page_index.remove(pdf_id)
+        return self.store.reset(pdf_id, metadata=metadata)
+
+    def ensure_collection(self, pdf_id: str, metadata: Optional[Dict] = None):
+        """Make sure a PDF can receive chunks; existing chunks are kept."""
+        return self.store.ensure(pdf_id, metadata=metadata)
 
+    def count(self, pdf_id: str) -> int:
+        """Number of chunks stored for a PDF, counted from the page index.
+
+        PDFs ingested before the page index existed are backfilled first.
+        """
+        if not self.page_index.has(pdf_id):
+            self._backfill_page_index(pdf_id)
+        return self.page_index.count(pdf_id)
+
+    @metrics.timed("rag.add_chunks")
     def add_chunks(
         self,
         pdf_id: str,
         chunks: List[Dict],
-        embeddings: List[List[float]],
+        embeddings: Embeddings,
+        start_index: int = 0,
     ) -> int:
-        """Store chunks plus embeddings with metadata."""
-        collection = self.client.get_collection(name=pdf_id)
-        ids = [f"{pdf_id}_chunk_{idx}" for idx in range(len(chunks))]
+        """Store chunks plus embeddings with metadata.
+
+        ``start_index`` offsets chunk ids so new page ranges can be appended
+        to an existing collection without colliding.
+        """
+        ids = [f"{pdf_id}_chunk_{start_index + idx}" for idx in range(len(chunks))]
 
         documents = [chunk["text"] for chunk in chunks]
         metadatas = [
             {
-                "chunk_id": idx,
+                "pdf_id": pdf_id,
+                "chunk_id": start_index + idx,
                 "page_start": chunk["page_start"],
                 "page_end": chunk["page_end"],
                 "word_count": chunk["word_count"],
@@ -47,47 +100,167 @@ class RAGService:
             for idx, chunk in enumerate(chunks)
         ]
 
-        collection.add(
-            ids=ids,
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
+        self.store.add(pdf_id, ids, documents, embeddings, metadatas)
+        self.page_index.add(
+            pdf_id,
+            [
+                (metadata["chunk_id"], metadata["page_start"], metadata["page_end"], doc_id)
+                for doc_id, metadata in zip(ids, metadatas)
+            ],
         )
 
         return len(chunks)
 
-    def fetch_pages(self, pdf_id: str, page_start: int, page_end: int) -> Dict[str, List]:
-        """Retrieve chunks spanning a page range."""
-        collection = self.client.get_collection(name=pdf_id)
-        return collection.get(
-            where={
-                "$and": [
-                    {"page_start": {"$gte": page_start}},
-                    {"page_end": {"$lte": page_end}},
-                ]
-            },
-            include=["documents", "metadatas"],
+    @metrics.timed("rag.fetch_pages")
+    def fetch_pages(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        overlap: Optional[str] = None,
+    ) -> Dict[str, List]:
+        """Retrieve chunks for a page range, in page order.
+
+        The page index resolves the range to chunk ids, which are then fetched
+        by id. ``overlap`` (default ``settings.PAGE_RANGE_OVERLAP``) is
+        ``contained`` for chunks wholly inside the range or ``intersecting``
+        to also include chunks straddling its boundary pages.
+        """
+        ids = self._page_ids(pdf_id, page_start, page_end, overlap or settings.PAGE_RANGE_OVERLAP)
+        if not ids:
+            return {"ids": [], "documents": [], "metadatas": []}
+        results = self.store.get(pdf_id, ids)
+        # Stores may return ids in storage order; restore the index's page order.
+        position = {doc_id: idx for idx, doc_id in enumerate(results["ids"])}
+        order = [position[doc_id] for doc_id in ids if doc_id in position]
+        return {
+            "ids": [results["ids"][idx] for idx in order],
+            "documents": [results["documents"][idx] for idx in order],
+            "metadatas": [results["metadatas"][idx] for idx in order],
+        }
+
+    def page_context(self, pdf_id: str, page_start: int, page_end: int) -> PageRangeContext:
+        """Fetch a page range once, with chunks in their order in the PDF."""
+        results = self.fetch_pages(pdf_id, page_start, page_end)
+        return PageRangeContext(
+            pdf_id=pdf_id,
+            page_start=page_start,
+            page_end=page_end,
+            documents=results["documents"],
+            metadatas=results["metadatas"],
         )
 
+    @metrics.timed("rag.query_related")
     def query_related(
         self,
         pdf_id: str,
-        query_embedding: List[float],
+        query_embedding: Union[np.ndarray, Sequence[float]],
         exclusion_range: Tuple[int, int],
         n_results: int = 5,
     ) -> Dict:
         """Semantic search excluding the main page range to build distractors."""
-        collection = self.client.get_collection(name=pdf_id)
-        start, end = exclusion_range
-        return collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where={
-                "$or": [
-                    {"page_end": {"$lt": start}},
-                    {"page_start": {"$gt": end}},
-                ]
-            },
-            include=["documents", "metadatas"],
+        (hits,) = self.store.query(pdf_id, [query_embedding], n_results, exclude_pages=exclusion_range)
+        return {"documents": [hits["documents"]], "metadatas": [hits["metadatas"]]}
+
+    @metrics.timed("rag.query_related_batch")
+    def query_related_batch(
+        self,
+        pdf_id: str,
+        query_embeddings: Embeddings,
+        exclusion_range: Tuple[int, int],
+        n_results: int = 5,
+    ) -> List[List[str]]:
+        """Run one store query for many embeddings; returns documents per query, in order."""
+        if len(query_embeddings) == 0:
+            return []
+        results = self.store.query(pdf_id, query_embeddings, n_results, exclude_pages=exclusion_range)
+        return [hits["documents"] for hits in results]
+
+    @metrics.timed("rag.search")
+    def search(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        pdf_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Cross-document search, optionally limited to some PDFs.
+
+        Returns one ``{"documents", "metadatas", "distances"}`` dict per query.
+        """
+        return self.store.search(query_embeddings, n_results, pdf_ids)
+
+    def _page_ids(self, pdf_id: str, page_start: int, page_end: int, overlap: str) -> List[str]:
+        if not self.page_index.has(pdf_id):
+            self._backfill_page_index(pdf_id)
+        return self.page_index.lookup(pdf_id, page_start, page_end, overlap)
+
+    def _backfill_page_index(self, pdf_id: str):
+        """Index a PDF ingested before the page index existed, from its chunk metadata."""
+        results = self.store.get(pdf_id)
+        entries = [
+            (metadata.get("chunk_id", 0), metadata["page_start"], metadata["page_end"], doc_id)
+            for doc_id, metadata in zip(results["ids"], results["metadatas"] or [])
+            if metadata and "page_start" in metadata and "page_end" in metadata
+        ]
+        if entries:
+            self.page_index.add(pdf_id, entries)
+            logger.info("Backfilled page index for %s (%d chunks)", pdf_id, len(entries))
+        else:
+            self.page_index.mark_empty(pdf_id)
+
+
+class AsyncRAGService:
+    """Awaitable facade over :class:`RAGService`.
+
+    The vector stores are synchronous, so every call is dispatched to a worker
+    thread to keep the event loop responsive.
+    """
+
+    def __init__(self, rag: RAGService):
+        self.rag = rag
+
+    async def reset_collection(self, pdf_id: str, metadata: Optional[Dict] = None):
+        return await asyncio.to_thread(self.rag.reset_collection, pdf_id, metadata)
+
+    async def add_chunks(
+        self,
+        pdf_id: str,
+        chunks: List[Dict],
+        embeddings: Embeddings,
+        start_index: int = 0,
+    ) -> int:
+        return await asyncio.to_thread(self.rag.add_chunks, pdf_id, chunks, embeddings, start_index)
+
+    async def fetch_pages(
+        self,
+        pdf_id: str,
+        page_start: int,
+        page_end: int,
+        overlap: Optional[str] = None,
+    ) -> Dict[str, List]:
+        return await asyncio.to_thread(self.rag.fetch_pages, pdf_id, page_start, page_end, overlap)
+
+    async def page_context(self, pdf_id: str, page_start: int, page_end: int) -> PageRangeContext:
+        return await asyncio.to_thread(self.rag.page_context, pdf_id, page_start, page_end)
+
+    async def query_related(
+        self,
+        pdf_id: str,
+        query_embedding: Union[np.ndarray, Sequence[float]],
+        exclusion_range: Tuple[int, int],
+        n_results: int = 5,
+    ) -> Dict:
+        return await asyncio.to_thread(
+            self.rag.query_related, pdf_id, query_embedding, exclusion_range, n_results
         )
 
+    async def query_related_batch(
+        self,
+        pdf_id: str,
+        query_embeddings: Embeddings,
+        exclusion_range: Tuple[int, int],
+        n_results: int = 5,
+    ) -> List[List[str]]:
+        return await asyncio.to_thread(
+            self.rag.query_related_batch, pdf_id, query_embeddings, exclusion_range, n_results
+        )
@@ -1,8 +1,193 @@
-"""Shared service singletons to avoid repeated heavy initializations."""
+"""Shared service singletons, built lazily on first use to avoid heavy work at import time.
 
-from app.services.mcq_generator import MCQGenerator
-from app.services.pdf_processor import PDFProcessor
+Importing this module is cheap: the embedding model, Chroma client and Gemini
+client are only created when a getter is first called (or by :func:`warm_up`).
+Each singleton is built at most once, even under concurrent first access.
+"""
 
-mcq_generator = MCQGenerator()
-pdf_processor = PDFProcessor()
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Generic, List, Optional, TypeVar
 
+from app.config import settings
+from app.services import metrics
+
+if TYPE_CHECKING:
+    from app.services.concept_index import ConceptIndexer
+    from app.services.ingestion import IngestionService
+    from app.services.jobs import IngestionJobManager
+    from app.services.mcq_generator import MCQGenerator
+    from app.services.pdf_processor import PDFProcessor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """Thread-safe build-once holder for an expensive object."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    started = time.perf_counter()
+                    self._value = self._factory()
+                    logger.info("Initialized %s in %.2fs", self.name, time.perf_counter() - started)
+        return self._value
+
+
+def _build_mcq_generator() -> "MCQGenerator":
+    from app.services.mcq_generator import MCQGenerator
+
+    return MCQGenerator()
+
+
+def _build_pdf_processor() -> "PDFProcessor":
+    from app.services.pdf_processor import PDFProcessor
+
+    return PDFProcessor()
+
+
+def _build_ingestion_service() -> "IngestionService":
+    from app.services.ingestion import IngestionService
+
+    concept_indexer = get_concept_indexer() if settings.CONCEPT_INDEX_ENABLED else None
+    return IngestionService(get_mcq_generator(), get_pdf_processor(), concept_indexer=concept_indexer)
+
+
+def _build_ingestion_jobs() -> "IngestionJobManager":
+    from app.services.jobs import IngestionJobManager
+
+    return IngestionJobManager(get_ingestion_service())
+
+
+def _build_concept_indexer() -> "ConceptIndexer":
+    from app.services.concept_index import ConceptIndexer
+
+    return ConceptIndexer(get_mcq_generator())
+
+
+_mcq_generator = LazyService("mcq_generator", _build_mcq_generator)
+_pdf_processor = LazyService("pdf_processor", _build_pdf_processor)
+_ingestion_service = LazyService("ingestion_service", _build_ingestion_service)
+_ingestion_jobs = LazyService("ingestion_jobs", _build_ingestion_jobs)
+_concept_indexer = LazyService("concept_indexer", _build_concept_indexer)
+
+_warmup: Dict[str, Optional[str]] = {"status": "idle", "error": None}
+
+
+def get_mcq_generator() -> "MCQGenerator":
+    return _mcq_generator.get()
+
+
+def get_pdf_processor() -> "PDFProcessor":
+    return _pdf_processor.get()
+
+
+def get_ingestion_service() -> "IngestionService":
+    return _ingestion_service.get()
+
+
+def get_ingestion_jobs() -> "IngestionJobManager":
+    return _ingestion_jobs.get()
+
+
+def get_concept_indexer() -> "ConceptIndexer":
+    return _concept_indexer.get()
+
+
+def warm_up():
+    """Load the model and open the vector store and Gemini clients ahead of the first request."""
+    from app.services.llm_client import get_genai_client
+
+    _warmup.update(status="warming", error=None)
+    try:
+        get_mcq_generator().rag.store.warm_up()
+        get_pdf_processor()
+        get_genai_client()
+        resume_pending_jobs()
+        resume_concept_indexing()
+    except Exception as exc:
+        logger.exception("Warm-up failed")
+        _warmup.update(status="failed", error=str(exc))
+        return
+    _warmup["status"] = "ready"
+
+
+def resume_pending_jobs() -> int:
+    """Resume interrupted ingestion jobs, building the pipeline only if there are any."""
+    if not _ingestion_jobs.loaded:
+        from app.services.jobs import JobStore
+
+        if not JobStore(settings.INGEST_JOBS_DB_PATH).unfinished():
+            return 0
+    return get_ingestion_jobs().resume_pending()
+
+
+def resume_concept_indexing() -> int:
+    """Requeue concept index windows a previous process did not finish."""
+    if not settings.CONCEPT_INDEX_ENABLED:
+        return 0
+    return get_concept_indexer().resume_pending()
+
+
+def shutdown():
+    if _ingestion_jobs.loaded:
+        get_ingestion_jobs().shutdown()
+    if _concept_indexer.loaded:
+        get_concept_indexer().shutdown()
+
+
+def readiness() -> Dict[str, object]:
+    """Which heavy services are loaded, plus the warm-up status."""
+    components = {
+        service.name: service.loaded
+        for service in (_mcq_generator, _pdf_processor, _ingestion_service, _ingestion_jobs, _concept_indexer)
+    }
+    return {
+        "ready": _mcq_generator.loaded and _warmup["status"] not in ("warming", "failed"),
+        "warmup": dict(_warmup),
+        "components": components,
+    }
+
+
+def _collect_metrics() -> List[metrics.Sample]:
+    """Scrape-time samples: which services are loaded and, once the generator exists, its caches and index."""
+    samples = [
+        metrics.Sample(
+            "msq_service_loaded", "gauge", "Whether a lazily built service is loaded.",
+            int(service.loaded), {"service": service.name},
+        )
+        for service in (_mcq_generator, _pdf_processor, _ingestion_service, _ingestion_jobs, _concept_indexer)
+    ]
+    if _mcq_generator.loaded:
+        samples.extend(
+            metrics.cache_samples(
+                "msq_embedding_cache",
+                "Embedding cache lookups and stores.",
+                get_mcq_generator().embedder.cache_stats(),
+            )
+        )
+        samples.extend(
+            metrics.Sample(
+                "msq_concept_index_windows", "gauge", "Concept index windows by status.",
+                count, {"status": status},
+            )
+            for status, count in get_mcq_generator().concept_index.status_counts().items()
+        )
+    return samples
+
+
+metrics.register_collector(_collect_metrics)
@@ -1,28 +1,142 @@
 """Lightweight translator leveraging Gemini for Mongolian output."""
 
-from typing import Tuple
+import asyncio
+import json
+import logging
+from typing import Dict, List, Tuple
 
-from app.services.llm_client import genai_client, GEMINI_MODEL
+from app.config import settings
+from app.services import metrics
+from app.services.llm_client import agenerate_text, generate_text
+
+logger = logging.getLogger(__name__)
+
+FALLBACKS = metrics.counter(
+    "msq_translation_fallbacks_total", "Texts a batch translation skipped, retried as single calls."
+)
 
 
 class TranslatorService:
     """Wraps Gemini for bilingual question/answer rendering."""
 
+    @metrics.timed("translator.single")
     def bilingual_pair(self, english_text: str) -> Tuple[str, str]:
         """
         Return a tuple (en, mn) ensuring Mongolian translation reads naturally.
 
         The service keeps the English text untouched and relies on Gemini for MN.
         """
-        prompt = (
+        response_text = generate_text(self._build_prompt(english_text), use_cache=True)
+        return english_text, response_text.strip()
+
+    @metrics.timed("translator.single")
+    async def abilingual_pair(self, english_text: str) -> Tuple[str, str]:
+        """Async variant of :meth:`bilingual_pair`."""
+        response_text = await agenerate_text(self._build_prompt(english_text), use_cache=True)
+        return english_text, response_text.strip()
+
+    @metrics.timed("translator.batch")
+    def translate_batch(self, english_texts: List[str]) -> List[str]:
+        """
+        Translate many strings with one structured JSON request per chunk.
+
+        Returns Mongolian strings aligned with ``english_texts``; duplicates are
+        translated once and items the model skips fall back to single calls. A
+        fallback that still fails leaves that item empty rather than losing the batch.
+        """
+        unique = list(dict.fromkeys(text for text in english_texts if text))
+        translations: Dict[str, str] = {}
+        for batch in self._chunks(unique):
+            response_text = generate_text(
+                self._build_batch_prompt(batch),
+                config={"response_mime_type": "application/json"},
+                use_cache=True,
+            )
+            translations.update(self._parse_batch(batch, response_text))
+        for text in unique:
+            if not translations.get(text):
+                FALLBACKS.inc()
+                try:
+                    translations[text] = self.bilingual_pair(text)[1]
+                except Exception:
+                    logger.warning("Single translation fallback failed", exc_info=True)
+        return [translations.get(text, "") for text in english_texts]
+
+    @metrics.timed("translator.batch")
+    async def atranslate_batch(self, english_texts: List[str]) -> List[str]:
+        """Async variant of :meth:`translate_batch`."""
+        unique = list(dict.fromkeys(text for text in english_texts if text))
+        translations: Dict[str, str] = {}
+        for batch in self._chunks(unique):
+            response_text = await agenerate_text(
+                self._build_batch_prompt(batch),
+                config={"response_mime_type": "application/json"},
+                use_cache=True,
+            )
+            translations.update(self._parse_batch(batch, response_text))
+        semaphore = asyncio.Semaphore(max(1, settings.TRANSLATION_FALLBACK_CONCURRENCY))
+
+        async def fallback(text: str):
+            FALLBACKS.inc()
+            async with semaphore:
+                try:
+                    translations[text] = (await self.abilingual_pair(text))[1]
+                except Exception:
+                    logger.warning("Single translation fallback failed", exc_info=True)
+
+        await asyncio.gather(*(fallback(text) for text in unique if not translations.get(text)))
+        return [translations.get(text, "") for text in english_texts]
+
+    @staticmethod
+    def _chunks(texts: List[str]) -> List[List[str]]:
+        """Split texts into batches bounded by item count and total characters."""
+        max_items = max(1, settings.TRANSLATION_BATCH_SIZE)
+        max_chars = max(1, settings.TRANSLATION_BATCH_MAX_CHARS)
+        batches: List[List[str]] = []
+        current: List[str] = []
+        current_chars = 0
+        for text in texts:
+            if current and (len(current) >= max_items or current_chars + len(text) > max_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(text)
+            current_chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _build_prompt(english_text: str) -> str:
+        return (
             "Translate the following educational text to Mongolian (MN). "
             "Preserve scientific terminology and keep the tone academic. "
             "Only respond with the Mongolian translation.\n\n"
             f"TEXT:\n{english_text}"
         )
-        response = genai_client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=prompt,
+
+    @staticmethod
+    def _build_batch_prompt(english_texts: List[str]) -> str:
+        items = [{"id": idx, "text": text} for idx, text in enumerate(english_texts)]
+        return (
+            "Translate each of the following educational texts to Mongolian (MN). "
+            "Preserve scientific terminology and keep the tone academic.\n\n"
+            "Return ONLY JSON with one entry per input id:\n"
+            '{"translations": [{"id": 0, "mn": "..."}]}\n\n'
+            f"ITEMS:\n{json.dumps(items, ensure_ascii=False)}"
         )
-        return english_text, response.text.strip()
 
+    @staticmethod
+    def _parse_batch(english_texts: List[str], response_text: str) -> Dict[str, str]:
+        try:
+            entries = json.loads(response_text).get("translations", [])
+        except (ValueError, AttributeError):
+            logger.warning("Unparseable batch translation response; falling back to single calls")
+            return {}
+        translations: Dict[str, str] = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            idx, mn = entry.get("id"), entry.get("mn")
+            if isinstance(idx, int) and 0 <= idx < len(english_texts) and isinstance(mn, str) and mn.strip():
+                translations[english_texts[idx]] = mn.strip()
+        return translations
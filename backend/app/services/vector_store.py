@@ -0,0 +1,560 @@
+"""Vector store backends behind :class:`RAGService`: ChromaDB and an in-process NumPy store."""
+
+import json
+import logging
+import re
+import shutil
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Embeddings = Union[np.ndarray, Sequence[Sequence[float]]]
+
+
+def _as_lists(embeddings: Embeddings) -> List[List[float]]:
+    """Chroma 0.4 validates embeddings as Python lists; convert arrays once, here."""
+    return embeddings.tolist() if isinstance(embeddings, np.ndarray) else embeddings
+
+
+def _merge_hits(results: Iterable[List[Dict]], queries: int, n_results: int) -> List[Dict]:
+    """Merge per-collection query results into the ``n_results`` nearest hits per query."""
+    merged = [[] for _ in range(queries)]
+    for result in results:
+        for idx, hits in enumerate(result):
+            merged[idx].extend(zip(hits["distances"], hits["documents"], hits["metadatas"]))
+    output = []
+    for hits in merged:
+        hits = sorted(hits, key=lambda hit: hit[0])[:n_results]
+        output.append(
+            {
+                "distances": [hit[0] for hit in hits],
+                "documents": [hit[1] for hit in hits],
+                "metadatas": [hit[2] for hit in hits],
+            }
+        )
+    return output
+
+
+class VectorStore(ABC):
+    """Chunk documents, metadata and embeddings grouped by ``pdf_id``.
+
+    Query results are one ``{"documents", "metadatas", "distances"}`` dict per
+    query embedding, nearest first (squared L2, Chroma's default space).
+    """
+
+    #: Directory owned by the store; the page index is persisted alongside.
+    root: Path
+
+    def warm_up(self):
+        """Open any lazily created client ahead of the first request."""
+
+    @abstractmethod
+    def reset(self, pdf_id: str, metadata: Optional[Dict] = None):
+        """Drop everything stored for a PDF and start it afresh."""
+
+    @abstractmethod
+    def ensure(self, pdf_id: str, metadata: Optional[Dict] = None):
+        """Make sure the PDF can receive chunks; existing chunks are kept."""
+
+    @abstractmethod
+    def count(self, pdf_id: str) -> int:
+        """Number of chunks stored for a PDF."""
+
+    @abstractmethod
+    def add(
+        self,
+        pdf_id: str,
+        ids: List[str],
+        documents: List[str],
+        embeddings: Embeddings,
+        metadatas: List[Dict],
+    ):
+        """Append chunks for a PDF."""
+
+    @abstractmethod
+    def get(self, pdf_id: str, ids: Optional[List[str]] = None) -> Dict[str, List]:
+        """Return ``ids``/``documents``/``metadatas`` for the given ids (all chunks if None)."""
+
+    @abstractmethod
+    def query(
+        self,
+        pdf_id: str,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        exclude_pages: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict]:
+        """Nearest chunks of one PDF, skipping chunks that touch ``exclude_pages``."""
+
+    @abstractmethod
+    def search(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        pdf_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Nearest chunks across PDFs (all of them when ``pdf_ids`` is None)."""
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB persistent collections.
+
+    ``settings.CHROMA_STORAGE_MODE`` picks the layout: ``per_pdf`` keeps one
+    collection per PDF (named by pdf_id); ``shared`` stores every PDF in
+    ``CHROMA_SHARED_COLLECTION`` (split over ``CHROMA_SHARDS`` collections)
+    and scopes every read by the ``pdf_id`` chunk metadata.
+    """
+
+    def __init__(self, storage_mode: Optional[str] = None):
+        self.root = Path(settings.CHROMA_DB_PATH)
+        self.shared = (storage_mode or settings.CHROMA_STORAGE_MODE).lower() == "shared"
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._collections: Dict[str, object] = {}
+        # Handles are cached from ingestion and request worker threads alike.
+        self._collections_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Open the persistent Chroma client on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import chromadb
+                    from chromadb.config import Settings as ChromaSettings
+
+                    self._client = chromadb.PersistentClient(
+                        path=str(self.root),
+                        settings=ChromaSettings(anonymized_telemetry=False),
+                    )
+        return self._client
+
+    def warm_up(self):
+        self.client.heartbeat()
+
+    def collection_name(self, pdf_id: str) -> str:
+        """Name of the collection holding a PDF's chunks."""
+        if not self.shared:
+            return pdf_id
+        shards = self._shard_names()
+        return shards[zlib.crc32(pdf_id.encode("utf-8")) % len(shards)]
+
+    def reset(self, pdf_id: str, metadata: Optional[Dict] = None):
+        """Create a fresh collection for a PDF, replacing an existing one if needed.
+
+        In shared mode the PDF's existing chunks are deleted instead.
+        """
+        if self.shared:
+            collection = self.ensure(pdf_id)
+            collection.delete(where={"pdf_id": pdf_id})
+            return collection
+        with self._collections_lock:
+            self._collections.pop(pdf_id, None)
+            try:
+                self.client.delete_collection(name=pdf_id)
+            except Exception:
+                pass
+            collection = self.client.create_collection(name=pdf_id, metadata=metadata or {})
+            self._collections[pdf_id] = collection
+        return collection
+
+    def ensure(self, pdf_id: str, metadata: Optional[Dict] = None):
+        name = self.collection_name(pdf_id)
+        with self._collections_lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                # Document-level metadata only applies to per-PDF collections.
+                collection = self.client.get_or_create_collection(
+                    name=name, metadata=None if self.shared else metadata or None
+                )
+                self._collections[name] = collection
+        return collection
+
+    def count(self, pdf_id: str) -> int:
+        # Shared mode scans the PDF's ids; RAGService counts via the page index instead.
+        collection = self._collection(pdf_id)
+        if self.shared:
+            return len(collection.get(where={"pdf_id": pdf_id}, include=[])["ids"])
+        return collection.count()
+
+    def add(
+        self,
+        pdf_id: str,
+        ids: List[str],
+        documents: List[str],
+        embeddings: Embeddings,
+        metadatas: List[Dict],
+    ):
+        self._collection(pdf_id).add(
+            ids=ids,
+            documents=documents,
+            embeddings=_as_lists(embeddings),
+            metadatas=metadatas,
+        )
+
+    def get(self, pdf_id: str, ids: Optional[List[str]] = None) -> Dict[str, List]:
+        if ids is not None:
+            return self._collection(pdf_id).get(ids=ids, include=["documents", "metadatas"])
+        return self._collection(pdf_id).get(
+            where={"pdf_id": pdf_id} if self.shared else None, include=["documents", "metadatas"]
+        )
+
+    def query(
+        self,
+        pdf_id: str,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        exclude_pages: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict]:
+        clauses = [{"pdf_id": pdf_id}] if self.shared else []
+        if exclude_pages is not None:
+            start, end = exclude_pages
+            clauses.append({"$or": [{"page_end": {"$lt": start}}, {"page_start": {"$gt": end}}]})
+        where = None if not clauses else clauses[0] if len(clauses) == 1 else {"$and": clauses}
+        results = self._collection(pdf_id).query(
+            query_embeddings=_as_lists(query_embeddings),
+            n_results=n_results,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return self._split(results, len(query_embeddings))
+
+    def search(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        pdf_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Cross-document search (shared mode only); per-shard hits are merged by distance."""
+        if not self.shared:
+            raise ValueError("Cross-document search requires CHROMA_STORAGE_MODE=shared.")
+        where = None
+        if pdf_ids:
+            where = {"pdf_id": pdf_ids[0]} if len(pdf_ids) == 1 else {"pdf_id": {"$in": list(pdf_ids)}}
+        names = self._shard_names()
+        if pdf_ids:
+            names = sorted({self.collection_name(pdf_id) for pdf_id in pdf_ids})
+        results = []
+        for name in names:
+            collection = self._collection_by_name(name)
+            if collection is None:
+                continue
+            raw = collection.query(
+                query_embeddings=_as_lists(query_embeddings),
+                n_results=n_results,
+                where=where,
+                include=["documents", "metadatas", "distances"],
+            )
+            results.append(self._split(raw, len(query_embeddings)))
+        return _merge_hits(results, len(query_embeddings), n_results)
+
+    def migrate_to_shared(self, delete_source: bool = False, batch_size: int = 500) -> Dict[str, int]:
+        """Copy every per-PDF collection into the shared layout; returns chunks copied per pdf_id.
+
+        Chunk ids, documents, embeddings and metadata are carried over unchanged
+        (plus ``pdf_id``), so re-running the migration is idempotent.
+        """
+        if not self.shared:
+            raise ValueError("Set CHROMA_STORAGE_MODE=shared before migrating.")
+        shard_names = set(self._shard_names())
+        copied: Dict[str, int] = {}
+        for source in self.client.list_collections():
+            if source.name in shard_names:
+                continue
+            pdf_id = source.name
+            target = self.ensure(pdf_id)
+            copied[pdf_id] = 0
+            offset = 0
+            while True:
+                batch = source.get(
+                    limit=batch_size, offset=offset, include=["documents", "metadatas", "embeddings"]
+                )
+                if not batch["ids"]:
+                    break
+                target.upsert(
+                    ids=batch["ids"],
+                    documents=batch["documents"],
+                    embeddings=batch["embeddings"],
+                    metadatas=[{**(metadata or {}), "pdf_id": pdf_id} for metadata in batch["metadatas"]],
+                )
+                copied[pdf_id] += len(batch["ids"])
+                offset += len(batch["ids"])
+            if delete_source:
+                self.client.delete_collection(name=pdf_id)
+            logger.info("Migrated %d chunks of %s into %s", copied[pdf_id], pdf_id, target.name)
+        return copied
+
+    @staticmethod
+    def _split(results: Dict, queries: int) -> List[Dict]:
+        columns = {key: results.get(key) or [] for key in ("documents", "metadatas", "distances")}
+        return [
+            {key: values[idx] if idx < len(values) else [] for key, values in columns.items()}
+            for idx in range(queries)
+        ]
+
+    def _collection(self, pdf_id: str):
+        """Cached handle for the collection holding a PDF; raises if it doesn't exist."""
+        if self.shared:
+            return self.ensure(pdf_id)
+        with self._collections_lock:
+            collection = self._collections.get(pdf_id)
+            if collection is None:
+                collection = self.client.get_collection(name=pdf_id)
+                self._collections[pdf_id] = collection
+        return collection
+
+    def _collection_by_name(self, name: str):
+        with self._collections_lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                try:
+                    collection = self.client.get_collection(name=name)
+                except ValueError:
+                    return None
+                self._collections[name] = collection
+        return collection
+
+    def _shard_names(self) -> List[str]:
+        shards = max(1, settings.CHROMA_SHARDS)
+        if shards == 1:
+            return [settings.CHROMA_SHARED_COLLECTION]
+        return [f"{settings.CHROMA_SHARED_COLLECTION}_{idx}" for idx in range(shards)]
+
+
+@dataclass
+class _Table:
+    """One PDF loaded from disk: memory-mapped embeddings plus columnar metadata."""
+
+    embeddings: np.ndarray
+    norms: np.ndarray
+    page_start: np.ndarray
+    page_end: np.ndarray
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict] = field(default_factory=list)
+    positions: Dict[str, int] = field(default_factory=dict)
+
+
+class NumpyVectorStore(VectorStore):
+    """Brute-force in-process store: one directory of flat files per PDF.
+
+    ``embeddings.f32`` holds the float32 matrix (read through ``np.memmap``),
+    ``page_start.i32``/``page_end.i32`` are the filter columns and
+    ``records.jsonl`` keeps ids, documents and metadata. Queries apply the
+    page-exclusion mask and take top-k with one matrix product, which beats
+    an HNSW index at textbook scale (a few thousand chunks).
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.NUMPY_STORE_PATH)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._tables: Dict[str, _Table] = {}
+
+    def reset(self, pdf_id: str, metadata: Optional[Dict] = None):
+        directory = self._directory(pdf_id)
+        with self._lock:
+            self._tables.pop(pdf_id, None)
+            shutil.rmtree(directory, ignore_errors=True)
+        self.ensure(pdf_id, metadata)
+
+    def ensure(self, pdf_id: str, metadata: Optional[Dict] = None):
+        directory = self._directory(pdf_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        info = directory / "collection.json"
+        if not info.exists():
+            info.write_text(json.dumps({"pdf_id": pdf_id, "metadata": metadata or {}}))
+
+    def count(self, pdf_id: str) -> int:
+        return len(self._table(pdf_id).ids)
+
+    def add(
+        self,
+        pdf_id: str,
+        ids: List[str],
+        documents: List[str],
+        embeddings: Embeddings,
+        metadatas: List[Dict],
+    ):
+        directory = self._directory(pdf_id)
+        if not directory.exists():
+            raise ValueError(f"Collection {pdf_id} does not exist.")
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._lock:
+            self._tables.pop(pdf_id, None)
+            self._truncate_torn(directory, int(matrix.shape[1]))
+            with (directory / "embeddings.f32").open("ab") as handle:
+                handle.write(matrix.tobytes())
+            for column in ("page_start", "page_end"):
+                values = np.asarray([metadata[column] for metadata in metadatas], dtype=np.int32)
+                with (directory / f"{column}.i32").open("ab") as handle:
+                    handle.write(values.tobytes())
+            with (directory / "records.jsonl").open("a", encoding="utf-8") as handle:
+                for doc_id, document, metadata in zip(ids, documents, metadatas):
+                    record = {"id": doc_id, "document": document, "metadata": metadata}
+                    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            info = directory / "collection.json"
+            payload = json.loads(info.read_text()) if info.exists() else {"pdf_id": pdf_id, "metadata": {}}
+            payload["dimension"] = int(matrix.shape[1])
+            info.write_text(json.dumps(payload))
+
+    def get(self, pdf_id: str, ids: Optional[List[str]] = None) -> Dict[str, List]:
+        table = self._table(pdf_id)
+        if ids is None:
+            rows = range(len(table.ids))
+        else:
+            rows = [table.positions[doc_id] for doc_id in ids if doc_id in table.positions]
+        return {
+            "ids": [table.ids[row] for row in rows],
+            "documents": [table.documents[row] for row in rows],
+            "metadatas": [table.metadatas[row] for row in rows],
+        }
+
+    def query(
+        self,
+        pdf_id: str,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        exclude_pages: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict]:
+        table = self._table(pdf_id)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(len(queries), -1) if queries.size else queries.reshape(0, 0)
+        empty = [{"documents": [], "metadatas": [], "distances": []} for _ in range(len(queries))]
+        if not len(table.ids) or not len(queries):
+            return empty
+
+        if exclude_pages is None:
+            rows = None
+            matrix, norms = table.embeddings, table.norms
+        else:
+            start, end = exclude_pages
+            rows = np.flatnonzero((table.page_end < start) | (table.page_start > end))
+            if not rows.size:
+                return empty
+            matrix, norms = table.embeddings[rows], table.norms[rows]
+
+        # Squared L2, matching Chroma's default distance.
+        query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        distances = norms[None, :] - 2.0 * (queries @ matrix.T) + query_norms
+        k = min(n_results, distances.shape[1])
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        output = []
+        for idx, candidates in enumerate(nearest):
+            candidates = candidates[np.argsort(distances[idx, candidates])]
+            hits = candidates if rows is None else rows[candidates]
+            output.append(
+                {
+                    "documents": [table.documents[row] for row in hits],
+                    "metadatas": [table.metadatas[row] for row in hits],
+                    "distances": distances[idx, candidates].tolist(),
+                }
+            )
+        return output
+
+    def search(
+        self,
+        query_embeddings: Embeddings,
+        n_results: int = 5,
+        pdf_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        if pdf_ids is None:
+            pdf_ids = [
+                json.loads(info.read_text())["pdf_id"] for info in self.root.glob("*/collection.json")
+            ]
+        results = [self.query(pdf_id, query_embeddings, n_results) for pdf_id in pdf_ids]
+        return _merge_hits(results, len(query_embeddings), n_results)
+
+    def _directory(self, pdf_id: str) -> Path:
+        return self.root / re.sub(r"[^\w.-]", "_", pdf_id)
+
+    @staticmethod
+    def _truncate_torn(directory: Path, dimension: int):
+        """Cut every column file back to the rows all of them hold, so appends stay aligned."""
+        info = directory / "collection.json"
+        if info.exists():
+            dimension = json.loads(info.read_text()).get("dimension") or dimension
+        records_path = directory / "records.jsonl"
+        offsets = [0]
+        if records_path.exists():
+            with records_path.open("rb") as handle:
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    offsets.append(offsets[-1] + len(line))
+        widths = {"embeddings.f32": dimension * 4, "page_start.i32": 4, "page_end.i32": 4}
+        sizes = {
+            name: (directory / name).stat().st_size if (directory / name).exists() else 0
+            for name in widths
+        }
+        rows = min(len(offsets) - 1, *(sizes[name] // width for name, width in widths.items()))
+        targets = {name: rows * width for name, width in widths.items() if sizes[name] > rows * width}
+        if records_path.exists() and records_path.stat().st_size > offsets[rows]:
+            targets["records.jsonl"] = offsets[rows]
+        for name, size in targets.items():
+            with (directory / name).open("r+b") as handle:
+                handle.truncate(size)
+        if targets:
+            logger.warning("Truncated torn write in %s back to %d rows", directory, rows)
+
+    def _table(self, pdf_id: str) -> _Table:
+        with self._lock:
+            table = self._tables.get(pdf_id)
+            if table is None:
+                table = self._load(pdf_id)
+                self._tables[pdf_id] = table
+            return table
+
+    def _load(self, pdf_id: str) -> _Table:
+        directory = self._directory(pdf_id)
+        info = directory / "collection.json"
+        if not info.exists():
+            raise ValueError(f"Collection {pdf_id} does not exist.")
+        dimension = json.loads(info.read_text()).get("dimension")
+        records = []
+        records_path = directory / "records.jsonl"
+        if records_path.exists():
+            with records_path.open(encoding="utf-8") as handle:
+                # An unterminated last line is a torn append; the next add truncates it.
+                records = [json.loads(line) for line in handle if line.endswith("\n") and line.strip()]
+        if not dimension or not records:
+            empty = np.empty((0, dimension or 0), dtype=np.float32)
+            return _Table(empty, np.empty(0, dtype=np.float32), np.empty(0, np.int32), np.empty(0, np.int32))
+
+        page_start = np.fromfile(directory / "page_start.i32", dtype=np.int32)
+        page_end = np.fromfile(directory / "page_end.i32", dtype=np.int32)
+        stored = (directory / "embeddings.f32").stat().st_size // (dimension * 4)
+        # Files are appended in step; a torn write leaves them briefly uneven, so trust the shortest.
+        rows = min(len(records), len(page_start), len(page_end), stored)
+        embeddings = np.memmap(
+            directory / "embeddings.f32", dtype=np.float32, mode="r", shape=(stored, dimension)
+        )[:rows]
+        records = records[:rows]
+        return _Table(
+            embeddings=embeddings,
+            norms=np.einsum("ij,ij->i", embeddings, embeddings),
+            page_start=page_start[:rows],
+            page_end=page_end[:rows],
+            ids=[record["id"] for record in records],
+            documents=[record["document"] for record in records],
+            metadatas=[record["metadata"] for record in records],
+            positions={record["id"]: row for row, record in enumerate(records)},
+        )
+
+
+def build_vector_store() -> VectorStore:
+    """Return the backend selected by ``settings.VECTOR_STORE_BACKEND``."""
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "chroma":
+        return ChromaVectorStore()
+    if backend == "numpy":
+        return NumpyVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND!r}")
@@ -0,0 +1,130 @@
+"""Chroma layout benchmark: per-PDF collections vs. one shared collection.
+
+Each (mode, PDF count) case runs in a fresh interpreter against a temporary
+store, ingests synthetic chunks with random embeddings, then times
+``fetch_pages`` + ``query_related_batch`` on random PDFs and reports RSS.
+Run from ``backend/``::
+
+    python -m benchmarks.bench_chroma --pdfs 100,1000 --chunks 40 --queries 200
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIMENSION = 384
+
+
+def rss_mb() -> float:
+    """Current resident set size, from /proc when available."""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(mode: str, pdfs: int, chunks: int, queries: int, seed: int = 7) -> dict:
+    import numpy as np
+
+    from app.services.rag_service import RAGService
+    from app.services.vector_store import ChromaVectorStore
+
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    rag = RAGService(ChromaVectorStore(storage_mode=mode))
+    pages_per_chunk = 2
+    started = time.perf_counter()
+    for index in range(pdfs):
+        pdf_id = f"pdf-{index:05d}"
+        rag.reset_collection(pdf_id, metadata={"title": pdf_id})
+        records = [
+            {
+                "text": f"{pdf_id} chunk {n}",
+                "page_start": n * pages_per_chunk + 1,
+                "page_end": n * pages_per_chunk + pages_per_chunk,
+                "word_count": 4,
+            }
+            for n in range(chunks)
+        ]
+        rag.add_chunks(pdf_id, records, rng.standard_normal((chunks, DIMENSION), dtype=np.float32))
+    ingest_seconds = time.perf_counter() - started
+    rss_after_ingest = rss_mb()
+
+    # Fresh service so every query pays for looking up (and, per-PDF, loading) its collection.
+    rag = RAGService(ChromaVectorStore(storage_mode=mode))
+    latencies = []
+    total_pages = chunks * pages_per_chunk
+    for _ in range(queries):
+        pdf_id = f"pdf-{picker.randrange(pdfs):05d}"
+        start = picker.randint(1, max(1, total_pages - 10))
+        embeddings = rng.standard_normal((5, DIMENSION), dtype=np.float32)
+        began = time.perf_counter()
+        rag.fetch_pages(pdf_id, start, start + 10)
+        rag.query_related_batch(pdf_id, embeddings, (start, start + 10))
+        latencies.append((time.perf_counter() - began) * 1000)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "pdfs": pdfs,
+        "ingest_s": round(ingest_seconds, 2),
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "rss_ingest_mb": round(rss_after_ingest, 1),
+        "rss_query_mb": round(rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", default="100,1000", help="Comma-separated PDF counts")
+    parser.add_argument("--chunks", type=int, default=40, help="Chunks per PDF")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--modes", default="per_pdf,shared")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, pdfs = args.child.split(":")
+        print(json.dumps(run_case(mode, int(pdfs), args.chunks, args.queries)))
+        return
+
+    header = f"{'mode':<8} {'pdfs':>5} {'ingest s':>9} {'p50 ms':>8} {'p95 ms':>8} {'RSS ingest':>11} {'RSS query':>10}"
+    print(header)
+    for pdfs in [int(value) for value in args.pdfs.split(",")]:
+        for mode in args.modes.split(","):
+            with tempfile.TemporaryDirectory() as store:
+                env = {
+                    **os.environ,
+                    "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"),
+                    "CHROMA_DB_PATH": store,
+                }
+                output = subprocess.run(
+                    [
+                        sys.executable, "-m", "benchmarks.bench_chroma",
+                        "--child", f"{mode}:{pdfs}",
+                        "--chunks", str(args.chunks),
+                        "--queries", str(args.queries),
+                    ],
+                    check=True, capture_output=True, text=True, env=env,
+                ).stdout
+            row = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{row['mode']:<8} {row['pdfs']:>5} {row['ingest_s']:>9} {row['query_p50_ms']:>8} "
+                f"{row['query_p95_ms']:>8} {row['rss_ingest_mb']:>10}M {row['rss_query_mb']:>9}M"
+            )
+
+
+if __name__ == "__main__":
+    main()
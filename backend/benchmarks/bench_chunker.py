@@ -0,0 +1,134 @@
+"""Micro-benchmark: legacy regex chunker vs. structured-page SmartChunker.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_chunker --pages 500 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app.services.chunker import SmartChunker
+
+WORDS = (
+    "cell membrane protein energy enzyme reaction molecule structure function "
+    "transport signal gene expression pathway organism tissue system process"
+).split()
+
+
+class LegacyChunker:
+    """The original SmartChunker.chunk_text, kept verbatim for comparison."""
+
+    def __init__(self, chunk_size: int = 500, overlap: int = 100):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk_text(self, text: str) -> List[Dict]:
+        paragraphs = re.split(r"\n\s*\n", text)
+        chunks = []
+        current_chunk = []
+        current_word_count = 0
+        chunk_start_page = 1
+        current_page = 1
+
+        for paragraph in paragraphs:
+            clean_para = paragraph.strip()
+            if not clean_para:
+                continue
+
+            page_marker = re.search(r"\[PAGE (\d+)\]", clean_para)
+            if page_marker:
+                current_page = int(page_marker.group(1))
+                clean_para = re.sub(r"\[PAGE \d+\]", "", clean_para).strip()
+
+            para_words = clean_para.split()
+            if current_word_count + len(para_words) > self.chunk_size and current_word_count > 0:
+                chunks.append(
+                    {
+                        "text": " ".join(current_chunk).strip(),
+                        "page_start": chunk_start_page,
+                        "page_end": current_page,
+                        "word_count": current_word_count,
+                    }
+                )
+                overlap_words = current_chunk[-self.overlap :] if self.overlap else []
+                current_chunk = overlap_words + para_words
+                current_word_count = len(current_chunk)
+                chunk_start_page = current_page
+            else:
+                current_chunk.extend(para_words)
+                current_word_count += len(para_words)
+
+        if current_chunk:
+            chunks.append(
+                {
+                    "text": " ".join(current_chunk).strip(),
+                    "page_start": chunk_start_page,
+                    "page_end": current_page,
+                    "word_count": current_word_count,
+                }
+            )
+        return chunks
+
+
+def build_corpus(pages: int, seed: int = 7) -> List[Tuple[int, str]]:
+    """Synthetic book: each page has 4-8 paragraphs of 20-90 words."""
+    rng = random.Random(seed)
+    records = []
+    for page_number in range(1, pages + 1):
+        paragraphs = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 90)))
+            for _ in range(rng.randint(4, 8))
+        ]
+        records.append((page_number, "\n\n".join(paragraphs)))
+    return records
+
+
+def marked_text(records: List[Tuple[int, str]]) -> str:
+    return "".join(f"\n[PAGE {number}]\n{text}\n" for number, text in records)
+
+
+def time_call(func, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=100)
+    args = parser.parse_args()
+
+    records = build_corpus(args.pages)
+    text = marked_text(records)
+    legacy = LegacyChunker(args.chunk_size, args.overlap)
+    chunker = SmartChunker(args.chunk_size, args.overlap)
+
+    cases = {
+        "legacy chunk_text": lambda: legacy.chunk_text(text),
+        "new chunk_text": lambda: chunker.chunk_text(text),
+        "new iter_chunks": lambda: list(chunker.iter_chunks(records)),
+    }
+    words = sum(len(page_text.split()) for _, page_text in records)
+    print(f"corpus: {args.pages} pages, {words} words, {len(text) / 1e6:.1f} MB")
+    for name, func in cases.items():
+        samples = time_call(func, args.repeat)
+        chunks = func()
+        print(
+            f"{name:<18} median {statistics.median(samples) * 1000:8.1f} ms  "
+            f"min {min(samples) * 1000:8.1f} ms  chunks {len(chunks)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
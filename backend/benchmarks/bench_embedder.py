@@ -0,0 +1,80 @@
+"""Embedding throughput: legacy list output vs. the torch / ONNX / int8 backends.
+
+Run from ``backend/`` (the ONNX cases need ``pip install onnxruntime``)::
+
+    python -m benchmarks.bench_embedder --chunks 512 --batch-size 64
+"""
+
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+# Settings requires a Gemini key even though nothing here calls Gemini.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.config import settings  # noqa: E402
+from app.services.embedder import EmbedderService  # noqa: E402
+
+WORDS = (
+    "cell membrane protein energy enzyme reaction molecule structure function "
+    "transport signal gene expression pathway organism tissue system process"
+).split()
+
+
+def build_chunks(count: int, words: int = 180, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words))) for _ in range(count)]
+
+
+def legacy_encode(model, texts):
+    """The pre-engine path: default batch size, then one Python list per vector."""
+    return [emb.tolist() for emb in model.encode(texts)]
+
+
+def timed(func, repeat: int):
+    func()  # warm-up (ONNX session/graph setup, torch allocator)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    args = parser.parse_args()
+
+    texts = build_chunks(args.chunks)
+    settings.EMBEDDING_BATCH_SIZE = args.batch_size
+    # Repeated runs over the same texts would otherwise time embedding cache hits.
+    settings.EMBEDDING_CACHE_ENABLED = False
+    baseline, reference = timed(lambda: legacy_encode(EmbedderService._load_model(), texts), args.repeat)
+    reference = np.asarray(reference, dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    print(f"{args.chunks} chunks, batch size {args.batch_size}")
+    print(f"{'legacy lists':<12} {args.chunks / baseline:8.1f} chunks/s")
+
+    for backend in args.backends.split(","):
+        settings.EMBEDDING_BACKEND = backend
+        try:
+            embedder = EmbedderService()
+        except RuntimeError as exc:
+            print(f"{backend:<12} skipped: {exc}")
+            continue
+        elapsed, embeddings = timed(lambda: embedder.encode(texts), args.repeat)
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        agreement = float(np.mean(np.sum(normalized * reference, axis=1)))
+        print(
+            f"{backend:<12} {args.chunks / elapsed:8.1f} chunks/s  "
+            f"speedup {baseline / elapsed:4.2f}x  mean cosine vs torch {agreement:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Offline pipeline benchmark: ingestion, generate_mcqs and HTTP load against a fake Gemini.
+
+Synthetic PDFs (``benchmarks.synthetic_pdf``) are ingested into a temporary
+data directory and Gemini is replaced by ``benchmarks.fake_genai``, so no
+network or API key is needed; the embedding model must already be in the
+local Hugging Face cache (downloads are disabled). Results are written as
+JSON for comparison between runs. Run from ``backend/``::
+
+    python -m benchmarks.bench_pipeline --output before.json
+    python -m benchmarks.bench_pipeline --output after.json --compare before.json
+    python -m benchmarks.bench_pipeline --scenarios http --concurrency 16 --requests 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCENARIOS = ("ingest", "generate", "http")
+
+
+def configure_environment(workdir: Path, llm_cache: bool):
+    """Point every store at ``workdir`` and keep the process offline; must run before importing ``app``."""
+    os.environ.update(
+        {
+            "CHROMA_DB_PATH": str(workdir / "chroma_db"),
+            "NUMPY_STORE_PATH": str(workdir / "vector_store"),
+            "INGEST_MANIFEST_PATH": str(workdir / "ingest_manifest.sqlite3"),
+            "INGEST_JOBS_DB_PATH": str(workdir / "ingest_jobs.sqlite3"),
+            "LLM_CACHE_PATH": str(workdir / "llm_cache.sqlite3"),
+            "LLM_CACHE_ENABLED": str(llm_cache),
+            "EMBEDDING_CACHE_DIR": str(workdir / "embedding_cache"),
+            "WARMUP_ON_STARTUP": "False",
+            "HF_HUB_OFFLINE": "1",
+            "TRANSFORMERS_OFFLINE": "1",
+            "ANONYMIZED_TELEMETRY": "False",
+        }
+    )
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+
+def rss_mb() -> float:
+    """Current resident set size, from /proc when available."""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/min/max/mean of latencies given in seconds, reported in milliseconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, max(0, int(round(len(ordered) * 0.95)) - 1))]
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+def run_ingest(corpus: Dict[int, Path]) -> List[Dict]:
+    from app.config import settings
+    from app.services import metrics, registry
+
+    service = registry.get_ingestion_service()
+    rows = []
+    for pages, path in corpus.items():
+        with metrics.track_stages() as timings:
+            started = time.perf_counter()
+            result = service.ingest(path, title=path.name)
+            seconds = time.perf_counter() - started
+            # Concept indexing runs in the background; wait so generation measures index lookups.
+            index_seconds = None
+            if settings.CONCEPT_INDEX_ENABLED:
+                registry.get_concept_indexer().wait()
+                index_seconds = round(time.perf_counter() - started - seconds, 3)
+        rows.append(
+            {
+                "pages": pages,
+                "pdf_id": result.pdf_id,
+                "chunks": result.chunks_created,
+                "seconds": round(seconds, 3),
+                "pages_per_s": round(pages / seconds, 2),
+                "chunks_per_s": round(result.chunks_created / seconds, 2),
+                "concept_index_seconds": index_seconds,
+                "rss_mb": round(rss_mb(), 1),
+                "stages": timings.as_dict(),
+            }
+        )
+        print(f"ingest   {pages:>5}p  {seconds:8.2f} s  {rows[-1]['pages_per_s']:8.2f} pages/s", file=sys.stderr)
+    return rows
+
+
+async def run_generate(pdf_id: str, page_end: int, questions: List[int], repeat: int, client) -> List[Dict]:
+    from app.services import metrics, registry
+
+    generator = await asyncio.to_thread(registry.get_mcq_generator)
+    rows = []
+    for count in questions:
+        samples, generated, stages = [], [], None
+        calls_before = client.total_calls
+        for _ in range(repeat):
+            with metrics.track_stages() as timings:
+                started = time.perf_counter()
+                mcqs = await generator.agenerate_mcqs(pdf_id, 1, page_end, count, "medium")
+                samples.append(time.perf_counter() - started)
+            generated.append(len(mcqs))
+            stages = timings.as_dict()
+        rows.append(
+            {
+                "questions": count,
+                "repeat": repeat,
+                "generated_mean": round(statistics.fmean(generated), 2),
+                "gemini_calls_per_run": round((client.total_calls - calls_before) / repeat, 2),
+                **summarize(samples),
+                "stages_last_run": stages,
+            }
+        )
+        print(
+            f"generate {count:>5}q  p50 {rows[-1]['p50_ms']:9.1f} ms  p95 {rows[-1]['p95_ms']:9.1f} ms",
+            file=sys.stderr,
+        )
+    return rows
+
+
+async def run_http(pdf_id: str, page_end: int, questions: int, requests: int, concurrency: int) -> Dict:
+    import httpx
+
+    from app.main import app
+
+    payload = {"pdf_id": pdf_id, "page_start": 1, "page_end": page_end, "num_questions": questions}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+
+        async def one():
+            async with semaphore:
+                began = time.perf_counter()
+                response = await http.post("/api/mcq/generate", json=payload)
+                latencies.append(time.perf_counter() - began)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        # Concurrent liveness probes show whether generation starves the event loop.
+        async def probe() -> List[float]:
+            samples = []
+            while len(latencies) < requests:
+                began = time.perf_counter()
+                await http.get("/healthz")
+                samples.append(time.perf_counter() - began)
+                await asyncio.sleep(0.05)
+            return samples
+
+        started = time.perf_counter()
+        probes = asyncio.create_task(probe())
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        probe_samples = await probes
+
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "questions": questions,
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 3),
+        "statuses": statuses,
+        **summarize(latencies),
+        "healthz": summarize(probe_samples) if probe_samples else None,
+        "rss_mb": round(rss_mb(), 1),
+    }
+    print(
+        f"http     c={concurrency:<3} {result['requests_per_s']:8.3f} req/s  p95 {result['p95_ms']:9.1f} ms",
+        file=sys.stderr,
+    )
+    return result
+
+
+def compare(current: Dict, baseline_path: str):
+    """Print latency changes against an earlier results file."""
+    baseline = json.loads(Path(baseline_path).read_text())
+
+    def delta(label: str, new: Optional[float], old: Optional[float]):
+        if new is None or old is None or not old:
+            return
+        print(f"{label:<32} {old:>10.2f} -> {new:>10.2f}  ({(new - old) / old * 100:+.1f}%)")
+
+    old_ingest = {row["pages"]: row for row in baseline.get("ingest", [])}
+    for row in current.get("ingest", []):
+        delta(f"ingest {row['pages']}p seconds", row["seconds"], old_ingest.get(row["pages"], {}).get("seconds"))
+        delta(
+            f"concept index {row['pages']}p seconds",
+            row.get("concept_index_seconds"),
+            old_ingest.get(row["pages"], {}).get("concept_index_seconds"),
+        )
+    old_generate = {row["questions"]: row for row in baseline.get("generate", [])}
+    for row in current.get("generate", []):
+        old = old_generate.get(row["questions"], {})
+        delta(f"generate {row['questions']}q p50 ms", row["p50_ms"], old.get("p50_ms"))
+    if current.get("http") and baseline.get("http"):
+        delta("http p95 ms", current["http"]["p95_ms"], baseline["http"]["p95_ms"])
+        delta("http requests/s", current["http"]["requests_per_s"], baseline["http"]["requests_per_s"])
+
+
+async def run(args, workdir: Path) -> Dict:
+    from app.config import settings
+    from app.services import registry
+    from benchmarks.fake_genai import FakeGenaiClient, install
+    from benchmarks.synthetic_pdf import build_corpus
+
+    client = install(
+        FakeGenaiClient(
+            latency=args.latency,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+            invalid_rate=args.invalid_rate,
+        )
+    )
+    scenarios = args.scenarios.split(",")
+    sizes = [int(value) for value in args.sizes.split(",")]
+    corpus = build_corpus(workdir / "corpus", sizes)
+
+    results: Dict = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fake_gemini": {
+                "latency_s": args.latency,
+                "jitter_s": args.jitter,
+                "failure_rate": args.failure_rate,
+                "invalid_rate": args.invalid_rate,
+            },
+            "settings": {
+                name: getattr(settings, name)
+                for name in (
+                    "EMBEDDING_BACKEND", "CHUNK_STRATEGY", "VECTOR_STORE_BACKEND", "CHROMA_STORAGE_MODE",
+                    "MCQ_BATCH_SIZE", "MCQ_GENERATION_CONCURRENCY", "INGEST_BATCH_SIZE", "LLM_CACHE_ENABLED",
+                    "GEMINI_RATE_LIMIT_RPM", "GEMINI_MAX_CONCURRENCY", "GEMINI_MAX_RETRIES",
+                    "MCQ_CONCEPT_BACKLOG", "MCQ_SPECULATIVE_RATIO", "MCQ_CALL_BUDGET_FACTOR",
+                    "CONCEPT_INDEX_ENABLED", "CONCEPT_INDEX_WINDOW_CHARS",
+                )
+            },
+        }
+    }
+
+    started = time.perf_counter()
+    await asyncio.to_thread(registry.warm_up)
+    results["meta"]["warm_up_s"] = round(time.perf_counter() - started, 3)
+
+    # Generation and HTTP scenarios need an ingested PDF even when ingestion itself isn't measured.
+    to_ingest = corpus if "ingest" in scenarios else {sizes[0]: corpus[sizes[0]]}
+    ingest_rows = await asyncio.to_thread(run_ingest, to_ingest)
+    if "ingest" in scenarios:
+        results["ingest"] = ingest_rows
+    pdf_id = ingest_rows[0]["pdf_id"]
+    page_end = min(args.page_span, ingest_rows[0]["pages"])
+
+    if "generate" in scenarios:
+        results["generate"] = await run_generate(pdf_id, page_end, args.questions, args.repeat, client)
+    if "http" in scenarios:
+        results["http"] = await run_http(pdf_id, page_end, args.http_questions, args.requests, args.concurrency)
+    results["gemini_calls"] = dict(client.calls)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated: ingest,generate,http")
+    parser.add_argument("--sizes", default="20,100,400", help="Synthetic PDF page counts")
+    parser.add_argument("--questions", default="5,10,20", type=lambda value: [int(v) for v in value.split(",")])
+    parser.add_argument("--repeat", type=int, default=3, help="generate_mcqs runs per question count")
+    parser.add_argument("--page-span", type=int, default=30, help="Pages per generation request")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake Gemini latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--requests", type=int, default=32, help="HTTP generate requests")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--http-questions", type=int, default=5)
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the Gemini response cache on")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="msq-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, args.llm_cache)
+        results = asyncio.run(run(args, workdir))
+        from app.services import registry
+
+        registry.shutdown()
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cold-start timing: ``import app.main`` and the background warm-up, each in a fresh interpreter.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --importtime 15   # slowest modules imported by app.main
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+"""
+
+WARMUP_SNIPPET = """
+import time
+import app.main
+from app.services import registry
+started = time.perf_counter()
+registry.warm_up()
+print(time.perf_counter() - started)
+"""
+
+
+def run_snippet(snippet: str) -> float:
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark")}
+    output = subprocess.run(
+        [sys.executable, "-c", snippet], check=True, capture_output=True, text=True, env=env
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int):
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark")}
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(.*)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(3).strip()))
+    for cumulative, module in sorted(rows, reverse=True)[:limit]:
+        print(f"{cumulative / 1000:9.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-warmup", action="store_true", help="Only time the import.")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    if args.importtime:
+        slowest_imports(args.importtime)
+        return
+
+    cases = {"import app.main": IMPORT_SNIPPET}
+    if not args.skip_warmup:
+        cases["registry.warm_up()"] = WARMUP_SNIPPET
+    for name, snippet in cases.items():
+        samples = [run_snippet(snippet) for _ in range(args.repeat)]
+        print(
+            f"{name:<20} median {statistics.median(samples):6.2f} s  "
+            f"min {min(samples):6.2f} s  max {max(samples):6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Vector-store benchmark: Chroma vs. the in-process NumPy backend.
+
+Each backend runs in a fresh interpreter against a temporary directory,
+ingests synthetic chunks with random embeddings through ``RAGService``, then
+times ``query_related_batch`` (the distractor lookup) on random PDFs.
+Run from ``backend/``::
+
+    python -m benchmarks.bench_vector_store --pdfs 20 --chunks 400 --queries 200
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIMENSION = 384
+
+
+def run_case(backend: str, pdfs: int, chunks: int, queries: int, seed: int = 7) -> dict:
+    import numpy as np
+
+    from app.services.rag_service import RAGService
+    from app.services.vector_store import build_vector_store
+
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    rag = RAGService(build_vector_store())
+    pages_per_chunk = 2
+    started = time.perf_counter()
+    for index in range(pdfs):
+        pdf_id = f"pdf-{index:05d}"
+        rag.reset_collection(pdf_id, metadata={"title": pdf_id})
+        records = [
+            {
+                "text": f"{pdf_id} chunk {n}",
+                "page_start": n * pages_per_chunk + 1,
+                "page_end": n * pages_per_chunk + pages_per_chunk,
+                "word_count": 4,
+            }
+            for n in range(chunks)
+        ]
+        rag.add_chunks(pdf_id, records, rng.standard_normal((chunks, DIMENSION), dtype=np.float32))
+    ingest_seconds = time.perf_counter() - started
+
+    rag = RAGService(build_vector_store())
+    latencies = []
+    total_pages = chunks * pages_per_chunk
+    for _ in range(queries):
+        pdf_id = f"pdf-{picker.randrange(pdfs):05d}"
+        start = picker.randint(1, max(1, total_pages - 10))
+        embeddings = rng.standard_normal((5, DIMENSION), dtype=np.float32)
+        began = time.perf_counter()
+        rag.query_related_batch(pdf_id, embeddings, (start, start + 10))
+        latencies.append((time.perf_counter() - began) * 1000)
+    latencies.sort()
+    return {
+        "backend": backend,
+        "chunks": pdfs * chunks,
+        "ingest_chunks_per_s": round(pdfs * chunks / ingest_seconds, 1),
+        "queries_per_s": round(len(latencies) / (sum(latencies) / 1000), 1),
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=400, help="Chunks per PDF")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", default="chroma,numpy")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.pdfs, args.chunks, args.queries)))
+        return
+
+    print(f"{'backend':<8} {'chunks':>7} {'ingest/s':>10} {'queries/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for backend in args.backends.split(","):
+        with tempfile.TemporaryDirectory() as store:
+            env = {
+                **os.environ,
+                "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"),
+                "VECTOR_STORE_BACKEND": backend,
+                "CHROMA_DB_PATH": os.path.join(store, "chroma"),
+                "NUMPY_STORE_PATH": os.path.join(store, "numpy"),
+            }
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_vector_store",
+                    "--child", backend,
+                    "--pdfs", str(args.pdfs),
+                    "--chunks", str(args.chunks),
+                    "--queries", str(args.queries),
+                ],
+                check=True, capture_output=True, text=True, env=env,
+            ).stdout
+        row = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{row['backend']:<8} {row['chunks']:>7} {row['ingest_chunks_per_s']:>10} "
+            f"{row['queries_per_s']:>10} {row['query_p50_ms']:>8} {row['query_p95_ms']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Offline stand-in for ``google.genai.Client`` returning canned JSON.
+
+Answers the prompts built by ``ConceptExtractor``, ``MCQGenerator`` and
+``TranslatorService`` after a configurable latency, so the full pipeline can
+be exercised without network access or an API key::
+
+    client = install(FakeGenaiClient(latency=0.3, jitter=0.1))
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+class FakeServerError(RuntimeError):
+    """Looks like a Gemini 503 to ``llm_client``'s retry logic."""
+
+    code = 503
+
+
+@dataclass
+class FakeUsage:
+    prompt_token_count: int
+    candidates_token_count: int
+
+
+@dataclass
+class FakeResponse:
+    text: str
+    usage_metadata: FakeUsage
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _choice(letter: str, concept: str, correct: bool) -> Dict:
+    label = "the defining property" if correct else f"an unrelated property ({letter})"
+    return {
+        "id": letter,
+        "text_en": f"{concept.capitalize()} is best described by {label} of the topic",
+        "text_mn": f"{concept} - хариулт {letter}",
+        "is_correct": correct,
+        "source": "Page 1",
+        "explanation": "Stated directly in the primary context." if correct else "Describes a related idea.",
+    }
+
+
+def _mcq(concept: str, difficulty: str) -> Dict:
+    return {
+        "question_en": f"Which statement best explains the role of {concept} in this chapter?",
+        "question_mn": f"Энэ бүлэгт {concept}-ийн үүргийг аль нь хамгийн сайн тайлбарлах вэ?",
+        "choices": [_choice(letter, concept, letter == "A") for letter in "ABCD"],
+        "concept": concept,
+        "difficulty": difficulty,
+        "explanation_en": f"The primary context defines {concept} explicitly.",
+        "explanation_mn": f"{concept}-ийг үндсэн текстэд тодорхойлсон.",
+    }
+
+
+@dataclass
+class FakeGenaiClient:
+    """Mimics ``client.models.generate_content`` and ``client.aio.models.generate_content``.
+
+    Each call sleeps ``latency`` seconds plus up to ``jitter`` more. With
+    ``failure_rate`` a fraction of calls raise a retryable 503, and with ``invalid_rate`` a
+    fraction of MCQs come back structurally invalid (three choices), which
+    exercises the retry and validation paths. Concept extraction returns as
+    many concepts as the prompt asks for, or ``concepts`` if it names no count.
+    """
+
+    latency: float = 0.3
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    invalid_rate: float = 0.0
+    concepts: int = 20
+    seed: int = 0
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self.models = _Models(self)
+        self.aio = _Aio(_AsyncModels(self))
+
+    @property
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def respond(self, prompt: str) -> FakeResponse:
+        """Build the canned response for ``prompt`` (no waiting)."""
+        kind, text = self._answer(prompt)
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            fail = self._rng.random() < self.failure_rate
+        if fail:
+            raise FakeServerError(f"Fake Gemini failure ({kind})")
+        return FakeResponse(text, FakeUsage(_tokens(prompt), _tokens(text)))
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self._rng.random() * self.jitter
+
+    def _answer(self, prompt: str):
+        if "extract the key concepts" in prompt:
+            match = re.search(r"Include (\d+) distinct concept", prompt)
+            count = int(match.group(1)) if match else self.concepts
+            topics = re.findall(r"Chapter \d+: ([^(\n]+?) \(page", prompt) or ["the topic"]
+            concepts = [
+                f"{topics[idx % len(topics)].strip().lower()} aspect {idx + 1}" for idx in range(count)
+            ]
+            return "concepts", json.dumps({"concepts": concepts})
+        if "OUTPUT A JSON ARRAY ONLY" in prompt:
+            difficulty = self._difficulty(prompt)
+            concepts = re.findall(r'^\d+\. Concept: "(.*)"$', prompt, flags=re.MULTILINE)
+            return "mcq_batch", json.dumps([self._maybe_invalid(_mcq(c, difficulty)) for c in concepts])
+        if "creating a single high-quality multiple choice question" in prompt:
+            match = re.search(r'- Concept: "(.*)"', prompt)
+            concept = match.group(1) if match else "concept"
+            return "mcq", json.dumps(self._maybe_invalid(_mcq(concept, self._difficulty(prompt))))
+        if '"translations"' in prompt:
+            items = json.loads(prompt.split("ITEMS:\n", 1)[1])
+            translations = [{"id": item["id"], "mn": f"[mn] {item['text']}"} for item in items]
+            return "translate_batch", json.dumps({"translations": translations}, ensure_ascii=False)
+        if "Translate the following" in prompt:
+            return "translate", "[mn] " + prompt.split("TEXT:\n", 1)[-1]
+        return "other", "{}"
+
+    @staticmethod
+    def _difficulty(prompt: str) -> str:
+        match = re.search(r"Difficulty Level: (\w+)", prompt)
+        return match.group(1).lower() if match else "medium"
+
+    def _maybe_invalid(self, mcq: Dict) -> Dict:
+        with self._lock:
+            invalid = self._rng.random() < self.invalid_rate
+        if invalid:
+            mcq["choices"] = mcq["choices"][:3]
+        return mcq
+
+
+class _Models:
+    def __init__(self, client: FakeGenaiClient):
+        self._client = client
+
+    def generate_content(self, model: str, contents: str, config: Optional[Dict] = None) -> FakeResponse:
+        time.sleep(self._client.delay())
+        return self._client.respond(contents)
+
+
+class _AsyncModels:
+    def __init__(self, client: FakeGenaiClient):
+        self._client = client
+
+    async def generate_content(self, model: str, contents: str, config: Optional[Dict] = None) -> FakeResponse:
+        await asyncio.sleep(self._client.delay())
+        return self._client.respond(contents)
+
+
+class _Aio:
+    def __init__(self, models: _AsyncModels):
+        self.models = models
+
+
+def install(client: FakeGenaiClient) -> FakeGenaiClient:
+    """Make ``llm_client.get_genai_client()`` return ``client`` for this process."""
+    from app.services import llm_client
+
+    with llm_client._genai_client_lock:
+        llm_client._genai_client = client
+    return client
@@ -0,0 +1,98 @@
+"""Deterministic synthetic textbook PDFs for offline benchmarks.
+
+Writes plain PDF 1.4 files with the built-in Helvetica font, so no PDF
+library is needed to create them and pdfplumber extracts the text as usual.
+"""
+
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+TOPICS = (
+    "photosynthesis", "cell division", "enzyme kinetics", "plate tectonics", "thermodynamics",
+    "supply and demand", "software documentation", "neural networks", "the water cycle",
+    "electromagnetic induction", "protein synthesis", "market equilibrium", "version control",
+    "chemical bonding", "ecosystem succession", "requirements engineering",
+)
+SUBJECTS = (
+    "The process", "This mechanism", "A key principle", "The model", "Each stage", "The system",
+    "An important factor", "The relationship", "The final step", "The standard approach",
+)
+VERBS = (
+    "depends on", "is driven by", "produces", "regulates", "is limited by", "transforms",
+    "is measured through", "interacts with", "is explained by", "determines",
+)
+OBJECTS = (
+    "the available energy", "the surrounding conditions", "a feedback loop", "its inputs and outputs",
+    "the rate of change", "several intermediate states", "the structure of the components",
+    "an external constraint", "the balance between two forces", "the documented user tasks",
+)
+
+LINES_PER_PAGE = 46
+WORDS_PER_LINE = 12
+
+
+def page_lines(page_number: int, seed: int = 0) -> List[str]:
+    """Text lines for one page: a heading followed by topic sentences wrapped to fixed width."""
+    rng = random.Random(seed * 100_003 + page_number)
+    topic = TOPICS[(page_number // 8) % len(TOPICS)]
+    words: List[str] = []
+    while len(words) < (LINES_PER_PAGE - 2) * WORDS_PER_LINE:
+        sentence = f"{rng.choice(SUBJECTS)} of {topic} {rng.choice(VERBS)} {rng.choice(OBJECTS)}."
+        words.extend(sentence.split())
+    lines = [f"Chapter {page_number // 8 + 1}: {topic.title()} (page {page_number})", ""]
+    for start in range(0, len(words), WORDS_PER_LINE):
+        lines.append(" ".join(words[start : start + WORDS_PER_LINE]))
+    return lines[:LINES_PER_PAGE]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _content_stream(lines: Iterable[str]) -> bytes:
+    commands = ["BT", "/F1 10 Tf", "14 TL", "50 750 Td"]
+    for line in lines:
+        commands.append(f"({_escape(line)}) Tj T*")
+    commands.append("ET")
+    return "\n".join(commands).encode("latin-1")
+
+
+def write_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    """Write a ``pages``-page synthetic textbook to ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Objects: 1 catalog, 2 page tree, 3 font, then (page, contents) pairs.
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for index in range(pages):
+        page_id, content_id = 4 + 2 * index, 5 + 2 * index
+        kids.append(f"{page_id} 0 R")
+        objects[page_id] = (
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("latin-1")
+        stream = _content_stream(page_lines(index + 1, seed))
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1")
+
+    with path.open("wb") as handle:
+        handle.write(b"%PDF-1.4\n")
+        offsets = {}
+        for object_id in sorted(objects):
+            offsets[object_id] = handle.tell()
+            handle.write(b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id]))
+        xref = handle.tell()
+        handle.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for object_id in sorted(objects):
+            handle.write(b"%010d 00000 n \n" % offsets[object_id])
+        handle.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return path
+
+
+def build_corpus(directory: Path, sizes: Iterable[int], seed: int = 0) -> Dict[int, Path]:
+    """One PDF per page count in ``sizes``, e.g. ``{20: .../book_20p.pdf}``."""
+    return {pages: write_pdf(Path(directory) / f"book_{pages}p.pdf", pages, seed) for pages in sizes}
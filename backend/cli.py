@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 from pathlib import Path
 import uuid
 
-from app.services.registry import mcq_generator, pdf_processor
+from app.config import settings
+from app.services.registry import get_concept_indexer, get_ingestion_service, get_mcq_generator
 
 
 def ingest_pdf(pdf_path: Path, pdf_id: str | None, start_page: int | None, end_page: int | None):
@@ -16,20 +18,23 @@ def ingest_pdf(pdf_path: Path, pdf_id: str | None, start_page: int | None, end_p
         raise SystemExit(f"PDF not found: {pdf_path}")
 
     resolved_pdf_id = pdf_id or pdf_path.stem.replace(" ", "_") + f"_{uuid.uuid4().hex[:8]}"
-    text, total_pages, (range_start, range_end) = pdf_processor.extract_text(
-        pdf_path, page_start=start_page, page_end=end_page
+    ingest_result = get_ingestion_service().ingest(
+        pdf_path,
+        title=pdf_path.name,
+        page_start=start_page,
+        page_end=end_page,
+        pdf_id=resolved_pdf_id,
     )
-    metadata = {
-        "title": pdf_path.name,
-        "total_pages": total_pages,
-        "ingested_range": f"{range_start}-{range_end}",
-    }
-    chunks = mcq_generator.process_pdf_to_rag(text, pdf_id=resolved_pdf_id, metadata=metadata)
+    if settings.CONCEPT_INDEX_ENABLED:
+        # The indexer works in background threads; finish before the process exits.
+        get_concept_indexer().wait()
+    range_start, range_end = ingest_result.page_range
     result = {
-        "pdf_id": resolved_pdf_id,
-        "total_pages": total_pages,
+        "pdf_id": ingest_result.pdf_id,
+        "total_pages": ingest_result.total_pages,
         "ingested_pages": f"{range_start}-{range_end}",
-        "chunks_created": chunks,
+        "chunks_created": ingest_result.chunks_created,
+        "status": ingest_result.status,
     }
     return result
 
@@ -47,16 +52,43 @@ def process_command(args: argparse.Namespace):
 
 def generate_command(args: argparse.Namespace):
     """Generate MCQs for an already ingested PDF."""
+    mcq_generator = get_mcq_generator()
+    context = mcq_generator.rag.page_context(args.pdf_id, args.page_start, args.page_end)
+    if getattr(args, "stream", False):
+        asyncio.run(_stream_mcqs(args, context))
+        return
     mcqs = mcq_generator.generate_mcqs(
         pdf_id=args.pdf_id,
         page_start=args.page_start,
         page_end=args.page_end,
         num_questions=args.num_questions,
         difficulty=args.difficulty,
+        context=context,
     )
     print(json.dumps({"total_generated": len(mcqs), "mcqs": mcqs}, indent=2, ensure_ascii=False))
 
 
+async def _stream_mcqs(args: argparse.Namespace, context):
+    """Print one NDJSON event per line as MCQs are generated."""
+    async for event in get_mcq_generator().astream_mcqs(
+        pdf_id=args.pdf_id,
+        page_start=args.page_start,
+        page_end=args.page_end,
+        num_questions=args.num_questions,
+        difficulty=args.difficulty,
+        context=context,
+    ):
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+
+
+def migrate_chroma_command(args: argparse.Namespace):
+    """Copy per-PDF Chroma collections into the shared collection layout."""
+    from app.services.vector_store import ChromaVectorStore
+
+    copied = ChromaVectorStore(storage_mode="shared").migrate_to_shared(delete_source=args.delete_source)
+    print(json.dumps({"migrated": copied, "total_chunks": sum(copied.values())}, indent=2))
+
+
 def interactive_command(_args: argparse.Namespace):
     """Guided flow: ask for PDF, optional pages, question count, and difficulty."""
     print("=== Interactive MCQ Generator ===")
@@ -104,8 +136,19 @@ def build_parser() -> argparse.ArgumentParser:
     generate.add_argument(
         "--difficulty", choices=["easy", "medium", "hard"], default="medium", help="Question difficulty"
     )
+    generate.add_argument(
+        "--stream", action="store_true", help="Emit NDJSON events as each MCQ is ready"
+    )
     generate.set_defaults(func=generate_command)
 
+    migrate = sub.add_parser(
+        "migrate-chroma", help="Move per-PDF Chroma collections into the shared collection"
+    )
+    migrate.add_argument(
+        "--delete-source", action="store_true", help="Drop each per-PDF collection after copying it"
+    )
+    migrate.set_defaults(func=migrate_chroma_command)
+
     interactive = sub.add_parser("interactive", help="Prompt-driven flow (enter PDF path, pages, etc.)")
     interactive.set_defaults(func=interactive_command)
 
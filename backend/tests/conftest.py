@@ -0,0 +1,42 @@
+"""Shared fixtures: settings point at a throwaway directory and Gemini at a local fake.
+
+Environment variables are set before anything imports ``app.config``, so no
+test touches the checkout's own databases or calls the real API.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="msq-tests-")
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.update(
+    {
+        "CHROMA_DB_PATH": os.path.join(_DATA_DIR, "chroma_db"),
+        "NUMPY_STORE_PATH": os.path.join(_DATA_DIR, "vector_store"),
+        "INGEST_MANIFEST_PATH": os.path.join(_DATA_DIR, "ingest_manifest.sqlite3"),
+        "INGEST_JOBS_DB_PATH": os.path.join(_DATA_DIR, "ingest_jobs.sqlite3"),
+        "EMBEDDING_CACHE_DIR": os.path.join(_DATA_DIR, "embedding_cache"),
+        "EMBEDDING_ONNX_DIR": os.path.join(_DATA_DIR, "onnx_models"),
+        "LLM_CACHE_PATH": os.path.join(_DATA_DIR, "llm_cache.sqlite3"),
+        "LLM_CACHE_ENABLED": "False",
+        "GEMINI_RATE_LIMIT_RPM": "0",
+        "WARMUP_ON_STARTUP": "False",
+    }
+)
+
+
+@pytest.fixture
+def fake_genai():
+    """Route every Gemini call of the test through a zero-latency :class:`FakeGenaiClient`."""
+    from app.services import llm_client
+    from benchmarks.fake_genai import FakeGenaiClient, install
+
+    previous = llm_client._genai_client
+    client = install(FakeGenaiClient(latency=0.0))
+    llm_client.circuit_breaker.record_success()
+    yield client
+    with llm_client._genai_client_lock:
+        llm_client._genai_client = previous
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from app.services.llm_client import BackgroundGate, ConcurrencyLimiter, TokenBucket
+
+
+def test_background_gate_yields_to_interactive_calls_and_queued_waiters():
+    bucket, limiter = TokenBucket(rate=0.1, capacity=4), ConcurrencyLimiter(1)
+    gate = BackgroundGate(bucket, limiter, poll_seconds=0.01)
+    assert not gate._busy()
+
+    with gate.interactive():
+        assert gate._busy()
+    assert not gate._busy()
+
+    limiter._waiters.append(threading.Event())
+    assert gate._busy()
+    limiter._waiters.clear()
+
+    # Half the burst is kept for interactive callers.
+    bucket.reserve()
+    assert not gate._busy()
+    bucket.reserve()
+    bucket.reserve()
+    assert gate._busy()
+
+
+def test_background_gate_wait_turn_blocks_until_interactive_calls_finish():
+    gate = BackgroundGate(TokenBucket(rate=0.0, capacity=1), ConcurrencyLimiter(1), poll_seconds=0.01)
+    entered = threading.Event()
+
+    def interactive_call():
+        with gate.interactive():
+            entered.set()
+            time.sleep(0.1)
+
+    thread = threading.Thread(target=interactive_call)
+    thread.start()
+    entered.wait(timeout=2)
+    started = time.monotonic()
+    gate.wait_turn()
+    waited = time.monotonic() - started
+    thread.join()
+
+    assert waited >= 0.05
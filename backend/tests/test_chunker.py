@@ -0,0 +1,55 @@
+import re
+
+from app.services.chunker import SmartChunker, TokenChunker
+
+
+class PieceTokenizer:
+    """Stand-in word-piece tokenizer: every word is split into pieces of at most three characters."""
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=True):
+        offsets = []
+        for match in re.finditer(r"\S+", text):
+            for start in range(match.start(), match.end(), 3):
+                offsets.append((start, min(start + 3, match.end())))
+        return {"offset_mapping": offsets}
+
+
+def test_word_chunks_carry_overlap_and_page_spans():
+    chunker = SmartChunker(chunk_size=6, overlap=2)
+    pages = [(1, "one two three four"), (2, "five six seven eight")]
+
+    chunks = list(chunker.iter_chunks(pages))
+
+    assert [chunk["text"] for chunk in chunks] == [
+        "one two three four",
+        "three four five six seven eight",
+    ]
+    assert [(chunk["page_start"], chunk["page_end"]) for chunk in chunks] == [(1, 1), (1, 2)]
+
+
+def test_split_marked_text_attributes_leading_text_to_page_one():
+    text = "preface [PAGE 3] alpha [PAGE 4] beta"
+
+    assert list(SmartChunker.split_marked_text(text)) == [(1, "preface "), (3, " alpha "), (4, " beta")]
+
+
+def test_token_chunks_never_split_words():
+    chunker = TokenChunker(PieceTokenizer(), max_tokens=8, overlap=3)
+    words = ["photosynthesis", "is", "how", "plants", "convert", "light", "into", "chemical", "energy"]
+    text = " ".join(words * 3)
+
+    chunks = list(chunker.iter_chunks([(1, text)]))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["token_count"] <= 8
+        assert set(chunk["text"].split()) <= set(words)
+
+
+def test_token_chunks_force_split_a_single_overlong_word():
+    chunker = TokenChunker(PieceTokenizer(), max_tokens=4, overlap=1)
+
+    chunks = list(chunker.iter_chunks([(1, "a" * 30)]))
+
+    assert all(chunk["token_count"] <= 4 for chunk in chunks)
+    assert "".join(chunk["text"] for chunk in chunks).count("a") >= 30
@@ -0,0 +1,97 @@
+import numpy as np
+
+from app.services.concept_index import ConceptIndex, concept_windows
+
+
+def test_concept_windows_pack_pages_up_to_the_budget():
+    chars = {1: 3000, 2: 3000, 3: 3000, 4: 500, 5: 500}
+
+    assert concept_windows([(1, 5)], chars, budget=8000) == [(1, 2), (3, 5)]
+
+
+def test_concept_windows_oversized_page_gets_its_own_window():
+    chars = {1: 100, 2: 20000, 3: 100}
+
+    assert concept_windows([(1, 3)], chars, budget=8000) == [(1, 1), (2, 2), (3, 3)]
+
+
+def test_concept_windows_never_cross_runs():
+    chars = {page: 10 for page in range(1, 11)}
+
+    assert concept_windows([(1, 3), (7, 10)], chars, budget=8000) == [(1, 3), (7, 10)]
+
+
+def unit_vectors(*directions):
+    return np.eye(8, dtype=np.float32)[list(directions)]
+
+
+def ready_index(tmp_path, windows):
+    """``windows`` maps ``(start, end)`` to ``(concepts, embeddings)``."""
+    index = ConceptIndex(str(tmp_path / "concept_index.sqlite3"))
+    tokens = index.mark_pending("pdf", list(windows))
+    for window, (concepts, embeddings) in windows.items():
+        assert index.store("pdf", window, tokens[window], concepts, embeddings)
+    return index
+
+
+def test_select_round_robins_over_windows_in_page_order(tmp_path):
+    index = ready_index(
+        tmp_path,
+        {
+            (1, 2): (["a1", "a2", "a3"], unit_vectors(0, 1, 2)),
+            (3, 4): (["b1", "b2"], unit_vectors(3, 4)),
+        },
+    )
+
+    assert index.select("pdf", 1, 4, 4) == ["a1", "b1", "a2", "b2"]
+    assert index.select("pdf", 3, 3, 5) == ["b1", "b2"]
+
+
+def test_select_skips_near_duplicates_and_repeated_names(tmp_path):
+    near = unit_vectors(0)[0] + 0.01 * unit_vectors(1)[0]
+    index = ready_index(
+        tmp_path,
+        {
+            (1, 1): (["Osmosis", "diffusion"], np.stack([unit_vectors(0)[0], unit_vectors(2)[0]])),
+            (2, 2): (["osmosis", "osmotic pressure"], np.stack([unit_vectors(5)[0], near])),
+        },
+    )
+
+    assert index.select("pdf", 1, 2, 4, dedup_threshold=0.9) == ["Osmosis", "diffusion"]
+
+
+def test_select_returns_none_until_every_window_is_ready(tmp_path):
+    index = ConceptIndex(str(tmp_path / "concept_index.sqlite3"))
+    tokens = index.mark_pending("pdf", [(1, 2), (3, 4)])
+    index.store("pdf", (1, 2), tokens[(1, 2)], ["a"], unit_vectors(0))
+
+    assert index.select("pdf", 1, 4, 2) is None
+    assert index.select("pdf", 1, 2, 2) == ["a"]
+    assert index.select("other", 1, 2, 2) is None
+
+
+def test_store_with_a_stale_token_is_dropped(tmp_path):
+    index = ConceptIndex(str(tmp_path / "concept_index.sqlite3"))
+    stale = index.mark_pending("pdf", [(1, 2)])[(1, 2)]
+    fresh = index.mark_pending("pdf", [(1, 2)])[(1, 2)]
+
+    assert not index.store("pdf", (1, 2), stale, ["old"], unit_vectors(0))
+    index.mark_failed("pdf", (1, 2), stale)
+    assert index.status_counts()["pending"] == 1
+
+    assert index.store("pdf", (1, 2), fresh, ["new"], unit_vectors(0))
+    assert index.select("pdf", 1, 2, 1) == ["new"]
+
+
+def test_unfinished_lists_pending_and_failed_windows_with_tokens(tmp_path):
+    index = ConceptIndex(str(tmp_path / "concept_index.sqlite3"))
+    tokens = index.mark_pending("pdf", [(1, 2), (3, 4), (5, 6)])
+    index.store("pdf", (1, 2), tokens[(1, 2)], ["a"], unit_vectors(0))
+    index.mark_failed("pdf", (3, 4), tokens[(3, 4)])
+
+    assert index.unfinished() == [("pdf", (3, 4), tokens[(3, 4)]), ("pdf", (5, 6), tokens[(5, 6)])]
+    assert index.status_counts() == {"pending": 1, "ready": 1, "failed": 1}
+
+    index.remove("pdf")
+    assert not index.has("pdf")
+    assert index.unfinished() == []
@@ -0,0 +1,67 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, text_hash
+
+DIMENSION = 8
+
+
+def open_cache(directory, max_rows=10000):
+    return EmbeddingCache(str(directory), "model:test", DIMENSION, memory_entries=16, max_rows=max_rows)
+
+
+def vector_for(key: str) -> np.ndarray:
+    seed = int(key[:8], 16)
+    return np.random.default_rng(seed).random(DIMENSION, dtype=np.float32)
+
+
+def write_batches(directory, worker: int, batches: int, per_batch: int):
+    cache = open_cache(directory)
+    for batch in range(batches):
+        keys = [text_hash(f"worker {worker} text {batch * per_batch + idx}") for idx in range(per_batch)]
+        cache.store(keys, np.stack([vector_for(key) for key in keys]))
+
+
+def test_lookup_returns_stored_vectors_from_memory_and_disk(tmp_path):
+    cache = open_cache(tmp_path)
+    keys = [text_hash(f"text {idx}") for idx in range(3)]
+    cache.store(keys, np.stack([vector_for(key) for key in keys]))
+
+    found = open_cache(tmp_path).lookup(keys + [text_hash("missing")])
+
+    assert set(found) == set(keys)
+    for key in keys:
+        np.testing.assert_array_equal(found[key], vector_for(key))
+
+
+def test_rows_beyond_max_rows_stay_in_memory_only(tmp_path):
+    cache = open_cache(tmp_path, max_rows=2)
+    keys = [text_hash(f"text {idx}") for idx in range(3)]
+    cache.store(keys, np.stack([vector_for(key) for key in keys]))
+
+    assert len(cache.lookup(keys)) == 3
+    assert len(open_cache(tmp_path, max_rows=2).lookup(keys)) == 2
+
+
+def test_concurrent_writer_processes_keep_rows_and_index_aligned(tmp_path):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs the fork start method")
+    context = multiprocessing.get_context("fork")
+    reader = open_cache(tmp_path)  # opened before the writers, so its row count goes stale
+    workers = [
+        context.Process(target=write_batches, args=(tmp_path, worker, 20, 10)) for worker in range(2)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    keys = [text_hash(f"worker {worker} text {idx}") for worker in range(2) for idx in range(200)]
+    found = reader.lookup(keys)
+
+    assert len(found) == len(keys)
+    assert all(np.array_equal(found[key], vector_for(key)) for key in keys)
+    assert (tmp_path / "model_test.f32").stat().st_size == len(keys) * DIMENSION * 4
@@ -0,0 +1,34 @@
+import json
+
+import pdfplumber
+
+from app.services.llm_client import generate_text
+from benchmarks.synthetic_pdf import page_lines, write_pdf
+
+
+def test_fake_client_answers_concept_prompts_with_the_requested_count(fake_genai):
+    prompt = "Please extract the key concepts. Include 4 distinct concepts.\nChapter 2: Cells (page 3)"
+
+    concepts = json.loads(generate_text(prompt))["concepts"]
+
+    assert len(concepts) == 4
+    assert fake_genai.calls == {"concepts": 1}
+
+
+def test_fake_client_answers_batch_translation_per_item(fake_genai):
+    items = [{"id": 0, "text": "cell"}, {"id": 1, "text": "membrane"}]
+    prompt = '"translations"\nITEMS:\n' + json.dumps(items)
+
+    translations = json.loads(generate_text(prompt))["translations"]
+
+    assert translations == [{"id": 0, "mn": "[mn] cell"}, {"id": 1, "mn": "[mn] membrane"}]
+
+
+def test_synthetic_pdf_has_the_requested_pages_and_text(tmp_path):
+    path = write_pdf(tmp_path / "book.pdf", pages=3, seed=1)
+
+    with pdfplumber.open(path) as pdf:
+        assert len(pdf.pages) == 3
+        text = pdf.pages[1].extract_text()
+
+    assert page_lines(2, seed=1)[0] in text
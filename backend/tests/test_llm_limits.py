@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.llm_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimiter,
+    TokenBucket,
+)
+
+
+def test_token_bucket_allows_a_burst_then_spaces_calls():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.available() < 0
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(rate=0.0, capacity=1)
+
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.available() == float("inf")
+
+
+def test_token_bucket_drain_drops_the_burst():
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    bucket.drain()
+
+    assert bucket.reserve() > 0
+
+
+def test_concurrency_limiter_hands_released_slot_to_waiting_thread():
+    limiter = ConcurrencyLimiter(1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while limiter.waiting == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.waiting == 1 and not acquired.is_set()
+
+    limiter.release()
+    thread.join(timeout=2)
+    assert acquired.is_set()
+    assert limiter.active == 1
+    limiter.release()
+    assert limiter.active == 0
+
+
+def test_concurrency_limiter_cancelled_waiter_leaves_the_queue():
+    limiter = ConcurrencyLimiter(1)
+
+    async def scenario():
+        limiter.acquire()
+        task = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.waiting == 0
+        limiter.release()
+
+    asyncio.run(scenario())
+    assert limiter.active == 0
+
+
+def test_concurrency_limiter_slot_handed_to_a_cancelled_task_is_passed_on():
+    limiter = ConcurrencyLimiter(1)
+
+    async def scenario():
+        limiter.acquire()
+        task = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        limiter.release()  # hand-over is scheduled on the loop...
+        task.cancel()  # ...but the waiter is cancelled first
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert limiter.active == 0
+    assert limiter.waiting == 0
+
+
+def open_breaker(cooldown: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=2, cooldown=cooldown)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_circuit_breaker_opens_after_threshold_failures():
+    breaker = open_breaker(cooldown=60)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_breaker_lets_one_probe_through_after_cooldown():
+    breaker = open_breaker()
+    time.sleep(0.06)
+
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.before_call() is False
+
+
+def test_circuit_breaker_failed_probe_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.before_call() is True
+
+    breaker.record_failure()
+    breaker.end_probe()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_breaker_cancelled_probe_hands_the_probe_on():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.before_call() is True
+
+    # The probe ended without recording an outcome (e.g. it was cancelled).
+    breaker.end_probe()
+
+    assert breaker.before_call() is True
+
+
+def test_circuit_breaker_stuck_probe_stops_blocking_after_another_cooldown():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.before_call() is True
+
+    time.sleep(0.06)
+    assert breaker.before_call() is True
+
+
+def test_circuit_breaker_disabled_with_zero_threshold():
+    breaker = CircuitBreaker(threshold=0, cooldown=60)
+    for _ in range(5):
+        breaker.record_failure()
+
+    assert breaker.before_call() is False
@@ -0,0 +1,178 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.mcq_generator import MCQGenerator
+from app.services.rag_service import PageRangeContext
+from app.services.translator import TranslatorService
+
+
+def item(concept):
+    return {"concept": concept}
+
+
+def test_match_batch_items_by_concept_name_regardless_of_order():
+    concepts = ["a", "b", "c"]
+    items = [item("c"), item("a"), item("b")]
+
+    assert MCQGenerator._match_batch_items(concepts, items) == [1, 2, 0]
+
+
+def test_match_batch_items_position_fallback_only_for_unclaimed_foreign_items():
+    concepts = ["a", "b", "c"]
+    # Item 0 is unnamed, item 1 answers "a" (claimed by name), item 2 is about "a" again.
+    items = [item("renamed"), item("a"), item("a")]
+
+    assert MCQGenerator._match_batch_items(concepts, items) == [1, None, None]
+
+
+def test_match_batch_items_never_hands_one_item_to_two_concepts():
+    concepts = ["a", "b"]
+    items = [item("b")]
+
+    positions = MCQGenerator._match_batch_items(concepts, items)
+
+    assert positions == [None, 0]
+
+
+def test_match_batch_items_ignores_non_dict_items():
+    assert MCQGenerator._match_batch_items(["a", "b"], ["oops", item("b")]) == [None, 1]
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """A generator with Gemini-backed generation and translation but no embedder or vector store."""
+    instance = MCQGenerator.__new__(MCQGenerator)
+    instance.translator = TranslatorService()
+
+    async def no_distractors(context, concepts):
+        return ["" for _ in concepts]
+
+    monkeypatch.setattr(instance, "_distractor_contexts", no_distractors)
+    monkeypatch.setattr(settings, "MCQ_BATCH_SIZE", 1)
+    monkeypatch.setattr(settings, "MCQ_GENERATION_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "MCQ_SPECULATIVE_RATIO", 0.2)
+    monkeypatch.setattr(settings, "MCQ_CALL_BUDGET_FACTOR", 2.0)
+    return instance
+
+
+CONTEXT = PageRangeContext(
+    pdf_id="book",
+    page_start=1,
+    page_end=2,
+    documents=["Chapter 1: Cells (page 1) cells have membranes.", "Membranes control transport."],
+    metadatas=[{"page_start": 1, "page_end": 1}, {"page_start": 2, "page_end": 2}],
+)
+
+
+def collect(generator, concepts, target):
+    async def run():
+        return [event async for event in generator._iter_mcqs(CONTEXT, concepts, target, "medium")]
+
+    return asyncio.run(run())
+
+
+def test_batch_item_without_mongolian_is_translated_not_rejected(fake_genai, generator, monkeypatch):
+    monkeypatch.setattr(settings, "MCQ_BATCH_SIZE", 3)
+
+    def english_only(mcq):
+        if mcq["concept"] == "concept 1":
+            mcq.pop("question_mn")
+            mcq.pop("explanation_mn")
+        return mcq
+
+    monkeypatch.setattr(fake_genai, "_maybe_invalid", english_only)
+
+    events = collect(generator, ["concept 0", "concept 1", "concept 2"], 3)
+    accepted = {mcq["concept"]: mcq for _, _, mcq in events if mcq}
+
+    assert set(accepted) == {"concept 0", "concept 1", "concept 2"}
+    assert accepted["concept 1"]["question_mn"].startswith("[mn] ")
+    assert fake_genai.calls["mcq_batch"] == 1
+    assert "mcq" not in fake_genai.calls
+
+
+def test_malformed_batch_item_is_retried_as_a_single_question(fake_genai, generator, monkeypatch):
+    monkeypatch.setattr(settings, "MCQ_BATCH_SIZE", 3)
+    broken = set()
+
+    def break_once(mcq):
+        if mcq["concept"] == "concept 2" and not broken:
+            broken.add(mcq["concept"])
+            mcq["choices"] = mcq["choices"][:3]
+        return mcq
+
+    monkeypatch.setattr(fake_genai, "_maybe_invalid", break_once)
+
+    events = collect(generator, ["concept 0", "concept 1", "concept 2"], 3)
+
+    assert sorted(mcq["concept"] for _, _, mcq in events if mcq) == ["concept 0", "concept 1", "concept 2"]
+    assert fake_genai.calls == {"mcq_batch": 1, "mcq": 1}
+
+
+def test_iter_mcqs_stops_at_the_target(fake_genai, generator):
+    concepts = [f"concept {idx}" for idx in range(10)]
+
+    events = collect(generator, concepts, 5)
+    accepted = [mcq for _, _, mcq in events if mcq]
+
+    assert len(accepted) == 5
+    assert [mcq["question_number"] for mcq in accepted] == [1, 2, 3, 4, 5]
+    assert all(mcq["page_reference"] == CONTEXT.page_reference for mcq in accepted)
+    # Within the call budget: MCQ_CALL_BUDGET_FACTOR times the target.
+    assert fake_genai.calls["mcq"] <= 10
+
+
+def test_iter_mcqs_tops_up_rejected_questions_from_the_backlog(fake_genai, generator, monkeypatch):
+    rejected = []
+    original = fake_genai._maybe_invalid
+
+    def reject_first_three(mcq):
+        if len(rejected) < 3:
+            rejected.append(mcq["concept"])
+            mcq["choices"] = mcq["choices"][:3]
+            return mcq
+        return original(mcq)
+
+    monkeypatch.setattr(fake_genai, "_maybe_invalid", reject_first_three)
+    concepts = [f"concept {idx}" for idx in range(15)]
+
+    events = collect(generator, concepts, 5)
+    accepted = [mcq for _, _, mcq in events if mcq]
+    failed = [concept for _, concept, mcq in events if mcq is None]
+
+    assert len(accepted) == 5
+    assert sorted(failed) == sorted(rejected)
+    assert {mcq["concept"] for mcq in accepted}.isdisjoint(failed)
+
+
+def test_iter_mcqs_respects_the_call_budget(fake_genai, generator, monkeypatch):
+    monkeypatch.setattr(settings, "MCQ_CALL_BUDGET_FACTOR", 1.0)
+    fake_genai.invalid_rate = 1.0
+    concepts = [f"concept {idx}" for idx in range(20)]
+
+    events = collect(generator, concepts, 4)
+
+    assert not any(mcq for _, _, mcq in events)
+    assert fake_genai.calls["mcq"] == 4
+
+
+def test_iter_mcqs_without_finalize_leaves_translation_to_the_caller(fake_genai, generator, monkeypatch):
+    def english_only(mcq):
+        mcq.pop("question_mn")
+        return mcq
+
+    monkeypatch.setattr(fake_genai, "_maybe_invalid", english_only)
+
+    async def run():
+        return [
+            event
+            async for event in generator._iter_mcqs(CONTEXT, ["a", "b", "c"], 3, "medium", finalize=False)
+        ]
+
+    accepted = [mcq for _, _, mcq in asyncio.run(run()) if mcq]
+
+    assert len(accepted) == 3
+    assert not any("question_mn" in mcq for mcq in accepted)
+    assert "translate_batch" not in fake_genai.calls
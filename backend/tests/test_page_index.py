@@ -0,0 +1,57 @@
+from app.services.page_index import PageIndex, PageSpans
+
+
+def make_spans(entries):
+    entries = sorted(entries)
+    return PageSpans(
+        starts=[start for start, _, _ in entries],
+        ends=[end for _, end, _ in entries],
+        ids=[doc_id for _, _, doc_id in entries],
+        max_span=max(end - start for start, end, _ in entries),
+    )
+
+
+def test_lookup_contained_only_returns_chunks_inside_the_range():
+    spans = make_spans([(1, 1, "a"), (2, 3, "b"), (3, 3, "c"), (4, 6, "d")])
+
+    assert spans.lookup(2, 3, "contained") == ["b", "c"]
+    assert spans.lookup(3, 5, "contained") == ["c"]
+
+
+def test_lookup_intersecting_includes_long_spans_starting_before_the_range():
+    spans = make_spans([(1, 1, "a"), (1, 5, "long"), (3, 3, "c"), (7, 8, "d")])
+
+    assert spans.lookup(4, 4, "intersecting") == ["long"]
+    assert spans.lookup(3, 7, "intersecting") == ["long", "c", "d"]
+    assert spans.lookup(9, 10, "intersecting") == []
+
+
+def test_lookup_on_empty_spans():
+    assert PageSpans().lookup(1, 10) == []
+
+
+def test_cached_spans_follow_writes_from_another_connection(tmp_path):
+    path = str(tmp_path / "page_index.sqlite3")
+    writer, reader = PageIndex(path), PageIndex(path)
+    writer.add("pdf", [(0, 1, 1, "old_0"), (1, 2, 2, "old_1")])
+    assert reader.lookup("pdf", 1, 2) == ["old_0", "old_1"]
+
+    # Re-ingest with the same number of rows, as another process would.
+    writer.remove("pdf")
+    writer.add("pdf", [(0, 5, 5, "new_0"), (1, 6, 6, "new_1")])
+
+    assert reader.lookup("pdf", 1, 6) == ["new_0", "new_1"]
+    assert reader.count("pdf") == 2
+
+
+def test_mark_empty_is_remembered_until_the_pdf_changes(tmp_path):
+    index = PageIndex(str(tmp_path / "page_index.sqlite3"))
+    assert not index.has("pdf")
+
+    index.mark_empty("pdf")
+    assert index.has("pdf")
+    assert index.count("pdf") == 0
+
+    index.add("pdf", [(0, 1, 1, "chunk_0")])
+    index.remove("pdf")
+    assert not index.has("pdf")
@@ -0,0 +1,43 @@
+import pdfplumber
+
+from app.services import pdf_processor
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.synthetic_pdf import page_lines, write_pdf
+
+
+def count_opens(monkeypatch):
+    opened = []
+    real_open = pdfplumber.open
+
+    def counting_open(path, *args, **kwargs):
+        opened.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_processor.pdfplumber, "open", counting_open)
+    return opened
+
+
+def test_extract_text_opens_the_pdf_once(tmp_path, monkeypatch):
+    path = write_pdf(tmp_path / "book.pdf", pages=4, seed=2)
+    opened = count_opens(monkeypatch)
+
+    text, total_pages, page_range = PDFProcessor().extract_text(path, 2, 9)
+
+    assert len(opened) == 1
+    assert total_pages == 4
+    assert page_range == (2, 4)
+    assert page_lines(3, seed=2)[0] in text
+    assert page_lines(1, seed=2)[0] not in text
+
+
+def test_open_document_iterates_several_ranges_on_one_handle(tmp_path, monkeypatch):
+    path = write_pdf(tmp_path / "book.pdf", pages=5, seed=3)
+    opened = count_opens(monkeypatch)
+
+    with PDFProcessor().open(path) as document:
+        first = [number for number, _ in document.iter_pages(1, 2)]
+        second = [number for number, _ in document.iter_pages(*document.clamp_range(4, None))]
+
+    assert len(opened) == 1
+    assert first == [1, 2]
+    assert second == [4, 5]
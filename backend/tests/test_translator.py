@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+from app.config import settings
+from app.services import translator as translator_module
+from app.services.mcq_generator import MCQGenerator
+from app.services.rag_service import PageRangeContext
+from app.services.translator import TranslatorService
+
+
+def test_translate_batch_dedups_and_keeps_input_order(fake_genai):
+    texts = ["cell", "membrane", "cell", ""]
+
+    assert TranslatorService().translate_batch(texts) == ["[mn] cell", "[mn] membrane", "[mn] cell", ""]
+    assert fake_genai.calls == {"translate_batch": 1}
+
+
+def test_translate_batch_falls_back_to_single_calls_for_skipped_items(fake_genai, monkeypatch):
+    original = fake_genai._answer
+
+    def skip_second(prompt):
+        kind, text = original(prompt)
+        if kind == "translate_batch":
+            payload = json.loads(text)
+            payload["translations"] = [entry for entry in payload["translations"] if entry["id"] != 1]
+            text = json.dumps(payload, ensure_ascii=False)
+        return kind, text
+
+    monkeypatch.setattr(fake_genai, "_answer", skip_second)
+
+    result = asyncio.run(TranslatorService().atranslate_batch(["a", "b", "c"]))
+
+    assert result == ["[mn] a", "[mn] b", "[mn] c"]
+    assert fake_genai.calls == {"translate_batch": 1, "translate": 1}
+
+
+def test_async_fallbacks_run_concurrently_within_the_limit(monkeypatch):
+    monkeypatch.setattr(settings, "TRANSLATION_FALLBACK_CONCURRENCY", 3)
+    active, peak = [0], [0]
+
+    async def fake_agenerate_text(prompt, **kwargs):
+        if "ITEMS:" in prompt:
+            return "{}"
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return "mn"
+
+    monkeypatch.setattr(translator_module, "agenerate_text", fake_agenerate_text)
+
+    result = asyncio.run(TranslatorService().atranslate_batch([f"text {idx}" for idx in range(8)]))
+
+    assert result == ["mn"] * 8
+    assert peak[0] == 3
+
+
+def english_only_generator(fake_genai, monkeypatch, concepts):
+    generator = MCQGenerator.__new__(MCQGenerator)
+    generator.translator = TranslatorService()
+
+    async def request_concepts(*args):
+        return concepts
+
+    async def no_distractors(context, concepts):
+        return ["" for _ in concepts]
+
+    def english_only(mcq):
+        for field in ("question_mn", "explanation_mn"):
+            mcq.pop(field)
+        return mcq
+
+    monkeypatch.setattr(generator, "_arequest_concepts", request_concepts)
+    monkeypatch.setattr(generator, "_distractor_contexts", no_distractors)
+    monkeypatch.setattr(fake_genai, "_maybe_invalid", english_only)
+    monkeypatch.setattr(settings, "MCQ_BATCH_SIZE", 1)
+    return generator
+
+
+def generate(generator, num_questions):
+    context = PageRangeContext(pdf_id="book", page_start=1, page_end=1, documents=["Cells."])
+    return asyncio.run(
+        generator.agenerate_mcqs("book", 1, 1, num_questions=num_questions, difficulty="medium", context=context)
+    )
+
+
+def test_agenerate_mcqs_translates_the_whole_request_in_one_pass(fake_genai, monkeypatch):
+    generator = english_only_generator(fake_genai, monkeypatch, [f"concept {idx}" for idx in range(6)])
+
+    mcqs = generate(generator, 6)
+
+    assert len(mcqs) == 6
+    assert all(mcq["question_mn"].startswith("[mn] ") for mcq in mcqs)
+    assert [mcq["question_number"] for mcq in mcqs] == [1, 2, 3, 4, 5, 6]
+    assert fake_genai.calls["translate_batch"] == 1
+
+
+def test_agenerate_mcqs_replaces_questions_whose_translation_failed(fake_genai, monkeypatch):
+    generator = english_only_generator(fake_genai, monkeypatch, [f"concept {idx}" for idx in range(9)])
+    original = fake_genai._answer
+
+    def untranslatable(prompt):
+        kind, text = original(prompt)
+        if kind == "translate_batch":
+            payload = json.loads(text)
+            for entry in payload["translations"]:
+                if "concept 0" in entry["mn"]:
+                    entry["mn"] = ""
+            text = json.dumps(payload, ensure_ascii=False)
+        elif kind == "translate" and "concept 0" in text:
+            text = ""
+        return kind, text
+
+    monkeypatch.setattr(fake_genai, "_answer", untranslatable)
+
+    mcqs = generate(generator, 6)
+
+    assert len(mcqs) == 6
+    assert "concept 0" not in {mcq["concept"] for mcq in mcqs}
+    assert all(mcq["question_mn"] for mcq in mcqs)
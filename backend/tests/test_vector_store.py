@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from app.services.vector_store import NumpyVectorStore, VectorStore, _merge_hits
+
+
+def hits(*pairs):
+    return {
+        "distances": [distance for distance, _ in pairs],
+        "documents": [document for _, document in pairs],
+        "metadatas": [{"doc": document} for _, document in pairs],
+    }
+
+
+def test_merge_hits_keeps_the_nearest_across_collections_per_query():
+    first = [hits((0.1, "a"), (0.7, "b")), hits((0.5, "x"))]
+    second = [hits((0.3, "c")), hits((0.2, "y"), (0.9, "z"))]
+
+    merged = _merge_hits([first, second], queries=2, n_results=2)
+
+    assert merged[0]["documents"] == ["a", "c"]
+    assert merged[0]["distances"] == [0.1, 0.3]
+    assert merged[1]["documents"] == ["y", "x"]
+    assert merged[1]["metadatas"] == [{"doc": "y"}, {"doc": "x"}]
+
+
+def test_merge_hits_with_no_results():
+    assert _merge_hits([], queries=1, n_results=3) == [{"distances": [], "documents": [], "metadatas": []}]
+
+
+def test_search_is_part_of_the_abstract_interface():
+    assert "search" in VectorStore.__abstractmethods__
+
+
+def add_rows(store, pdf_id, ids, pages):
+    store.add(
+        pdf_id,
+        ids,
+        [f"text {doc_id}" for doc_id in ids],
+        np.eye(4, dtype=np.float32)[: len(ids)],
+        [{"pdf_id": pdf_id, "page_start": page, "page_end": page} for page in pages],
+    )
+
+
+def test_numpy_store_query_excludes_pages_and_orders_by_distance(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.reset("pdf")
+    add_rows(store, "pdf", ["c0", "c1", "c2"], [1, 2, 3])
+
+    nearest = store.query("pdf", np.eye(4, dtype=np.float32)[[1]], n_results=2)[0]
+    assert nearest["documents"][0] == "text c1"
+
+    outside = store.query("pdf", np.eye(4, dtype=np.float32)[[1]], n_results=3, exclude_pages=(2, 2))[0]
+    assert sorted(outside["documents"]) == ["text c0", "text c2"]
+
+
+def test_numpy_store_truncates_a_torn_write_before_appending(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.reset("pdf")
+    add_rows(store, "pdf", ["c0", "c1"], [1, 2])
+
+    # Simulate a crash halfway through an append: some columns got the row, records a partial line.
+    directory = store._directory("pdf")
+    with (directory / "embeddings.f32").open("ab") as handle:
+        handle.write(np.ones(4, dtype=np.float32).tobytes())
+    with (directory / "page_start.i32").open("ab") as handle:
+        handle.write(np.int32(9).tobytes())
+    with (directory / "records.jsonl").open("a", encoding="utf-8") as handle:
+        handle.write('{"id": "torn", "docu')
+    store._tables.clear()
+    assert store.count("pdf") == 2
+
+    add_rows(store, "pdf", ["c2"], [3])
+    store._tables.clear()
+    table = store._table("pdf")
+
+    assert table.ids == ["c0", "c1", "c2"]
+    assert table.page_start.tolist() == [1, 2, 3]
+    assert table.page_end.tolist() == [1, 2, 3]
+    assert table.embeddings.shape == (3, 4)
+    assert store.get("pdf", ["c2"])["documents"] == ["text c2"]
+
+
+def test_numpy_store_add_to_missing_collection_raises(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        add_rows(store, "missing", ["c0"], [1])
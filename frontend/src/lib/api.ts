@@ -6,8 +6,31 @@ export type UploadResponse = {
   total_pages: number;
   chunks_created: number;
   ingested_range?: { start_page: number; end_page: number };
+  job_id?: string;
+  status?: string;
 };
 
+export type IngestJobStatus = {
+  job_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  phase?: string;
+  pdf_id?: string;
+  pages_total: number;
+  pages_done: number;
+  chunks_created: number;
+  eta_seconds?: number;
+  result_status?: "processed" | "duplicate" | "extended";
+  error?: string;
+};
+
+export type WaitOptions = {
+  signal?: AbortSignal;
+  timeoutMs?: number;
+};
+
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_TIMEOUT_MS = 15 * 60 * 1000;
+
 export type MCQChoice = {
   id: string;
   text_en: string;
@@ -29,27 +52,89 @@ export type MCQ = {
   page_reference?: string;
 };
 
-export async function uploadPdf(form: {
-  file: File;
-  startPage?: number;
-  endPage?: number;
-}): Promise<UploadResponse> {
+export async function uploadPdf(
+  form: {
+    file: File;
+    startPage?: number;
+    endPage?: number;
+  },
+  options: WaitOptions = {}
+): Promise<UploadResponse> {
   const data = new FormData();
   data.append("file", form.file);
   const params = new URLSearchParams();
   if (form.startPage) params.set("start_page", String(form.startPage));
   if (form.endPage) params.set("end_page", String(form.endPage));
+  params.set("background", "true");
 
   const res = await fetch(`${BASE_URL}/api/pdf/upload?${params.toString()}`, {
     method: "POST",
     body: data,
+    signal: options.signal,
   });
   if (!res.ok) {
     throw new Error(await res.text());
   }
+  const queued: UploadResponse = await res.json();
+  if (!queued.job_id) {
+    return queued;
+  }
+
+  const job = await waitForIngestJob(queued.job_id, options);
+  return {
+    ...queued,
+    pdf_id: job.pdf_id ?? queued.pdf_id,
+    chunks_created: job.chunks_created,
+    status: job.result_status ?? "processed",
+  };
+}
+
+export async function getIngestJob(jobId: string, signal?: AbortSignal): Promise<IngestJobStatus> {
+  const res = await fetch(`${BASE_URL}/api/pdf/jobs/${jobId}`, { signal });
+  if (!res.ok) {
+    throw new Error(await res.text());
+  }
   return res.json();
 }
 
+async function waitForIngestJob(
+  jobId: string,
+  { signal, timeoutMs = JOB_TIMEOUT_MS }: WaitOptions = {}
+): Promise<IngestJobStatus> {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const job = await getIngestJob(jobId, signal);
+    if (job.status === "completed") {
+      return job;
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error ?? "PDF ingestion failed");
+    }
+    if (Date.now() >= deadline) {
+      throw new Error(`PDF ingestion did not finish within ${Math.round(timeoutMs / 1000)}s (job ${jobId})`);
+    }
+    await sleep(JOB_POLL_INTERVAL_MS, signal);
+  }
+}
+
+function sleep(ms: number, signal?: AbortSignal): Promise<void> {
+  return new Promise((resolve, reject) => {
+    if (signal?.aborted) {
+      reject(signal.reason ?? new DOMException("Aborted", "AbortError"));
+      return;
+    }
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(signal?.reason ?? new DOMException("Aborted", "AbortError"));
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener("abort", onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener("abort", onAbort, { once: true });
+  });
+}
+
 export async function generateMCQs(payload: {
   pdfId: string;
   pageStart: number;